@@ -0,0 +1,107 @@
+"""Micro-benchmark: token-aware chunking.iter_chunks vs the original character chunk_text.
+
+Usage:
+    python src/ingestion/benchmarks/bench_chunking.py [--sizes-mb 1 4 16] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from chunking import iter_chunks, stream_chunks  # noqa: E402
+from tokens import get_encoding  # noqa: E402
+
+
+def baseline_chunk_text(text: str, chunk_size: int = 5000) -> List[str]:
+    """The chunk_text implementation iter_chunks replaced, kept verbatim for comparison."""
+    chunks = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            chunks.append(text[start:].strip())
+            break
+
+        chunk = text[start:end]
+        code_block = chunk.rfind('```')
+        if code_block != -1 and code_block > chunk_size * 0.3:
+            end = start + code_block
+        elif '\n\n' in chunk:
+            last_break = chunk.rfind('\n\n')
+            if last_break > chunk_size * 0.3:
+                end = start + last_break
+        elif '. ' in chunk:
+            last_period = chunk.rfind('. ')
+            if last_period > chunk_size * 0.3:
+                end = start + last_period + 1
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = max(start + 1, end)
+
+    return chunks
+
+
+WORDS = "agent model tool result validate schema stream response retry context dependency run".split()
+
+
+def synthetic_markdown(size_bytes: int, seed: int = 0) -> str:
+    """Docs-like markdown: headings, prose paragraphs and fenced code blocks."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        if rng.random() < 0.2:
+            lines = [f"    result = {rng.choice(WORDS)}.{rng.choice(WORDS)}({i})" for i in range(rng.randint(3, 30))]
+            block = "```python\n" + "\n".join(lines) + "\n```"
+        elif rng.random() < 0.1:
+            block = "## " + " ".join(rng.choices(WORDS, k=4)).title()
+        else:
+            sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 20))).capitalize() + "." for _ in range(rng.randint(2, 8))]
+            block = " ".join(sentences)
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=1250)
+    args = parser.parse_args()
+
+    print(f"tokenizer: {'tiktoken' if get_encoding() else 'character estimate'}")
+    print(f"{'size':>8} {'impl':>10} {'seconds':>9} {'MB/s':>8} {'chunks':>7}")
+    for size_mb in args.sizes_mb:
+        text = synthetic_markdown(int(size_mb * 1024 * 1024))
+        lines = text.splitlines(keepends=True)
+        candidates = {
+            "baseline": lambda: baseline_chunk_text(text),
+            "iter": lambda: list(iter_chunks(text, max_tokens=args.max_tokens)),
+            "stream": lambda: list(stream_chunks(lines, max_tokens=args.max_tokens)),
+        }
+        for name, fn in candidates.items():
+            seconds, chunks = timed(fn, args.repeat)
+            print(f"{size_mb:>6.1f}MB {name:>10} {seconds:>9.3f} {size_mb / seconds:>8.1f} {len(chunks):>7}")
+
+
+if __name__ == "__main__":
+    main()
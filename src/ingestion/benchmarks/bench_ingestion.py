@@ -0,0 +1,152 @@
+"""Offline throughput benchmark for the ingestion scripts.
+
+Starts fake_services.py in a subprocess, points the OpenAI, Supabase, docs
+site and n8n endpoints at it, then runs one scenario in this process:
+
+    crawl     crawl_parallel over the fake docs sitemap (HTTP fast path)
+    document  process_and_store_document on one large synthetic page
+    n8n       the n8n workflow main loop over the fake template API
+
+Caches and journals go to a temporary directory, so every run starts cold.
+Reports items/sec, requests/sec per service, p50/p99 latency per pipeline
+stage and peak RSS of the benchmark process (the fakes run separately).
+
+Usage:
+    python src/ingestion/benchmarks/bench_ingestion.py crawl --pages 50 --openai-latency 0.2
+    python src/ingestion/benchmarks/bench_ingestion.py n8n --workflows 100 --openai-error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS.parent))
+
+from fake_services import WORDS, build_parser as fake_services_parser  # noqa: E402
+
+
+def start_fake_services(fake_args):
+    """Run the fakes in their own process and return it with its base URL."""
+    process = subprocess.Popen(
+        [sys.executable, str(BENCHMARKS / "fake_services.py"), *fake_args],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("fake services did not start")
+    return process, base_url
+
+
+def service_counts(base_url: str, reset: bool = False) -> dict:
+    request = urllib.request.Request(f"{base_url}/__stats", method="DELETE" if reset else "GET")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def configure_environment(base_url: str, workdir: str):
+    """Point both ingestion scripts at the fakes. Must run before importing them."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_API_BASE": f"{base_url}/v1",
+        "SUPABASE_URL": base_url,
+        "SUPABASE_SERVICE_KEY": "bench.bench.bench",
+        "LLM_MODEL": "gpt-4o-mini",
+        "PYDANTIC_AI_SITEMAP_URL": f"{base_url}/site/sitemap.xml",
+        "N8N_TEMPLATES_URL": f"{base_url}/api/templates",
+        "N8N_RPM": "60000",
+        "N8N_ID_MANIFEST": os.path.join(workdir, "n8n_template_ids.json"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "INGEST_JOURNAL_PATH": os.path.join(workdir, "ingest_journal.sqlite3"),
+        "HTTP_CACHE_DIR": os.path.join(workdir, "http_cache"),
+        "N8N_REJECTED_PATH": os.path.join(workdir, "n8n_rejected_workflows.json"),
+        "DEDUP_STATE_DIR": os.path.join(workdir, "dedup"),
+    })
+
+
+def synthetic_document(paragraphs: int) -> str:
+    rng = random.Random(0)
+    return "\n\n".join(
+        " ".join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize() + "."
+        for _ in range(paragraphs)
+    )
+
+
+def run_scenario(args):
+    """Run the chosen scenario and return (items, stage stats or None)."""
+    if args.scenario == "n8n":
+        import ingest_n8n_workflows
+        asyncio.run(ingest_n8n_workflows.main(max_id=args.workflows))
+        return None, None
+
+    import ingest_pydantic_docs
+    if args.scenario == "crawl":
+        urls = ingest_pydantic_docs.get_pydantic_ai_docs_urls()
+        stats = asyncio.run(ingest_pydantic_docs.crawl_parallel(urls))
+    else:
+        stats = asyncio.run(ingest_pydantic_docs.process_and_store_document(
+            "http://bench.local/document", synthetic_document(args.paragraphs * args.pages)
+        ))
+    return stats["upsert"].emitted, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], parents=[fake_services_parser()], conflict_handler="resolve"
+    )
+    parser.add_argument("scenario", choices=["crawl", "document", "n8n"])
+    args = parser.parse_args()
+    fake_args = [arg for arg in sys.argv[1:] if arg != args.scenario]
+
+    process, base_url = start_fake_services(fake_args)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure_environment(base_url, workdir)
+            service_counts(base_url, reset=True)
+            started = time.perf_counter()
+            items, stats = run_scenario(args)
+            seconds = time.perf_counter() - started
+            counts = service_counts(base_url)
+    finally:
+        process.terminate()
+        process.wait()
+
+    print()
+    print(f"scenario: {args.scenario}, wall time {seconds:.2f}s")
+    if items is None:
+        items = counts.get("workflows_rows", 0)
+        print(f"workflows stored: {items} ({items / seconds:.2f}/s)")
+    else:
+        print(f"chunks stored: {items} ({items / seconds:.2f}/s)")
+    for service in ("site", "n8n", "openai", "supabase"):
+        if counts.get(service):
+            print(
+                f"{service:>9}: {counts[service]} requests ({counts[service] / seconds:.1f}/s), "
+                f"{counts.get(f'{service}_errors', 0)} injected errors"
+            )
+    if stats:
+        print(f"{'stage':>10} {'calls':>7} {'p50 ms':>8} {'p99 ms':>8} {'busy s':>8}")
+        for s in stats.values():
+            print(
+                f"{s.name:>10} {len(s.latencies):>7} {s.percentile(0.5) * 1000:>8.1f} "
+                f"{s.percentile(0.99) * 1000:>8.1f} {s.busy_seconds:>8.1f}"
+            )
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    print(f"peak RSS: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Local stand-ins for OpenAI, Supabase/PostgREST, a static docs site and the n8n templates API.
+
+Everything is served from one port, routed by path prefix:
+
+    /v1/chat/completions, /v1/embeddings   OpenAI-compatible API
+    /rest/v1/<table>                       PostgREST-like upsert sink
+    /site/sitemap.xml, /site/page-<n>      static HTML documentation site
+    /api/templates/search, .../workflows/<id>  n8n template API
+    /__stats                               request and row counters (GET), reset (DELETE)
+
+Each service has a configurable latency and error rate. Injected errors are
+429s with a retry-after-ms header for OpenAI and 503s elsewhere.
+
+Usage:
+    python src/ingestion/benchmarks/fake_services.py --port 0 --openai-latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import struct
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = "agent model tool result validate schema stream response retry context dependency run".split()
+NAV = "\n".join(f'<li><a href="/site/page-{i}">Section {i}</a></li>' for i in range(25))
+
+
+def fake_vector(text: str, dimensions: int):
+    """Deterministic unit-ish vector derived from the text."""
+    seed = struct.unpack("<Q", hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest())[0]
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) / dimensions ** 0.5 for _ in range(dimensions)]
+
+
+def fake_page(n: int, paragraphs: int) -> str:
+    rng = random.Random(n)
+    body = "\n".join(
+        f"<p>{' '.join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize()}.</p>"
+        for _ in range(paragraphs)
+    )
+    code = "\n".join(f"result = {rng.choice(WORDS)}({i})" for i in range(10))
+    return (
+        f"<html><head><title>Page {n}</title></head><body>"
+        f"<nav><ul>{NAV}</ul></nav>"
+        f"<main><h1>Page {n}</h1>{body}<pre><code>{code}</code></pre></main>"
+        f"<footer><p>Copyright Example Docs. Built with a static site generator for benchmarks.</p></footer>"
+        f"</body></html>"
+    )
+
+
+def fake_workflow(workflow_id: int) -> dict:
+    rng = random.Random(workflow_id)
+    nodes = [
+        {
+            "id": f"node-{workflow_id}-{i}",
+            "name": f"{rng.choice(WORDS).title()} {i}",
+            "type": rng.choice(["n8n-nodes-base.webhook", "n8n-nodes-base.httpRequest", "n8n-nodes-base.set",
+                                "n8n-nodes-base.slack", "n8n-nodes-base.if"]),
+            "typeVersion": 1,
+            "position": [i * 200, 300],
+            "parameters": {"url": f"https://example.com/{i}", "options": {}},
+        }
+        for i in range(rng.randint(2, 12))
+    ]
+    connections = {
+        nodes[i]["name"]: {"main": [[{"node": nodes[i + 1]["name"], "type": "main", "index": 0}]]}
+        for i in range(len(nodes) - 1)
+    }
+    return {
+        "workflow": {
+            "id": workflow_id,
+            "name": f"Workflow {workflow_id}: {' '.join(rng.choices(WORDS, k=3))}",
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(5, 40))),
+            "workflow": {"nodes": nodes, "connections": connections},
+        }
+    }
+
+
+def fake_object(schema: dict) -> dict:
+    """Fill a flat JSON schema object: first enum value, otherwise a placeholder string."""
+    return {
+        name: (prop["enum"][0] if "enum" in prop else f"Fake {name}.")
+        for name, prop in schema.get("properties", {}).items()
+    }
+
+
+class FakeServices:
+    def __init__(self, args):
+        self.args = args
+        self.counts = Counter()
+        self.tables = defaultdict(dict)
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def latency(self, service: str) -> float:
+        return getattr(self.args, f"{service}_latency")
+
+    def error_rate(self, service: str) -> float:
+        return getattr(self.args, f"{service}_error_rate")
+
+
+def make_handler(services: FakeServices):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body=b"", content_type="application/json", headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null") if length else None
+
+        def _service(self):
+            path = urlparse(self.path).path
+            if path.startswith("/v1/"):
+                return "openai"
+            if path.startswith("/rest/v1/"):
+                return "supabase"
+            if path.startswith("/site/"):
+                return "site"
+            if path.startswith("/api/templates/"):
+                return "n8n"
+            return None
+
+        def _handle(self, method: str):
+            path = urlparse(self.path).path
+            if path == "/__stats":
+                if method == "DELETE":
+                    services.counts.clear()
+                rows = {f"{table}_rows": len(table_rows) for table, table_rows in services.tables.items()}
+                return self._send(200, {**services.counts, **rows})
+
+            service = self._service()
+            if service is None:
+                return self._send(404, {"error": "unknown service"})
+            body = self._body() if method in ("POST", "PATCH") else None
+            with services.lock:
+                services.counts[service] += 1
+            time.sleep(services.latency(service) * random.uniform(0.5, 1.5))
+            if random.random() < services.error_rate(service):
+                with services.lock:
+                    services.counts[f"{service}_errors"] += 1
+                if service == "openai":
+                    return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                      headers={"retry-after-ms": "200"})
+                return self._send(503, {"message": "Service unavailable"})
+            getattr(self, f"_{service}")(method, body)
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+        def _openai(self, method, body):
+            path = urlparse(self.path).path
+            if path.endswith("/embeddings"):
+                inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                dimensions = body.get("dimensions") or 1536
+                data = [
+                    {"object": "embedding", "index": i, "embedding": fake_vector(json.dumps(text), dimensions)}
+                    for i, text in enumerate(inputs)
+                ]
+                return self._send(200, {"object": "list", "data": data, "model": body["model"],
+                                        "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+            prompt = "\n".join(str(message.get("content")) for message in body["messages"])
+            response_format = (body.get("response_format") or {}).get("type")
+            if response_format == "json_schema":
+                json_schema = body["response_format"]["json_schema"]
+                if json_schema["name"] == "chunk_summaries":
+                    indexes = [int(i) for i in re.findall(r'<chunk index="(\d+)"', prompt)]
+                    content = json.dumps({"items": [
+                        {"index": i, "title": f"Title {i}", "summary": f"Summary of chunk {i}."} for i in indexes
+                    ]})
+                else:
+                    content = json.dumps(fake_object(json_schema["schema"]))
+            elif response_format == "json_object":
+                content = json.dumps({"title": "Title", "summary": "Summary of the chunk."})
+            elif "GOOD/BAD" in prompt:
+                content = "GOOD"
+            else:
+                content = "A short analysis of the workflow."
+            return self._send(200, {
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def _supabase(self, method, body):
+            parsed = urlparse(self.path)
+            table = parsed.path.rsplit("/", 1)[-1]
+            query = parse_qs(parsed.query)
+            rows = services.tables[table]
+            if method == "POST":
+                new_rows = body if isinstance(body, list) else [body]
+                keys = (query.get("on_conflict") or ["id"])[0].split(",")
+                with services.lock:
+                    for row in new_rows:
+                        key = tuple(row.get(k) for k in keys)
+                        if key not in rows:
+                            row = {"id": services.next_id, **row}
+                            services.next_id += 1
+                        else:
+                            row = {**rows[key], **row}
+                        rows[key] = row
+                return self._send(201, new_rows)
+            if method == "GET":
+                offset = int((query.get("offset") or ["0"])[0])
+                limit = int((query.get("limit") or ["1000"])[0])
+                return self._send(200, list(rows.values())[offset:offset + limit])
+            return self._send(200, [])
+
+        def _site(self, method, body):
+            path = urlparse(self.path).path
+            base = f"http://{self.headers['Host']}/site"
+            if path == "/site/sitemap.xml":
+                urls = "".join(
+                    f"<url><loc>{base}/page-{n}</loc><lastmod>2024-01-01</lastmod></url>"
+                    for n in range(services.args.pages)
+                )
+                xml = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+                return self._send(200, xml.encode("utf-8"), "application/xml")
+            match = re.fullmatch(r"/site/page-(\d+)", path)
+            if not match:
+                return self._send(404, b"not found", "text/plain")
+            etag = f'"page-{match.group(1)}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, headers={"ETag": etag})
+            html = fake_page(int(match.group(1)), services.args.paragraphs).encode("utf-8")
+            return self._send(200, html, "text/html; charset=utf-8", headers={"ETag": etag})
+
+        def _n8n(self, method, body):
+            parsed = urlparse(self.path)
+            path = parsed.path
+            if path == "/api/templates/search":
+                query = parse_qs(parsed.query)
+                page = int((query.get("page") or ["1"])[0])
+                rows = int((query.get("rows") or ["20"])[0])
+                ids = [i for i in range(1, services.args.workflows + 1) if i % 7]
+                return self._send(200, {
+                    "totalWorkflows": len(ids),
+                    "workflows": [{"id": i, "name": f"Workflow {i}"} for i in ids[(page - 1) * rows:page * rows]],
+                })
+            match = re.fullmatch(r"/api/templates/workflows/(\d+)", path)
+            if not match:
+                return self._send(404, {"message": "not found"})
+            workflow_id = int(match.group(1))
+            # Leave gaps in the id space like the real catalogue
+            if workflow_id > services.args.workflows or workflow_id % 7 == 0:
+                return self._send(404, {"message": "not found"})
+            return self._send(200, fake_workflow(workflow_id))
+
+    return Handler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Supabase/docs/n8n services for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--pages", type=int, default=50, help="pages in the static site")
+    parser.add_argument("--paragraphs", type=int, default=40, help="paragraphs per page")
+    parser.add_argument("--workflows", type=int, default=100, help="highest n8n template id")
+    for service, latency in (("openai", 0.2), ("supabase", 0.02), ("site", 0.01), ("n8n", 0.05)):
+        parser.add_argument(f"--{service}-latency", type=float, default=latency)
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeServices(args)))
+    server.daemon_threads = True
+    # The benchmark reads the chosen port from the first line of output
+    print(f"http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
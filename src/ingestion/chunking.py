@@ -0,0 +1,149 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Tuple
+
+from tokens import CHARS_PER_TOKEN, get_encoding
+
+# Boundary patterns in order of preference, with the offset of the break from the match start.
+# Each match depends only on the characters around it, so a buffer cut at a chunk
+# start finds the same boundaries after the cut as the whole text.
+_BOUNDARIES = (
+    (re.compile(r"(?<!`)(?=```)"), 0),      # Code fence: break before the fence
+    (re.compile(r"(?<!\n)(?=\n\n)"), 0),   # Paragraph: break before the blank line
+    (re.compile(r"\. "), 1),                # Sentence: break after the period
+)
+# Characters a boundary match looks ahead
+_LOOKAHEAD = 3
+
+# Only break at a boundary past this fraction of the chunk, as chunk_text always did
+MIN_BREAK_FRACTION = 0.3
+
+
+class _TokenIndex:
+    """Maps between character and token positions of one text.
+
+    Uses the embedding model's tokenizer when tiktoken is available and a
+    fixed characters-per-token estimate otherwise. The estimate counts from
+    `offset`, the text's position in a longer document, so the token
+    positions of a streamed buffer match those of the whole document.
+    """
+
+    def __init__(self, text: str, model: str, offset: int = 0):
+        encoding = get_encoding(model)
+        self.offset = offset
+        if encoding is None:
+            self.offsets = None
+            self.count = -(-(offset + len(text)) // CHARS_PER_TOKEN)
+        else:
+            _, self.offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+            self.count = len(self.offsets)
+        self.length = len(text)
+
+    def to_char(self, token: int) -> int:
+        if token >= self.count:
+            return self.length
+        if self.offsets is None:
+            return max(0, token * CHARS_PER_TOKEN - self.offset)
+        return self.offsets[token]
+
+    def to_token(self, char: int) -> int:
+        if self.offsets is None:
+            return (self.offset + char) // CHARS_PER_TOKEN
+        return max(0, bisect_right(self.offsets, char) - 1)
+
+
+def _boundaries(text: str) -> List[List[int]]:
+    """Positions of every code fence, paragraph and sentence break, found in one pass each."""
+    return [[m.start() + shift for m in pattern.finditer(text)] for pattern, shift in _BOUNDARIES]
+
+
+def _spans(text: str, max_tokens: int, overlap_tokens: int, model: str,
+           final: bool = True, offset: int = 0) -> Tuple[List[Tuple[int, int]], int]:
+    """Compute (start, end) character spans of chunks.
+
+    With `final=False` the trailing text shorter than a full chunk is left
+    unchunked; the returned offset is where the unchunked text begins.
+    `offset` is the text's position in the whole document.
+    """
+    index = _TokenIndex(text, model, offset)
+    boundaries = _boundaries(text)
+    spans = []
+    start = 0
+    while start < len(text):
+        start_token = index.to_token(start)
+        limit_token = start_token + max_tokens
+        limit = index.to_char(limit_token)
+        if limit_token >= index.count or (not final and limit > len(text) - _LOOKAHEAD):
+            if not final:
+                return spans, start
+            spans.append((start, len(text)))
+            break
+
+        earliest = start + (limit - start) * MIN_BREAK_FRACTION
+        end = limit
+        for positions in boundaries:
+            # Last boundary strictly inside (earliest, limit)
+            i = bisect_left(positions, limit) - 1
+            if i >= 0 and positions[i] > earliest:
+                end = positions[i]
+                break
+        spans.append((start, end))
+
+        next_start = end
+        if overlap_tokens:
+            next_start = index.to_char(max(0, index.to_token(end) - overlap_tokens))
+        # A chunk cut short at a boundary can be shorter than the overlap; always
+        # move past its middle so a large overlap cannot produce near-copies
+        start = max(start + (end - start) // 2 + 1, next_start)
+    return spans, len(text)
+
+
+def _texts(text: str, spans: List[Tuple[int, int]]) -> Iterator[str]:
+    for start, end in spans:
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+
+
+def iter_chunks(text: str, max_tokens: int = 1250, overlap_tokens: int = 0,
+                model: str = "text-embedding-3-small") -> Iterator[str]:
+    """Split text into chunks of at most `max_tokens` tokens.
+
+    Breaks prefer code fences, then paragraphs, then sentences. Consecutive
+    chunks share about `overlap_tokens` tokens, but never more than half of
+    the earlier chunk. The text is scanned once to
+    index its boundaries and token offsets, so the cost is linear in its length.
+    """
+    spans, _ = _spans(text, max_tokens, overlap_tokens, model)
+    yield from _texts(text, spans)
+
+
+def stream_chunks(pieces: Iterable[str], max_tokens: int = 1250, overlap_tokens: int = 0,
+                  model: str = "text-embedding-3-small", window_chunks: int = 32) -> Iterator[str]:
+    """Chunk markdown arriving in pieces (e.g. lines of a large file) without holding it all.
+
+    Text is buffered until about `window_chunks` chunks' worth is available,
+    then every chunk that cannot be affected by later text is emitted. With
+    the characters-per-token estimate the chunks are exactly those of
+    `iter_chunks` on the joined text. With tiktoken the buffer is re-tokenized
+    after each refill, so chunks near a refill can differ by a few tokens.
+    """
+    window = max_tokens * CHARS_PER_TOKEN * window_chunks
+    parts: List[str] = []
+    buffered = 0
+    offset = 0
+    for piece in pieces:
+        parts.append(piece)
+        buffered += len(piece)
+        if buffered < window:
+            continue
+        buffer = "".join(parts)
+        spans, rest = _spans(buffer, max_tokens, overlap_tokens, model, final=False, offset=offset)
+        yield from _texts(buffer, spans)
+        parts = [buffer[rest:]]
+        buffered = len(parts[0])
+        offset += rest
+    buffer = "".join(parts)
+    spans, _ = _spans(buffer, max_tokens, overlap_tokens, model, offset=offset)
+    yield from _texts(buffer, spans)
+
@@ -0,0 +1,252 @@
+"""Export site_pages and workflows to a Parquet snapshot and load it elsewhere.
+
+A snapshot is a directory holding one Parquet file per table and a
+manifest.json. Embeddings are stored as fixed-size float32 lists, one
+contiguous block per row group. jsonb columns are stored as JSON text. Both
+directions stream in pages: export reads from a server-side cursor, and
+import either COPYs into empty tables or fills the local SitePagesMirror.
+A new environment can then start without re-crawling, re-summarizing or
+re-embedding anything.
+
+Usage:
+    python src/ingestion/corpus_snapshot.py export [--output DIR] [--tables site_pages workflows]
+    python src/ingestion/corpus_snapshot.py import [--input DIR] [--tables ...] [--truncate]
+    python src/ingestion/corpus_snapshot.py import --mirror [--input DIR]
+
+Export and import into Postgres need DATABASE_URL. COPY into a table that
+already has its vector index is slower. For large snapshots, load into a
+table without it and run maintain_vector_index.py afterwards.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import psycopg
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from psycopg import sql
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parents[2] / "data" / "processed" / "corpus_snapshot"
+
+# Snapshot columns per table, without `embedding`, which is added with its dimensions
+TABLE_COLUMNS: Dict[str, Dict[str, pa.DataType]] = {
+    "site_pages": {
+        "id": pa.int64(),
+        "url": pa.string(),
+        "chunk_number": pa.int32(),
+        "title": pa.string(),
+        "summary": pa.string(),
+        "content": pa.string(),
+        "metadata": pa.string(),
+        "created_at": pa.timestamp("us", tz="UTC"),
+    },
+    "workflows": {
+        "id": pa.int64(),
+        "workflow_id": pa.int32(),
+        "workflow_name": pa.string(),
+        "workflow_description": pa.string(),
+        "workflow_json": pa.string(),
+        "summary_accomplishment": pa.string(),
+        "summary_nodes": pa.string(),
+        "summary_suggestions": pa.string(),
+        "content": pa.string(),
+        "metadata": pa.string(),
+        "created_at": pa.timestamp("us", tz="UTC"),
+    },
+}
+JSON_COLUMNS = {"metadata", "workflow_json"}
+
+
+def snapshot_schema(table: str, dimensions: int) -> pa.Schema:
+    return pa.schema([
+        *(pa.field(name, type_) for name, type_ in TABLE_COLUMNS[table].items()),
+        pa.field("embedding", pa.list_(pa.float32(), dimensions)),
+    ])
+
+
+def parse_vector(text: Optional[str]) -> Optional[np.ndarray]:
+    """pgvector text ("[0.1,0.2,...]") to a float32 array."""
+    if text is None:
+        return None
+    return np.array(text[1:-1].split(","), dtype=np.float32)
+
+
+def vector_literal(vector: Optional[np.ndarray]) -> Optional[str]:
+    """float32 array to pgvector text, using the shortest float32 repr of each value."""
+    if vector is None:
+        return None
+    return "[" + ",".join(vector.astype(str)) + "]"
+
+
+def embedding_column(vectors: List[Optional[np.ndarray]], dimensions: int) -> pa.Array:
+    if all(vector is not None for vector in vectors):
+        block = np.stack(vectors).astype(np.float32, copy=False) if vectors else np.zeros((0, dimensions), np.float32)
+        return pa.FixedSizeListArray.from_arrays(pa.array(block.ravel()), dimensions)
+    return pa.array([None if v is None else v.tolist() for v in vectors], type=pa.list_(pa.float32(), dimensions))
+
+
+def embedding_rows(column: pa.Array) -> List[Optional[np.ndarray]]:
+    """Per-row float32 views of an embedding column, None for missing embeddings."""
+    if column.null_count == 0:
+        return list(column.flatten().to_numpy().reshape(len(column), column.type.list_size))
+    return [None if v is None else np.asarray(v, dtype=np.float32) for v in column.to_pylist()]
+
+
+def table_dimensions(conn, table: str) -> int:
+    row = conn.execute(sql.SQL("select vector_dims(embedding) from {} where embedding is not null limit 1").format(
+        sql.Identifier(table))).fetchone()
+    return row[0] if row else int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+
+
+def export_table(conn, table: str, path: Path, page_size: int = 5000) -> Dict[str, int]:
+    """Stream a table into a Parquet file, one row group per page; returns rows and dimensions."""
+    dimensions = table_dimensions(conn, table)
+    schema = snapshot_schema(table, dimensions)
+    names = list(TABLE_COLUMNS[table])
+    # jsonb and vectors come back as text, skipping a round trip through Python objects
+    columns = sql.SQL(", ").join([
+        *(sql.SQL("{}::text").format(sql.Identifier(name)) if name in JSON_COLUMNS else sql.Identifier(name)
+          for name in names),
+        sql.SQL("embedding::text"),
+    ])
+    query = sql.SQL("select {} from {} order by id").format(columns, sql.Identifier(table))
+
+    partial = path.with_name(path.name + ".partial")
+    rows = 0
+    with pq.ParquetWriter(partial, schema, compression="zstd") as writer, \
+            conn.cursor(name=f"export_{table}") as cursor:
+        cursor.execute(query)
+        while True:
+            page = cursor.fetchmany(page_size)
+            if not page:
+                break
+            arrays = [pa.array([row[i] for row in page], type=schema.field(name).type) for i, name in enumerate(names)]
+            arrays.append(embedding_column([parse_vector(row[-1]) for row in page], dimensions))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(page)
+            print(f"{table}: exported {rows} rows")
+    partial.replace(path)
+    return {"rows": rows, "dimensions": dimensions}
+
+
+def export_snapshot(conn, directory: Path, tables: List[str], page_size: int = 5000) -> Dict:
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {"created_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    for table in tables:
+        path = directory / f"{table}.parquet"
+        manifest["tables"][table] = {"file": path.name, **export_table(conn, table, path, page_size)}
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def read_manifest(directory: Path) -> Dict:
+    return json.loads((directory / "manifest.json").read_text())
+
+
+def read_pages(path: Path, page_size: int = 5000) -> Iterator[List[Dict]]:
+    """Rows of a snapshot file in pages, jsonb columns as JSON text and embeddings as float32 arrays."""
+    snapshot = pq.ParquetFile(path)
+    names = [name for name in snapshot.schema_arrow.names if name != "embedding"]
+    for batch in snapshot.iter_batches(batch_size=page_size):
+        rows = batch.select(names).to_pylist()
+        for row, embedding in zip(rows, embedding_rows(batch.column("embedding"))):
+            row["embedding"] = embedding
+        yield rows
+
+
+def import_table(conn, table: str, path: Path, page_size: int = 5000, truncate: bool = False) -> int:
+    """COPY a snapshot file into an empty table (emptied first with `truncate`); returns the row count."""
+    identifier = sql.Identifier(table)
+    # Older snapshots can hold columns the table no longer has, e.g. workflows.n8n_demo
+    names = [name for name in pq.ParquetFile(path).schema_arrow.names
+             if name in TABLE_COLUMNS[table] or name == "embedding"]
+    rows = 0
+    with conn.transaction():
+        if truncate:
+            conn.execute(sql.SQL("truncate table {}").format(identifier))
+        elif conn.execute(sql.SQL("select exists (select 1 from {})").format(identifier)).fetchone()[0]:
+            raise ValueError(f"{table} is not empty; pass --truncate to replace its rows")
+        copy_sql = sql.SQL("copy {} ({}) from stdin").format(
+            identifier, sql.SQL(", ").join(map(sql.Identifier, names))
+        )
+        with conn.cursor().copy(copy_sql) as copy:
+            for page in read_pages(path, page_size):
+                for row in page:
+                    copy.write_row([vector_literal(row[name]) if name == "embedding" else row[name] for name in names])
+                rows += len(page)
+                print(f"{table}: imported {rows} rows")
+        # Later inserts take ids after the imported ones
+        conn.execute(
+            sql.SQL("select setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) from {}")
+            .format(identifier),
+            (table,),
+        )
+        # Inside the block, so the connection is idle again afterwards and the
+        # next table's import is its own transaction rather than a savepoint
+        conn.execute(sql.SQL("analyze {}").format(identifier))
+    return rows
+
+
+def import_mirror(directory: Path, mirror, page_size: int = 5000) -> int:
+    """Fill a SitePagesMirror from the snapshot's site_pages file; returns the rows stored.
+
+    Rows exported without an embedding are skipped, see `SitePagesMirror.load_pages`.
+    """
+    path = directory / read_manifest(directory)["tables"]["site_pages"]["file"]
+
+    def pages():
+        for page in read_pages(path, page_size):
+            for row in page:
+                row["metadata"] = json.loads(row["metadata"]) if row["metadata"] else {}
+            yield page
+
+    return mirror.load_pages(pages())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--output", "--input", dest="directory", type=Path, default=DEFAULT_SNAPSHOT_DIR,
+                        help="snapshot directory")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLE_COLUMNS), default=list(TABLE_COLUMNS))
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--truncate", action="store_true", help="replace the rows of non-empty tables on import")
+    parser.add_argument("--mirror", action="store_true", help="import site_pages into the local mirror instead")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "import" and args.mirror:
+        from site_pages_mirror import SitePagesMirror
+        mirror = SitePagesMirror(dimensions=read_manifest(args.directory)["tables"]["site_pages"]["dimensions"])
+        rows = import_mirror(args.directory, mirror, args.page_size)
+        print(f"Loaded {rows} rows into {mirror.directory} in {time.perf_counter() - started:.1f}s")
+        if mirror.skipped_without_embedding:
+            print(f"Skipped {mirror.skipped_without_embedding} rows without an embedding")
+        mirror.close()
+        return
+
+    load_dotenv()
+    with psycopg.connect(os.environ["DATABASE_URL"]) as conn:
+        if args.command == "export":
+            manifest = export_snapshot(conn, args.directory, args.tables, args.page_size)
+            rows = sum(table["rows"] for table in manifest["tables"].values())
+            print(f"Exported {rows} rows to {args.directory} in {time.perf_counter() - started:.1f}s")
+            return
+        manifest = read_manifest(args.directory)
+        for table in args.tables:
+            if table not in manifest["tables"]:
+                print(f"{table}: not in snapshot, skipped")
+                continue
+            rows = import_table(conn, table, args.directory / manifest["tables"][table]["file"],
+                                args.page_size, args.truncate)
+            print(f"{table}: {rows} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# Learned boilerplate and chunk fingerprints are kept between runs
+DEFAULT_DEDUP_DIR = Path(__file__).resolve().parents[2] / "data" / "interim" / "dedup"
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(block: str) -> str:
+    return _WHITESPACE.sub(" ", block).strip().lower()
+
+
+def _hash64(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _state_path(path: Optional[str], name: str) -> Path:
+    return Path(path or Path(os.getenv("DEDUP_STATE_DIR", DEFAULT_DEDUP_DIR)) / name)
+
+
+def _load_state(path: Path) -> Dict[str, list]:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _save_state(path: Path, state: Dict[str, list]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    partial.write_text(json.dumps(state))
+    partial.replace(path)
+
+
+class BoilerplateFilter:
+    """Learns markdown blocks repeated across crawled pages and strips them.
+
+    Pages are split into blank-line separated blocks. A block found on at least
+    `min_pages` distinct pages (navigation, footers, sidebars) is treated as
+    boilerplate and removed. Code blocks and blocks shorter than `min_chars`
+    are never removed.
+
+    The blocks of every page are remembered by URL and saved to `path`, so a
+    page re-crawled on its own loses the same blocks as in a full run. Before
+    a block has been seen on `min_pages` pages, e.g. early in the first run,
+    it is kept. When a block becomes boilerplate, or stops being boilerplate,
+    the other pages holding it are added to `displaced`; processing them again
+    gives every page the same result regardless of crawl order.
+    """
+
+    def __init__(self, min_pages: int = 3, min_chars: int = 40, path: Optional[str] = None):
+        self.min_pages = min_pages
+        self.min_chars = min_chars
+        self.path = _state_path(path, "boilerplate.json")
+        self.pages = 0
+        self.removed_blocks = 0
+        self.removed_chars = 0
+        state = _load_state(self.path)
+        # Older state files only hold {url: block keys}
+        self._page_blocks: Dict[str, List[str]] = state["pages"] if "pages" in state else state
+        self.displaced: Set[str] = set(state.get("displaced", [])) if "pages" in state else set()
+        self._seen_on: Counter = Counter(key for keys in self._page_blocks.values() for key in keys)
+
+    def strip(self, markdown: str, url: str) -> str:
+        """Record this page's blocks and return the page without known boilerplate."""
+        self.pages += 1
+        blocks = markdown.split("\n\n")
+        keys = [
+            None if len(block.strip()) < self.min_chars or block.lstrip().startswith("```")
+            else _hash64(_normalize(block)).hex()
+            for block in blocks
+        ]
+        self.displaced.discard(url)
+        old = set(self._page_blocks.get(url, []))
+        new = set(keys) - {None}
+        for key in old ^ new:
+            before = self._seen_on[key]
+            after = before + (1 if key in new else -1)
+            if (before >= self.min_pages) != (after >= self.min_pages):
+                self.displaced.update(other for other, blocks in self._page_blocks.items()
+                                      if other != url and key in blocks)
+            self._seen_on[key] = after
+        self._page_blocks[url] = sorted(new)
+
+        kept = []
+        for block, key in zip(blocks, keys):
+            if key is not None and self._seen_on[key] >= self.min_pages:
+                self.removed_blocks += 1
+                self.removed_chars += len(block)
+            else:
+                kept.append(block)
+        return "\n\n".join(kept)
+
+    def save(self):
+        _save_state(self.path, {"pages": self._page_blocks, "displaced": sorted(self.displaced)})
+
+    def stats(self) -> str:
+        return (
+            f"boilerplate: removed {self.removed_blocks} blocks ({self.removed_chars} chars) "
+            f"from {self.pages} pages"
+        )
+
+
+# Per-byte lookup tables that spread each bit of a 64-bit hash into its own
+# 16-bit lane of a big integer, so summing the spread values counts the set
+# bits of every position in one big-int addition per byte.
+_LANE_BITS = 16
+_SPREAD = [
+    [
+        sum(1 << (_LANE_BITS * (8 * position + bit)) for bit in range(8) if byte >> bit & 1)
+        for byte in range(256)
+    ]
+    for position in range(8)
+]
+_LANE_MASK = (1 << _LANE_BITS) - 1
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles."""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # Shingle counts stay far below 2**16 for any realistic chunk
+    shingles = shingles[:_LANE_MASK]
+    lanes = 0
+    for shingle in shingles:
+        digest = _hash64(shingle)
+        for position in range(8):
+            lanes += _SPREAD[position][digest[position]]
+
+    half = len(shingles) / 2
+    fingerprint = 0
+    for bit in range(64):
+        if (lanes >> (_LANE_BITS * bit)) & _LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class NearDuplicateFilter:
+    """Drops chunks whose SimHash is within `max_distance` bits of another chunk.
+
+    A chunk is dropped when a near-identical chunk comes earlier on the same
+    page, or is kept on a page whose URL sorts before this one. Kept and
+    dropped fingerprints are remembered by URL and saved to `path`, so a page
+    re-crawled on its own keeps the same chunks as in a full run and never
+    matches its own earlier chunks.
+
+    When the chunks a page keeps change, pages sorting after it with a chunk
+    near a changed one are added to `displaced`. A page crawled before a
+    lower URL holding the same text keeps its copy at first; processing the
+    displaced pages again drops it, so the result does not depend on crawl
+    order.
+
+    Fingerprints are split into `max_distance + 1` bands. Two fingerprints
+    within the distance must agree exactly on at least one band, so only
+    chunks sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = 3, path: Optional[str] = None):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.path = _state_path(path, "near_duplicates.json")
+        self.checked = 0
+        self.dropped = 0
+        # Per band: band value -> fingerprint -> URLs of the pages keeping it
+        self._buckets: List[Dict[int, Dict[int, Set[str]]]] = [defaultdict(dict) for _ in range(self.bands)]
+        self._page_fingerprints: Dict[str, List[int]] = {}
+        # The same for dropped chunks, whose page must be processed again if their original goes away
+        self._dropped_buckets: List[Dict[int, Dict[int, Set[str]]]] = [defaultdict(dict) for _ in range(self.bands)]
+        self._page_dropped: Dict[str, List[int]] = {}
+        state = _load_state(self.path)
+        # Older state files only hold {url: kept fingerprints}
+        if "kept" not in state:
+            state = {"kept": state}
+        for url, fingerprints in state["kept"].items():
+            self._remember(self._buckets, self._page_fingerprints, url, fingerprints)
+        for url, fingerprints in state.get("dropped", {}).items():
+            self._remember(self._dropped_buckets, self._page_dropped, url, fingerprints)
+        self.displaced: Set[str] = set(state.get("displaced", []))
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def _remember(self, buckets, pages: Dict[str, List[int]], url: str, fingerprints: List[int]):
+        pages[url] = fingerprints
+        for fingerprint in fingerprints:
+            for band, value in enumerate(self._band_values(fingerprint)):
+                buckets[band][value].setdefault(fingerprint, set()).add(url)
+
+    def _forget(self, buckets, pages: Dict[str, List[int]], url: str):
+        for fingerprint in pages.pop(url, []):
+            for band, value in enumerate(self._band_values(fingerprint)):
+                urls = buckets[band][value].get(fingerprint)
+                if urls is not None:
+                    urls.discard(url)
+                    if not urls:
+                        del buckets[band][value][fingerprint]
+
+    def _near(self, a: int, b: int) -> bool:
+        return bin(a ^ b).count("1") <= self.max_distance
+
+    def _near_pages(self, buckets, fingerprint: int):
+        """(fingerprint, URLs) of every remembered fingerprint near this one."""
+        for band, value in enumerate(self._band_values(fingerprint)):
+            for other, urls in buckets[band].get(value, {}).items():
+                if self._near(fingerprint, other):
+                    yield other, urls
+
+    def filter_page(self, url: str, texts: List[str]) -> List[str]:
+        """Return the page's chunks without near-duplicates, replacing what was remembered for the page."""
+        self.displaced.discard(url)
+        previous = set(self._page_fingerprints.get(url, []))
+        self._forget(self._buckets, self._page_fingerprints, url)
+        self._forget(self._dropped_buckets, self._page_dropped, url)
+        kept, fingerprints, dropped = [], [], []
+        for text in texts:
+            self.checked += 1
+            fingerprint = simhash(text)
+            if any(self._near(fingerprint, other) for other in fingerprints) or any(
+                min(urls) < url for _, urls in self._near_pages(self._buckets, fingerprint)
+            ):
+                self.dropped += 1
+                dropped.append(fingerprint)
+                continue
+            kept.append(text)
+            fingerprints.append(fingerprint)
+
+        # Later pages compared their chunks against what this page kept before
+        for changed in previous.symmetric_difference(fingerprints):
+            for buckets in (self._buckets, self._dropped_buckets):
+                for _, urls in self._near_pages(buckets, changed):
+                    self.displaced.update(other for other in urls if other > url)
+        self._remember(self._buckets, self._page_fingerprints, url, fingerprints)
+        self._remember(self._dropped_buckets, self._page_dropped, url, dropped)
+        return kept
+
+    def save(self):
+        _save_state(self.path, {
+            "kept": self._page_fingerprints,
+            "dropped": self._page_dropped,
+            "displaced": sorted(self.displaced),
+        })
+
+    def stats(self) -> str:
+        return f"near-duplicates: dropped {self.dropped} of {self.checked} chunks"
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from embedding_cache import EmbeddingCache
+from tokens import count_tokens
+
+# OpenAI embeddings endpoint limits: 2048 inputs and 300k tokens per request
+MAX_BATCH_ITEMS = 2048
+MAX_BATCH_TOKENS = 300_000
+
+
+def pack_batches(token_counts: List[int], max_items: int = MAX_BATCH_ITEMS,
+                 max_tokens: int = MAX_BATCH_TOKENS) -> List[List[int]]:
+    """Greedily pack inputs, in order, into batches under the item and token limits.
+
+    Returns lists of indexes into `token_counts`. An input larger than
+    `max_tokens` gets a batch of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, tokens in enumerate(token_counts):
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingBatcher:
+    """Collects single-text embedding requests into multi-input API calls.
+
+    Callers await `embed(text)` as if it were a single request. Texts queued by
+    concurrent callers are packed into one request once the batch is full or
+    `max_wait` seconds have passed, and each vector is routed back to its caller.
+    With a `cache`, cached texts are answered without a request and new
+    vectors are written back to it.
+    """
+
+    def __init__(
+        self,
+        embed_many: Callable[[List[str]], Awaitable[List[List[float]]]],
+        model: str = "text-embedding-3-small",
+        max_items: int = 512,
+        max_tokens: int = 250_000,
+        max_wait: float = 0.05,
+        max_concurrent_requests: int = 4,
+        dimensions: int = 1536,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.embed_many = embed_many
+        self.model = model
+        self.dimensions = dimensions
+        self.cache = cache
+        self.max_items = min(max_items, MAX_BATCH_ITEMS)
+        self.max_tokens = min(max_tokens, MAX_BATCH_TOKENS)
+        self.max_wait = max_wait
+        self.requests = 0
+        self.texts = 0
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._inflight = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its vector."""
+        if self.cache is not None:
+            cached = self.cache.get(self.model, self.dimensions, text)
+            if cached is not None:
+                return cached
+
+        tokens = count_tokens(text, self.model)
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._dispatch()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, tokens, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_items or self._pending_tokens >= self.max_tokens:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+        return await future
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts, sharing batches with any other queued callers."""
+        return list(await asyncio.gather(*[self.embed(text) for text in texts]))
+
+    async def flush(self):
+        """Send anything still queued and wait for all requests in flight."""
+        self._dispatch()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _dispatch(self):
+        """Hand the queued texts to a background request."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.ensure_future(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        """Embed one packed batch and resolve its callers' futures."""
+        async with self._semaphore:
+            try:
+                vectors = await self.embed_many([text for text, _, _ in batch])
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self.requests += 1
+            self.texts += len(batch)
+            if self.cache is not None:
+                self.cache.put_many(self.model, self.dimensions, [text for text, _, _ in batch], vectors)
+            for (_, _, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
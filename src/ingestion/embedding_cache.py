@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Local artefacts live in data/interim at the repository root
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / "data" / "interim" / "embedding_cache.sqlite3"
+
+
+class EmbeddingCache:
+    """Persistent, content-addressed embedding cache backed by SQLite.
+
+    Vectors are keyed by (model, dimensions, sha256 of the text) and stored as
+    float32 blobs. Once more than `max_entries` vectors are stored, the least
+    recently used ones are evicted.
+
+    Lookups run on the event loop, so hits only note their use time in
+    memory. The times are written with the next `put_many`, once
+    `touch_batch` hits are pending, or by `flush`.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100_000, touch_batch: int = 1000):
+        self.path = Path(path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.execute(
+            """
+            create table if not exists embeddings (
+                key blob primary key,
+                vector blob not null,
+                last_used real not null
+            )
+            """
+        )
+        self._conn.execute("create index if not exists idx_embeddings_last_used on embeddings (last_used)")
+        self._conn.commit()
+        (self._count,) = self._conn.execute("select count(*) from embeddings").fetchone()
+        self._touched: Dict[bytes, float] = {}
+
+    @staticmethod
+    def key(model: str, dimensions: int, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{dimensions}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, model: str, dimensions: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up cached vectors; missing texts come back as None."""
+        keys = [self.key(model, dimensions, text) for text in texts]
+        found = {}
+        for start in range(0, len(keys), 500):  # Stay under SQLite's bound-parameter limit
+            batch = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"select key, vector from embeddings where key in ({','.join('?' * len(batch))})", batch
+            )
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self._touched.update((key, now) for key in found)
+            if len(self._touched) >= self.touch_batch:
+                self.flush()
+
+        vectors = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                vectors.append(None)
+            else:
+                self.hits += 1
+                vectors.append(array("f", blob).tolist())
+        return vectors
+
+    def get(self, model: str, dimensions: int, text: str) -> Optional[List[float]]:
+        return self.get_many(model, dimensions, [text])[0]
+
+    def put_many(self, model: str, dimensions: int, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors as float32 blobs, evicting the least recently used beyond max_entries."""
+        now = time.time()
+        rows = {self.key(model, dimensions, text): array("f", vector).tobytes() for text, vector in zip(texts, vectors)}
+        keys = list(rows)
+        existing = 0
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            (found,) = self._conn.execute(
+                f"select count(*) from embeddings where key in ({','.join('?' * len(batch))})", batch
+            ).fetchone()
+            existing += found
+        self._conn.executemany(
+            "insert or replace into embeddings (key, vector, last_used) values (?, ?, ?)",
+            [(key, blob, now) for key, blob in rows.items()],
+        )
+        self._count += len(rows) - existing
+        self._write_touched()
+        self._evict()
+        self._conn.commit()
+
+    def flush(self):
+        """Write the use times of pending cache hits."""
+        if self._touched:
+            self._write_touched()
+            self._conn.commit()
+
+    def _write_touched(self):
+        self._conn.executemany(
+            "update embeddings set last_used = ? where key = ?",
+            [(used, key) for key, used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self):
+        if self._count <= self.max_entries:
+            return
+        # Evict down to 90% so we don't evict again on every insert
+        excess = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "delete from embeddings where key in (select key from embeddings order by last_used limit ?)",
+            (excess,),
+        )
+        self._count -= excess
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"embedding cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+    def close(self):
+        self.flush()
+        self._conn.close()
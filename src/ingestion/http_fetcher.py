@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+DEFAULT_HTTP_CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "interim" / "http_cache"
+
+# Signs that a page only renders its content with JavaScript
+_NEEDS_JS = re.compile(
+    r"<noscript>[^<]*enable javascript|<div id=\"(?:root|app|__next)\">\s*</div>",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    fetched_at: float
+
+
+class HttpCache:
+    """On-disk response cache: one gzip body and one JSON header file per URL."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("HTTP_CACHE_DIR", DEFAULT_HTTP_CACHE_DIR))
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.gz"
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = gzip.decompress(body_path.read_bytes())
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return CachedResponse(url, meta["status"], meta["headers"], body, meta["fetched_at"])
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        meta_path, body_path = self._paths(url)
+        # Write the body first so a crash never leaves headers without a body
+        body_path.write_bytes(gzip.compress(body))
+        meta_path.write_text(json.dumps({
+            "url": url, "status": status, "headers": headers, "fetched_at": time.time()
+        }))
+
+
+def html_to_markdown(html: str, base_url: str) -> str:
+    """Convert HTML with the same markdown generator the browser crawler uses."""
+    from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+    return DefaultMarkdownGenerator().generate_markdown(html, base_url=base_url).raw_markdown
+
+
+class StaticPageFetcher:
+    """Fetches static documentation pages over pooled HTTP instead of a browser.
+
+    Requests are conditional (If-None-Match / If-Modified-Since) against a
+    local response cache, so unchanged pages cost a 304. `fetch_markdown`
+    returns None when a page looks like it needs JavaScript, and the caller
+    should fall back to the browser.
+    """
+
+    def __init__(self, cache: Optional[HttpCache] = None, max_connections: int = 20,
+                 timeout: float = 30.0, min_markdown_chars: int = 200):
+        self.cache = cache or HttpCache()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.min_markdown_chars = min_markdown_chars
+        self.fetched = 0
+        self.not_modified = 0
+        self.fallbacks = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Open the pooled HTTP client."""
+        self._client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,  # HTTP/2 needs the optional h2 package
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": "clinical-agent-team-ingestion"},
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_markdown(self, url: str) -> Optional[str]:
+        """Return the page as markdown, or None if it needs the browser."""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.headers.get("etag"):
+                headers["If-None-Match"] = cached.headers["etag"]
+            if cached.headers.get("last-modified"):
+                headers["If-Modified-Since"] = cached.headers["last-modified"]
+
+        try:
+            response = await self._client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"Fast path failed for {url}: {e}")
+            return self._fallback()
+
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            body = cached.body
+            content_type = cached.headers.get("content-type", "")
+        elif response.status_code == 200:
+            self.fetched += 1
+            body = response.content
+            content_type = response.headers.get("content-type", "")
+            self.cache.put(url, 200, {
+                key: response.headers[key]
+                for key in ("etag", "last-modified", "content-type") if key in response.headers
+            }, body)
+        else:
+            return self._fallback()
+
+        if "html" not in content_type:
+            return self._fallback()
+        html = body.decode("utf-8", errors="replace")
+        if _NEEDS_JS.search(html):
+            return self._fallback()
+        # html2text is pure Python, keep it off the event loop
+        markdown = await asyncio.to_thread(html_to_markdown, html, url)
+        if len(markdown.strip()) < self.min_markdown_chars:
+            return self._fallback()
+        return markdown
+
+    def _fallback(self) -> None:
+        self.fallbacks += 1
+        return None
+
+    def stats(self) -> str:
+        return (
+            f"fast path: {self.fetched} fetched, {self.not_modified} not modified, "
+            f"{self.fallbacks} sent to the browser"
+        )
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_REJECTED_PATH = Path(__file__).resolve().parents[2] / "data" / "interim" / "n8n_rejected_workflows.json"
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of chunk content, stored in site_pages.metadata."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_site_pages_state(client, source: str, page_size: int = 1000) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Load the metadata of every stored chunk for a source as {url: {chunk_number: metadata}}."""
+    state: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    start = 0
+    while True:
+        rows = (
+            client.table("site_pages")
+            .select("id,url,chunk_number,metadata")
+            .eq("metadata->>source", source)
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        for row in rows:
+            state.setdefault(row["url"], {})[row["chunk_number"]] = row["metadata"] or {}
+        if len(rows) < page_size:
+            return state
+        start += page_size
+
+
+class ChangeTracker:
+    """Decides which pages and chunks changed since the last ingestion run.
+
+    Pages whose sitemap `<lastmod>` matches the one stored with every chunk are
+    skipped before crawling. Within a changed page, chunks whose content hash
+    matches the stored chunk at the same position skip the LLM and embedding
+    calls.
+    """
+
+    def __init__(self, stored: Dict[str, Dict[int, Dict[str, Any]]], lastmods: Dict[str, Optional[str]]):
+        self.stored = stored
+        self.lastmods = lastmods
+        self.unchanged_chunks = 0
+        self.deleted_chunks = 0
+
+    def lastmod(self, url: str) -> Optional[str]:
+        return self.lastmods.get(url)
+
+    def page_unchanged(self, url: str) -> bool:
+        """True if every chunk of the page is stored at its current sitemap lastmod."""
+        lastmod = self.lastmods.get(url)
+        chunks = self.stored.get(url)
+        if not lastmod or not chunks:
+            return False
+        # A chunk that failed to store leaves a gap, so the page is processed again
+        counts = {metadata.get("chunk_count") for metadata in chunks.values()}
+        if len(counts) != 1 or set(chunks) != set(range(counts.pop() or 0)):
+            return False
+        return all(metadata.get("lastmod") == lastmod for metadata in chunks.values())
+
+    def chunk_unchanged(self, url: str, chunk_number: int, chunk_hash: str) -> bool:
+        """True if the stored chunk at this position has identical content."""
+        metadata = self.stored.get(url, {}).get(chunk_number)
+        return metadata is not None and metadata.get("content_hash") == chunk_hash
+
+    def stored_metadata(self, url: str, chunk_number: int) -> Dict[str, Any]:
+        return self.stored.get(url, {}).get(chunk_number, {})
+
+    def stale_chunk_numbers(self, url: str, chunk_count: int) -> List[int]:
+        """Stored chunk numbers beyond the page's new chunk count."""
+        return sorted(n for n in self.stored.get(url, {}) if n >= chunk_count)
+
+    def record_stored(self, url: str, chunk_number: int, metadata: Dict[str, Any]):
+        """Remember a chunk stored during this run, for pages processed twice."""
+        self.stored.setdefault(url, {})[chunk_number] = metadata
+
+    def forget_chunks(self, url: str, chunk_numbers: List[int]):
+        """Forget chunks deleted during this run."""
+        for chunk_number in chunk_numbers:
+            self.stored.get(url, {}).pop(chunk_number, None)
+
+
+def load_workflow_hashes(client, page_size: int = 1000) -> Dict[int, Optional[str]]:
+    """Load {workflow_id: content_hash} for every stored n8n workflow."""
+    hashes: Dict[int, Optional[str]] = {}
+    start = 0
+    while True:
+        rows = (
+            client.table("workflows")
+            # Only the hash, not the stored workflow JSON
+            .select("workflow_id,content_hash:metadata->>content_hash")
+            .order("workflow_id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        for row in rows:
+            hashes[row["workflow_id"]] = row.get("content_hash")
+        if len(rows) < page_size:
+            return hashes
+        start += page_size
+
+
+class RejectedWorkflows:
+    """{workflow_id: content_hash} of templates judged BAD, kept between runs.
+
+    Only GOOD templates are stored in Supabase, so without this list every
+    rejected template would go back to the LLM on each run. A template is
+    only skipped while its content hash is unchanged. The file is rewritten
+    on every change, so rejections survive an interrupted run.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.getenv("N8N_REJECTED_PATH", DEFAULT_REJECTED_PATH))
+        self.skipped = 0
+        self._hashes: Dict[int, str] = (
+            {int(key): value for key, value in json.loads(self.path.read_text()).items()}
+            if self.path.exists() else {}
+        )
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def skip(self, workflow_id: int, workflow_hash: str) -> bool:
+        """True if this exact template content was rejected before."""
+        if self._hashes.get(workflow_id) == workflow_hash:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, workflow_id: int, workflow_hash: str, verdict: str):
+        """Remember a BAD verdict, or forget an earlier one once the template is GOOD."""
+        if verdict == "GOOD":
+            if self._hashes.pop(workflow_id, None) is None:
+                return
+        elif self._hashes.get(workflow_id) == workflow_hash:
+            return
+        else:
+            self._hashes[workflow_id] = workflow_hash
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(self.path.name + ".partial")
+        partial.write_text(json.dumps(self._hashes))
+        partial.replace(self.path)
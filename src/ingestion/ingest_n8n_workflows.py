@@ -3,66 +3,244 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_anthropic import ChatAnthropic
 from supabase import create_client, Client
 from dotenv import load_dotenv
-import requests
+from pydantic import BaseModel, Field
+from typing import Literal
+import importlib.util
+import asyncio
+import httpx
 import json
 import time
 import os
+from pathlib import Path
+
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from http_fetcher import HttpCache
+from incremental import RejectedWorkflows, content_hash, load_workflow_hashes
+from journal import IngestJournal
+from pipeline import Stage, run_pipeline, print_pipeline_stats
+from rate_limiter import RETRYABLE_STATUS, AdaptiveLimiter
+from supabase_writer import BatchUpsertWriter
+from tokens import count_tokens
+from workflow_compaction import WorkflowCompactor
+from workflow_prefilter import WorkflowPrefilter
 
 load_dotenv()
 model = os.getenv('LLM_MODEL', 'gpt-4o')
 embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+# Shortened text-embedding-3 vectors; must match the workflows.embedding column
+embedding_dimensions = int(os.getenv('EMBEDDING_DIMENSIONS', '1536'))
 supabase_url = os.getenv('SUPABASE_URL')
 supabase_service_secret = os.getenv('SUPABASE_SERVICE_KEY')
+n8n_templates_url = os.getenv('N8N_TEMPLATES_URL', 'https://api.n8n.io/api/templates')
+# Verdict and analysis in one structured call; set to "false" for the four-call flow
+combined_analysis = os.getenv('N8N_COMBINED_ANALYSIS', 'true').lower() != 'false'
+# Token cap for the compacted workflow JSON sent in prompts
+prompt_max_tokens = int(os.getenv('N8N_PROMPT_MAX_TOKENS', '4000'))
+# Raw template responses are cached on disk: templates for N8N_TEMPLATE_TTL_HOURS,
+# 404s for N8N_MISSING_TTL_HOURS. N8N_OFFLINE=true never touches the network.
+template_ttl = float(os.getenv('N8N_TEMPLATE_TTL_HOURS', '24')) * 3600
+missing_ttl = float(os.getenv('N8N_MISSING_TTL_HOURS', '24')) * 3600
+offline = os.getenv('N8N_OFFLINE', 'false').lower() == 'true'
+# How template ids are found: "search" pages through the catalogue, "manifest"
+# reads N8N_ID_MANIFEST, "scan" probes ids 1..max_id
+discovery_mode = os.getenv('N8N_DISCOVERY', 'search').lower()
+id_manifest_path = Path(os.getenv(
+    'N8N_ID_MANIFEST', Path(__file__).resolve().parents[2] / "data" / "interim" / "n8n_template_ids.json"
+))
 
 # Initialize OpenAI, OpenAI Client for embeddings, and Supabase clients
-llm = ChatOpenAI(model=model) if "gpt" in model.lower() else ChatAnthropic(model=model)
-embeddings = OpenAIEmbeddings(model=embedding_model, dimensions=1536)
+# Retries are left to the limiters below so they can see every 429
+llm = ChatOpenAI(model=model, max_retries=0) if "gpt" in model.lower() else ChatAnthropic(model=model, max_retries=0)
+embeddings = OpenAIEmbeddings(model=embedding_model, dimensions=embedding_dimensions, max_retries=0)
+embedding_cache = EmbeddingCache()
+template_cache = HttpCache()
+template_cache_stats = {"cached": 0, "not_modified": 0, "downloaded": 0}
 supabase: Client = create_client(supabase_url, supabase_service_secret)
 
-def fetch_workflow(workflow_id):
+# Template requests are paced to N8N_RPM per minute (default 600) instead of a fixed sleep
+template_limiter = AdaptiveLimiter(
+    "n8n templates",
+    initial_concurrency=8,
+    max_concurrency=float(os.getenv('N8N_MAX_CONCURRENCY', '32')),
+    requests_per_minute=float(os.getenv('N8N_RPM', '600')),
+)
+llm_limiter = AdaptiveLimiter.from_env("llm", "LLM")
+embedding_limiter = AdaptiveLimiter.from_env("embedding", "OPENAI_EMBEDDING")
+
+def templates_client():
+    """
+    Creates the pooled keep-alive HTTP client used for template requests.
+
+    Returns:
+        httpx.AsyncClient: Client reusing connections across requests, over HTTP/2 when h2 is installed
+    """
+    max_connections = int(template_limiter.max_concurrency)
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=30.0,
+        headers={"User-Agent": "clinical-agent-team-ingestion"},
+    )
+
+async def fetch_workflow(client, workflow_id):
     """
     Retrieves n8n workflow template from their public API.
 
+    Responses, including 404s, are cached on disk. A fresh cached response is
+    returned without a request; an expired one is revalidated with a
+    conditional request when the API sent an ETag or Last-Modified. In
+    offline mode only the cache is used, whatever its age.
+
+    Rate limits and server errors are retried by the template limiter and
+    raise once its retries are exhausted.
+
     Args:
+        client: Pooled httpx.AsyncClient from templates_client()
         workflow_id: Identifier of the workflow template to fetch
 
     Returns:
-        dict: Workflow template data if found, None if not found or on error
+        dict: Workflow template data if found, None if not found
     """    
-    url = f"https://api.n8n.io/api/templates/workflows/{workflow_id}"
-    response = requests.get(url)
+    url = f"{n8n_templates_url}/workflows/{workflow_id}"
+    cached = template_cache.get(url)
+    if cached is not None:
+        ttl = template_ttl if cached.status == 200 else missing_ttl
+        if offline or time.time() - cached.fetched_at < ttl:
+            template_cache_stats["cached"] += 1
+            return json.loads(cached.body) if cached.status == 200 else None
+    if offline:
+        return None
+
+    headers = {}
+    if cached is not None and cached.status == 200:
+        if cached.headers.get("etag"):
+            headers["If-None-Match"] = cached.headers["etag"]
+        if cached.headers.get("last-modified"):
+            headers["If-Modified-Since"] = cached.headers["last-modified"]
+
+    async def get():
+        response = await client.get(url, headers=headers)
+        if response.status_code in RETRYABLE_STATUS:
+            response.raise_for_status()
+        return response
+
+    # Only network requests count against the template rate limit
+    response = await template_limiter.call(get)
+    if response.status_code == 304 and headers:
+        template_cache_stats["not_modified"] += 1
+        template_cache.put(url, 200, cached.headers, cached.body)
+        return json.loads(cached.body)
     if response.status_code == 200:
+        template_cache_stats["downloaded"] += 1
+        template_cache.put(url, 200, {
+            key: response.headers[key] for key in ("etag", "last-modified") if key in response.headers
+        }, response.content)
         return response.json()
+    if response.status_code == 404:
+        template_cache.put(url, 404, {}, b"")
     return None
 
-def process_workflow(workflow_data):
+async def search_workflow_ids(client, rows=100):
     """
-    Converts n8n workflow data into an HTML component string.
-    
-    Takes raw workflow data, escapes special characters, and wraps in n8n-demo 
-    component tags.
+    Enumerates every template id from the paginated template search endpoint.
 
     Args:
-        workflow_data: Dictionary containing workflow template data from n8n API
+        client: Pooled httpx.AsyncClient from templates_client()
+        rows: Templates per page
 
     Returns:
-        str: HTML component string with escaped workflow data,
-            None if workflow_data is invalid
+        list[int]: Sorted template ids
+    """
+    ids = set()
+    page = 1
+    while True:
+        async def get():
+            response = await client.get(f"{n8n_templates_url}/search", params={"page": page, "rows": rows})
+            response.raise_for_status()
+            return response
 
-    Example:
-        "<n8n-demo workflow='{\"nodes\":[...]}></n8n-demo>"
-    """    
-    if workflow_data and 'workflow' in workflow_data and 'workflow' in workflow_data['workflow']:
-        workflow = workflow_data['workflow']['workflow']
-        # Convert the workflow to a JSON string
-        workflow_json = json.dumps(workflow)
-        # Escape single quotes in the JSON string
-        workflow_json_escaped = workflow_json.replace("'", "\\'")
-        # Create the n8n-demo component string
-        return f"<n8n-demo workflow='{workflow_json_escaped}'></n8n-demo>"
-    return None
+        data = (await template_limiter.call(get)).json()
+        found = [workflow["id"] for workflow in data.get("workflows", [])]
+        ids.update(found)
+        # totalWorkflows is not always present, a short page is the reliable end
+        if len(found) < rows:
+            return sorted(ids)
+        page += 1
+
+def read_id_manifest(path=None):
+    """
+    Reads template ids from a manifest: a JSON list, or one id per line.
+
+    Args:
+        path: Manifest file, N8N_ID_MANIFEST by default
+
+    Returns:
+        list[int]: Sorted template ids, None if the manifest does not exist
+    """
+    path = Path(path or id_manifest_path)
+    if not path.exists():
+        return None
+    text = path.read_text().strip()
+    ids = json.loads(text) if text.startswith("[") else [line for line in text.splitlines() if line.strip()]
+    return sorted({int(workflow_id) for workflow_id in ids})
+
+def write_id_manifest(ids, path=None):
+    """
+    Saves discovered template ids so offline and manifest runs can reuse them.
 
-def check_workflow_legitimacy(workflow_json):
+    Args:
+        ids: Template ids
+        path: Manifest file, N8N_ID_MANIFEST by default
+    """
+    path = Path(path or id_manifest_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(sorted(ids)))
+
+async def discover_workflow_ids(client):
+    """
+    Lists the template ids to ingest according to N8N_DISCOVERY.
+
+    Search results are written to the id manifest. Offline runs and a failed
+    search fall back to the manifest.
+
+    Args:
+        client: Pooled httpx.AsyncClient from templates_client()
+
+    Returns:
+        list[int]: Template ids, or None to scan ids sequentially
+    """
+    if discovery_mode == "scan":
+        return None
+    if discovery_mode == "search" and not offline:
+        try:
+            ids = await search_workflow_ids(client)
+            write_id_manifest(ids)
+            print(f"Discovered {len(ids)} templates in the catalogue")
+            return ids
+        except Exception as e:
+            print(f"Template search failed, using the id manifest: {e}")
+    ids = read_id_manifest()
+    if ids is None:
+        print(f"No id manifest at {id_manifest_path}, scanning ids")
+    else:
+        print(f"Read {len(ids)} template ids from {id_manifest_path}")
+    return ids
+
+async def ask_llm(prompt):
+    """
+    Sends one prompt to the LLM through the shared rate limiter.
+
+    Args:
+        prompt: Prompt text
+
+    Returns:
+        str: Content of the model's reply
+    """
+    response = await llm_limiter.call(llm.ainvoke, [HumanMessage(content=prompt)], tokens=count_tokens(prompt))
+    return response.content
+
+async def check_workflow_legitimacy(workflow_json):
     """
     Uses LLM to assess if an n8n workflow is legitimate vs test/spam.
     
@@ -83,9 +261,9 @@ def check_workflow_legitimacy(workflow_json):
 
     Output (GOOD/BAD):
     """
-    return llm.invoke([HumanMessage(content=legitimacy_prompt)]).content.strip()
+    return (await ask_llm(legitimacy_prompt)).strip()
 
-def analyze_workflow(workflow_json):
+async def analyze_workflow(workflow_json):
     """
     Uses LLM to perform comprehensive workflow analysis.
 
@@ -120,49 +298,141 @@ def analyze_workflow(workflow_json):
         """
     ]
     
-    results = []
-    for summary_prompt in summary_prompts:
-        results.append(llm.invoke([HumanMessage(content=summary_prompt)]).content)
-    
-    return results
+    # The three analyses are independent, so they run concurrently
+    return list(await asyncio.gather(*[ask_llm(summary_prompt) for summary_prompt in summary_prompts]))
+
+class WorkflowAssessment(BaseModel):
+    """Legitimacy verdict and analysis of one workflow, returned by a single LLM call."""
+    verdict: Literal["GOOD", "BAD"] = Field(description="GOOD for a legitimate workflow, BAD for a test/spam one")
+    summary_accomplishment: str = Field(description="What the workflow is accomplishing; empty if BAD")
+    summary_nodes: str = Field(description="All the nodes used and how they are connected; empty if BAD")
+    summary_suggestions: str = Field(
+        description="Similar workflows that could be made using this one as an example, "
+                    "with different services but similar setups, and ways it could be expanded; empty if BAD"
+    )
 
-def generate_embedding(text):
+try:
+    structured_llm = llm.with_structured_output(WorkflowAssessment)
+except NotImplementedError:
+    structured_llm = None
+
+async def assess_workflow(workflow_json, verdict=None):
     """
-    Creates vector embedding from text using configured embedding model.
+    Checks legitimacy and analyzes a workflow, sending its JSON to the LLM once.
+
+    One structured-output call returns the verdict and all three summaries, and
+    the model is told to leave the summaries empty for BAD workflows. Models
+    without structured output, or a reply that fails validation, fall back to
+    check_workflow_legitimacy followed by the concurrent analyze_workflow. A
+    GOOD reply with an empty summary falls back to analyze_workflow alone.
+
+    A verdict already known from the prefilter skips the legitimacy check:
+    BAD needs no LLM call at all, and GOOD only needs the analysis calls when
+    the single structured call is not in use.
 
     Args:
-        text: String to generate embedding for
+        workflow_json: JSON string containing the n8n workflow data
+        verdict: 'GOOD' or 'BAD' if already decided, None to ask the LLM
 
     Returns:
-        list[float]: Vector embedding of input text
-    """    
-    return embeddings.embed_query(text)
+        tuple: (verdict, summaries) where verdict is 'GOOD' or 'BAD' and
+            summaries is [purpose_summary, node_analysis, expansion_suggestions],
+            or None for BAD workflows
+    """
+    if verdict == "BAD":
+        return "BAD", None
+    if combined_analysis and structured_llm is not None:
+        assessment_prompt = f"""
+        You are an expert in n8n workflows. Analyze the following workflow JSON.
+        First decide if it's a legitimate workflow (GOOD) or a test/spam one (BAD).
+        If it is BAD, leave all summaries empty.
+        If it is GOOD, summarize what the workflow is accomplishing, summarize all the nodes used
+        and how they are connected, and suggest similar workflows that could be made using this as
+        an example, considering different services but similar setups and ways it could be expanded.
+
+        Workflow JSON:
+        {workflow_json}
+        """
+        try:
+            assessment = await llm_limiter.call(
+                structured_llm.ainvoke, [HumanMessage(content=assessment_prompt)],
+                tokens=count_tokens(assessment_prompt),
+            )
+        except (NotImplementedError, ValueError) as e:
+            # ValueError covers replies that fail WorkflowAssessment validation
+            print(f"Structured assessment failed, falling back to separate calls: {e}")
+        else:
+            if assessment.verdict != "GOOD":
+                return "BAD", None
+            summaries = [assessment.summary_accomplishment, assessment.summary_nodes, assessment.summary_suggestions]
+            if all(summary.strip() for summary in summaries):
+                return "GOOD", summaries
+            # An empty summary would be embedded as is; treat it like a validation failure
+            print("Structured assessment returned empty summaries, falling back to separate calls")
+            verdict = "GOOD"
+
+    legitimacy = verdict or await check_workflow_legitimacy(workflow_json)
+    if legitimacy != "GOOD":
+        return legitimacy, None
+    return legitimacy, await analyze_workflow(workflow_json)
+
 
-def store_in_supabase(workflow_id, workflow_name, workflow_description, workflow_info, workflow_json, n8n_demo, summaries):
+async def embed_documents(texts):
     """
-    Stores workflow data and generated analysis in Supabase.
+    Embeds one packed batch of texts through the embedding rate limiter.
 
-    Combines LLM-generated summaries, creates embedding, and stores complete workflow
-    record with metadata.
+    Args:
+        texts: List of strings to embed in a single request
+
+    Returns:
+        list[list[float]]: Vector embeddings in the same order as texts
+    """
+    tokens = sum(count_tokens(text, embedding_model) for text in texts)
+    return await embedding_limiter.call(embeddings.aembed_documents, texts, tokens=tokens)
+
+# Cached texts skip the API; the rest share packed multi-input requests
+embedding_batcher = EmbeddingBatcher(
+    embed_documents, model=embedding_model, dimensions=embedding_dimensions, cache=embedding_cache
+)
+
+async def generate_embeddings(texts):
+    """
+    Creates vector embeddings for many texts with as few requests as possible.
+
+    Cached texts are served from the local embedding cache. The rest are packed
+    into multi-input requests under the embeddings API item and token limits.
+
+    Args:
+        texts: List of strings to generate embeddings for
+
+    Returns:
+        list[list[float]]: Vector embeddings in the same order as texts
+    """
+    return await embedding_batcher.embed_texts(texts)
+
+def workflow_row(workflow_id, workflow_name, workflow_description, workflow_json, summaries, embedding, content_hash=None):
+    """
+    Builds the workflows table row for an analyzed workflow.
 
     Args:
         workflow_id: Unique identifier for the workflow
         workflow_name: Name of the workflow
         workflow_description: Description of the workflow
-        workflow_info: Additional workflow information
         workflow_json: Raw workflow JSON data
-        n8n_demo: HTML component string for workflow visualization
         summaries: List of three LLM-generated summaries [accomplishment, nodes, suggestions]
-    """    
+        embedding: Embedding of the combined summaries
+        content_hash: Hash of the template content, used to skip it while unchanged
+
+    Returns:
+        dict: Row for the workflows table
+    """
     combined_summaries = "\n\n".join(summaries)
-    embedding = generate_embedding(combined_summaries)
-    
-    data = {
+    return {
         "workflow_id": workflow_id,
         "workflow_name": workflow_name,
         "workflow_description": workflow_description,
-        "workflow_json": workflow_json,
-        "n8n_demo": n8n_demo,
+        # jsonb column; not repeated in metadata (see supabase/workflows.sql)
+        "workflow_json": json.loads(workflow_json),
         "summary_accomplishment": summaries[0],
         "summary_nodes": summaries[1],
         "summary_suggestions": summaries[2],
@@ -172,72 +442,195 @@ def store_in_supabase(workflow_id, workflow_name, workflow_description, workflow
             "workflow_id": workflow_id,
             "workflow_name": workflow_name,
             "workflow_description": workflow_description,
-            "n8n_demo": n8n_demo,
-            "workflow_json": json.loads(workflow_json)            
+            "content_hash": content_hash,
         }
     }
-    supabase.table("workflows").insert(data).execute()
 
-def main():
+def workflow_content_hash(template):
+    """
+    Hashes the parts of a template that feed the analysis.
+
+    Args:
+        template: The 'workflow' object of a template API response
+
+    Returns:
+        str: sha256 hex digest of the name, description and workflow JSON
+    """
+    return content_hash(json.dumps(
+        [template.get('name'), template.get('description'), template.get('workflow')], sort_keys=True
+    ))
+
+async def store_pending(pending, writer):
+    """
+    Embeds buffered workflows in packed batches and queues them for upsert.
+
+    Args:
+        pending: List of workflow_row keyword argument dicts awaiting embeddings
+        writer: BatchUpsertWriter for the workflows table
+    """
+    if not pending:
+        return
+    texts = ["\n\n".join(workflow["summaries"]) for workflow in pending]
+    for workflow, embedding in zip(pending, await generate_embeddings(texts)):
+        await writer.add(workflow_row(**workflow, embedding=embedding))
+
+async def main(max_id=2500, fetch_workers=32, analysis_workers=16, embedding_batch_size=50):
     """
     Processes n8n workflow templates and stores them in Supabase.
     
-    Iterates through workflow IDs in n8n workflow library:
-    1. Fetches workflow template
-    2. Checks legitimacy using LLM
-    3. For legitimate workflows:
-        - Processes into n8n-demo component
-        - Generates LLM analysis summaries
-        - Stores in Supabase with embeddings
-    4. Stops after [max_consecutive_failures] consecutive failures
-    
+    Lists template IDs from the catalogue search (or an id manifest) and
+    streams them through concurrent stages:
+    1. Fetches workflow templates over a pooled keep-alive client
+    2. Settles clear-cut legitimacy cases with rule-based prefilter, then
+       checks legitimacy and generates LLM analysis summaries, in one
+       structured call unless N8N_COMBINED_ANALYSIS=false
+    3. Embeds [embedding_batch_size] legitimate workflows at a time and
+       upserts them in Supabase; match_workflows builds the n8n-demo
+       component from the stored workflow JSON
+    4. When scanning IDs instead (N8N_DISCOVERY=scan or nothing discovered),
+       stops [max_consecutive_failures] past the last workflow found
+
+    Fetching, analysis and storage overlap, so template requests continue
+    while earlier workflows wait on the LLM.
+
+    Templates whose content hash matches the stored row, or a template
+    rejected in an earlier run, are skipped right after the fetch, so re-runs
+    only pay LLM and embedding calls for new or changed templates. Rows are
+    upserted on workflow_id.
+
+    Progress is journaled per workflow id. If a run is interrupted, the next
+    run resumes it: stored, rejected and missing ids are skipped and recorded
+    verdicts and analyses are reused instead of calling the LLM again.
+
+    Args:
+        max_id: Highest workflow template id to try when scanning
+        fetch_workers: Concurrent template requests (also capped by the template limiter)
+        analysis_workers: Workflows analyzed by the LLM at once
+        embedding_batch_size: Workflows embedded and stored per batch
+
     Rate limits:
-        - 0.5s delay between requests
+        - N8N_RPM template requests per minute, LLM_RPM/LLM_TPM for the LLM
         - Max [max_consecutive_failures] consecutive failures
+
+    Returns:
+        dict: Per-stage pipeline statistics
     """    
-    max_id = 2500
-    consecutive_failures = 0
     max_consecutive_failures = 1000
+    last_found = 0
+    journal = IngestJournal("n8n_workflows")
+    if journal.resumed:
+        print(f"Resuming interrupted run: {journal.count('stored')} workflows already stored")
+    compactor = WorkflowCompactor(prompt_max_tokens, model)
+    prefilter = WorkflowPrefilter(saves_on_accept=not combined_analysis)
+    stored_hashes = load_workflow_hashes(supabase)
+    rejected = RejectedWorkflows()
+    print(f"{len(stored_hashes)} workflows already stored, {len(rejected)} rejected before")
+    unchanged = 0
 
-    for workflow_id in range(1, max_id + 1):
-        workflow_data = fetch_workflow(workflow_id)
-        
-        if workflow_data:
-            workflow_name = json.dumps(workflow_data['workflow']['name'])
-            workflow_description = json.dumps(workflow_data['workflow']['description'])
-            workflow_json = json.dumps(workflow_data['workflow']['workflow'])
-            workflow_info = f"Name: {workflow_name}\nDescription: {workflow_description}\n\nJSON:\n{workflow_json}"
-
-            # print(json.dumps(workflow_data['workflow'], indent=2))
-            # print(process_workflow(workflow_data))
-            # continue
-
-            try:
-                legitimacy = check_workflow_legitimacy(workflow_info)
-            except:
-                continue
-            print(legitimacy)
-            
-            if legitimacy == "GOOD":
-                n8n_demo = process_workflow(workflow_data)
-                summaries = analyze_workflow(workflow_info)
-                
-                print(f"ID: {workflow_id}")
-                print(n8n_demo)
-                for summary in summaries:
-                    print(summary)
-                print()
-                
-                store_in_supabase(workflow_id, workflow_name, workflow_description, workflow_info, workflow_json, n8n_demo, summaries)
-            
-            consecutive_failures = 0
-        else:
-            consecutive_failures += 1
-            if consecutive_failures >= max_consecutive_failures:
+    async def workflow_ids():
+        nonlocal last_found
+        for workflow_id in known_ids if known_ids is not None else range(1, max_id + 1):
+            if known_ids is None and workflow_id - last_found > max_consecutive_failures:
                 print(f"Reached {max_consecutive_failures} consecutive failures. Stopping.")
-                break
-        
-        time.sleep(0.5)
+                return
+            key = str(workflow_id)
+            if journal.done(key, "stored") or journal.get(key, "verdict") not in (None, "GOOD"):
+                last_found = max(last_found, workflow_id)
+                continue
+            yield workflow_id
+
+    async def fetch(workflow_id):
+        nonlocal last_found, unchanged
+        key = str(workflow_id)
+        if journal.done(key, "missing"):
+            return None
+        try:
+            workflow_data = await fetch_workflow(client, workflow_id)
+        except Exception as e:
+            # Counted as a failed fetch and not journaled, so the run stays
+            # open and a resumed run tries it again
+            print(f"Failed to fetch workflow {workflow_id}: {e}")
+            raise
+        if not workflow_data:
+            journal.record(key, "missing")
+            return None
+        last_found = max(last_found, workflow_id)
+        workflow_hash = workflow_content_hash(workflow_data['workflow'])
+        if stored_hashes.get(workflow_id) == workflow_hash:
+            unchanged += 1
+            return None
+        if rejected.skip(workflow_id, workflow_hash):
+            return None
+        return workflow_id, workflow_data, workflow_hash
+
+    async def analyze(item):
+        workflow_id, workflow_data, workflow_hash = item
+        key = str(workflow_id)
+        workflow_name = json.dumps(workflow_data['workflow']['name'])
+        workflow_description = json.dumps(workflow_data['workflow']['description'])
+        workflow_json = json.dumps(workflow_data['workflow']['workflow'])
+        # Prompts get the compacted JSON; the full JSON is still stored
+        compact_json = compactor.compact(workflow_data['workflow']['workflow'], workflow_id)
+        workflow_info = f"Name: {workflow_name}\nDescription: {workflow_description}\n\nJSON:\n{compact_json}"
+
+        legitimacy = journal.get(key, "verdict")
+        summaries = journal.get(key, "analysis")
+        if legitimacy is None:
+            verdict = prefilter.classify(workflow_data['workflow'], workflow_id)
+            legitimacy, summaries = await assess_workflow(workflow_info, verdict)
+            journal.record(key, "verdict", legitimacy)
+            if summaries is not None:
+                journal.record(key, "analysis", summaries)
+        rejected.record(workflow_id, workflow_hash, legitimacy)
+        print(f"ID: {workflow_id} {legitimacy}")
+        if legitimacy != "GOOD":
+            return None
+
+        if summaries is None:
+            summaries = await analyze_workflow(workflow_info)
+            journal.record(key, "analysis", summaries)
+        return {
+            "workflow_id": workflow_id,
+            "workflow_name": workflow_name,
+            "workflow_description": workflow_description,
+            "workflow_json": workflow_json,
+            "summaries": summaries,
+            "content_hash": workflow_hash,
+        }
+
+    def on_written(rows):
+        for row in rows:
+            journal.record(str(row["workflow_id"]), "stored")
+
+    async def store(batch):
+        await store_pending(batch, writer)
+        return batch
+
+    async with templates_client() as client, BatchUpsertWriter(
+        supabase, "workflows", on_conflict="workflow_id", batch_size=embedding_batch_size, on_written=on_written
+    ) as writer:
+        known_ids = await discover_workflow_ids(client)
+        stats = await run_pipeline(workflow_ids(), [
+            Stage("fetch", fetch, workers=fetch_workers),
+            Stage("analyze", analyze, workers=analysis_workers),
+            Stage("store", store, batch_size=embedding_batch_size, batch_wait=5.0),
+        ])
+
+    print_pipeline_stats(stats)
+    print(f"Skipped {unchanged} unchanged workflows and {rejected.skipped} rejected before")
+    print(f"Upserted {writer.written} workflows in {writer.requests} requests, {len(writer.failed)} failed")
+    print(compactor.stats())
+    print(prefilter.stats())
+    print(f"template cache: {template_cache_stats}")
+    print(template_limiter.stats())
+    print(llm_limiter.stats())
+    print(embedding_limiter.stats())
+    embedding_cache.flush()
+    print(embedding_cache.stats())
+    # Leave the run open after failures so the next run resumes it
+    if not writer.failed and not any(s.failed for s in stats.values()):
+        journal.finish()
+    return stats
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -4,7 +4,7 @@ import json
 import asyncio
 import requests
 from xml.etree import ElementTree
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from urllib.parse import urlparse
@@ -12,16 +12,34 @@ from dotenv import load_dotenv
 
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from openai import AsyncOpenAI
+from pydantic import BaseModel, ValidationError
 from supabase import create_client, Client
 
+from chunking import iter_chunks
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from http_fetcher import StaticPageFetcher
+from dedup import BoilerplateFilter, NearDuplicateFilter
+from incremental import ChangeTracker, content_hash, load_site_pages_state
+from journal import IngestJournal
+from pipeline import Stage, StageStats, run_pipeline, print_pipeline_stats
+from rate_limiter import AdaptiveLimiter
+from supabase_writer import BatchUpsertWriter
+from tokens import count_tokens
+
 load_dotenv()
 
 # Initialize OpenAI and Supabase clients
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are left to the limiters below so they can see every 429
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 supabase: Client = create_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
+PYDANTIC_AI_SITEMAP_URL = os.getenv("PYDANTIC_AI_SITEMAP_URL", "https://ai.pydantic.dev/sitemap.xml")
+# text-embedding-3 vectors can be shortened (Matryoshka); site_pages.embedding
+# must be declared with the same number of dimensions
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
 
 @dataclass
 class ProcessedChunk:
@@ -33,50 +51,13 @@ class ProcessedChunk:
     metadata: Dict[str, Any]
     embedding: List[float]
 
-def chunk_text(text: str, chunk_size: int = 5000) -> List[str]:
-    """Split text into chunks, respecting code blocks and paragraphs."""
-    chunks = []
-    start = 0
-    text_length = len(text)
-
-    while start < text_length:
-        # Calculate end position
-        end = start + chunk_size
-
-        # If we're at the end of the text, just take what's left
-        if end >= text_length:
-            chunks.append(text[start:].strip())
-            break
-
-        # Try to find a code block boundary first (```)
-        chunk = text[start:end]
-        code_block = chunk.rfind('```')
-        if code_block != -1 and code_block > chunk_size * 0.3:
-            end = start + code_block
-
-        # If no code block, try to break at a paragraph
-        elif '\n\n' in chunk:
-            # Find the last paragraph break
-            last_break = chunk.rfind('\n\n')
-            if last_break > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_break
-
-        # If no paragraph break, try to break at a sentence
-        elif '. ' in chunk:
-            # Find the last sentence break
-            last_period = chunk.rfind('. ')
-            if last_period > chunk_size * 0.3:  # Only break if we're past 30% of chunk_size
-                end = start + last_period + 1
-
-        # Extract chunk and clean it up
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-
-        # Move start position for next chunk
-        start = max(start + 1, end)
-
-    return chunks
+def chunk_text(text: str, max_tokens: int = 1250, overlap_tokens: int = 0) -> List[str]:
+    """Split text into token-sized chunks, respecting code blocks and paragraphs."""
+    return list(iter_chunks(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens))
+
+# Separate request/token budgets for chat and embeddings, sized from observed 429s
+chat_limiter = AdaptiveLimiter.from_env("chat", "OPENAI_CHAT")
+embedding_limiter = AdaptiveLimiter.from_env("embeddings", "OPENAI_EMBEDDING", initial_concurrency=2)
 
 async def get_title_and_summary(chunk: str, url: str) -> Dict[str, str]:
     """Extract title and summary using GPT-4."""
@@ -86,99 +67,357 @@ async def get_title_and_summary(chunk: str, url: str) -> Dict[str, str]:
     For the summary: Create a concise summary of the main points in this chunk.
     Keep both title and summary concise but informative."""
     
+    user_prompt = f"URL: {url}\n\nContent:\n{chunk[:1000]}..."  # Send first 1000 chars for context
+    response = await chat_limiter.call(
+        openai_client.chat.completions.create,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={ "type": "json_object" },
+        tokens=count_tokens(system_prompt + user_prompt) + 200
+    )
+    extracted = json.loads(response.choices[0].message.content)
+    if not extracted.get("title") or not extracted.get("summary"):
+        raise ValueError(f"Missing title or summary in response for {url}")
+    return extracted
+
+class ChunkSummary(BaseModel):
+    index: int
+    title: str
+    summary: str
+
+class ChunkSummaries(BaseModel):
+    items: List[ChunkSummary]
+
+# Strict JSON schema for the batched response, one item per chunk index
+CHUNK_SUMMARIES_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "chunk_summaries",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "title": {"type": "string"},
+                            "summary": {"type": "string"}
+                        },
+                        "required": ["index", "title", "summary"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["items"],
+            "additionalProperties": False
+        }
+    }
+}
+
+async def get_titles_and_summaries(chunks: List[Tuple[str, str]], max_chars: int = 1000) -> List[Optional[Dict[str, str]]]:
+    """Extract titles and summaries for several (chunk, url) pairs in one GPT-4 request.
+
+    Returns one result per input; items the response is missing or got wrong
+    come back as None so the caller can retry just those.
+    """
+    system_prompt = """You are an AI that extracts titles and summaries from documentation chunks.
+    You will receive several chunks, each wrapped in a <chunk index="..."> tag.
+    Return a JSON object with an 'items' array holding one object per chunk with its 'index', 'title' and 'summary'.
+    For the title: If this seems like the start of a document, extract its title. If it's a middle chunk, derive a descriptive title.
+    For the summary: Create a concise summary of the main points in this chunk.
+    Keep both title and summary concise but informative."""
+
+    user_prompt = "\n\n".join(
+        f'<chunk index="{i}" url="{url}">\n{chunk[:max_chars]}\n</chunk>'
+        for i, (chunk, url) in enumerate(chunks)
+    )
+    response = await chat_limiter.call(
+        openai_client.chat.completions.create,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format=CHUNK_SUMMARIES_FORMAT,
+        tokens=count_tokens(system_prompt + user_prompt) + 200 * len(chunks)
+    )
+
+    results: List[Optional[Dict[str, str]]] = [None] * len(chunks)
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"URL: {url}\n\nContent:\n{chunk[:1000]}..."}  # Send first 1000 chars for context
-            ],
-            response_format={ "type": "json_object" }
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        print(f"Error getting title and summary: {e}")
-        return {"title": "Error processing title", "summary": "Error processing summary"}
+        parsed = ChunkSummaries.model_validate_json(response.choices[0].message.content or "")
+    except ValidationError as e:
+        print(f"Invalid batched summary response: {e}")
+        return results
+    for item in parsed.items:
+        if 0 <= item.index < len(chunks) and item.title and item.summary:
+            results[item.index] = {"title": item.title, "summary": item.summary}
+    return results
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed a batch of texts in a single OpenAI request."""
+    response = await embedding_limiter.call(
+        openai_client.embeddings.create,
+        model="text-embedding-3-small",
+        input=texts,
+        dimensions=EMBEDDING_DIMENSIONS,
+        tokens=sum(count_tokens(text) for text in texts)
+    )
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+# Packs concurrent get_embedding calls into multi-input requests, skipping cached texts
+embedding_cache = EmbeddingCache()
+embedding_batcher = EmbeddingBatcher(
+    embed_texts, model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSIONS, cache=embedding_cache
+)
 
 async def get_embedding(text: str) -> List[float]:
-    """Get embedding vector from OpenAI."""
-    try:
-        response = await openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error getting embedding: {e}")
-        return [0] * 1536  # Return zero vector on error
+    """Get embedding vector from OpenAI, batched with other concurrent calls.
 
-async def process_chunk(chunk: str, chunk_number: int, url: str) -> ProcessedChunk:
-    """Process a single chunk of text."""
-    # Get title and summary
-    extracted = await get_title_and_summary(chunk, url)
-    
-    # Get embedding
-    embedding = await get_embedding(chunk)
-    
-    # Create metadata
+    Raises once retries are exhausted rather than returning a placeholder
+    vector, so a failed chunk is never stored and is picked up next run.
+    """
+    return await embedding_batcher.embed(text)
+
+def new_chunk(chunk: str, chunk_number: int, url: str, lastmod: Optional[str] = None,
+              chunk_count: Optional[int] = None) -> ProcessedChunk:
+    """Wrap a raw chunk in a ProcessedChunk awaiting its title, summary and embedding."""
     metadata = {
         "source": "pydantic_ai_docs",
         "chunk_size": len(chunk),
         "crawled_at": datetime.now(timezone.utc).isoformat(),
-        "url_path": urlparse(url).path
+        "url_path": urlparse(url).path,
+        "content_hash": content_hash(chunk),
+        "lastmod": lastmod,
+        "chunk_count": chunk_count
     }
-    
+
     return ProcessedChunk(
         url=url,
         chunk_number=chunk_number,
-        title=extracted['title'],
-        summary=extracted['summary'],
+        title="",
+        summary="",
         content=chunk,  # Store the original chunk content
         metadata=metadata,
-        embedding=embedding
+        embedding=[]
     )
 
-async def insert_chunk(chunk: ProcessedChunk):
-    """Insert or update a processed chunk in Supabase."""
-    try:
-        data = {
-            "url": chunk.url,
-            "chunk_number": chunk.chunk_number,
-            "title": chunk.title,
-            "summary": chunk.summary,
-            "content": chunk.content,
-            "metadata": chunk.metadata,
-            "embedding": chunk.embedding
-        }
-        
-        result = supabase.table("site_pages").upsert(data).execute()
-        print(f"Upserted chunk {chunk.chunk_number} for {chunk.url}")
-        return result
-    except Exception as e:
-        print(f"Error upserting chunk: {e}")
-        return None
+async def summarize_chunk(chunk: ProcessedChunk) -> ProcessedChunk:
+    """Pipeline stage: fill in the chunk's title and summary."""
+    if chunk.title:
+        return chunk
+    extracted = await get_title_and_summary(chunk.content, chunk.url)
+    chunk.title = extracted['title']
+    chunk.summary = extracted['summary']
+    return chunk
 
-async def process_and_store_document(url: str, markdown: str):
-    """Process a document and store its chunks in parallel."""
-    # Split into chunks
-    chunks = chunk_text(markdown)
-    
-    # Process chunks in parallel
-    tasks = [
-        process_chunk(chunk, i, url) 
-        for i, chunk in enumerate(chunks)
+async def summarize_chunks(chunks: List[ProcessedChunk]) -> List[Optional[ProcessedChunk]]:
+    """Pipeline stage: fill in titles and summaries for a batch of chunks in one request.
+
+    Chunks the batched response does not cover fall back to one request each;
+    chunks that still fail come back as None and are dropped. Chunks that
+    already have a title (e.g. restored from the journal) are passed through.
+    """
+    extracted: List[Optional[Dict[str, str]]] = [
+        {"title": chunk.title, "summary": chunk.summary} if chunk.title else None for chunk in chunks
     ]
-    processed_chunks = await asyncio.gather(*tasks)
-    
-    # Store chunks in parallel
-    insert_tasks = [
-        insert_chunk(chunk) 
-        for chunk in processed_chunks
+    todo = [i for i, result in enumerate(extracted) if result is None]
+    if todo:
+        try:
+            batch = await get_titles_and_summaries([(chunks[i].content, chunks[i].url) for i in todo])
+        except Exception as e:
+            print(f"Error getting batched titles and summaries: {e}")
+            batch = [None] * len(todo)
+        for i, result in zip(todo, batch):
+            extracted[i] = result
+
+    missing = [i for i, result in enumerate(extracted) if result is None]
+    fallbacks = await asyncio.gather(
+        *[get_title_and_summary(chunks[i].content, chunks[i].url) for i in missing],
+        return_exceptions=True
+    )
+    for i, result in zip(missing, fallbacks):
+        if isinstance(result, Exception):
+            print(f"Error getting title and summary for chunk {chunks[i].chunk_number} of {chunks[i].url}: {result}")
+        else:
+            extracted[i] = result
+
+    summarized = []
+    for chunk, result in zip(chunks, extracted):
+        if result is None:
+            summarized.append(None)
+            continue
+        chunk.title = result['title']
+        chunk.summary = result['summary']
+        summarized.append(chunk)
+    return summarized
+
+async def embed_chunk(chunk: ProcessedChunk) -> ProcessedChunk:
+    """Pipeline stage: fill in the chunk's embedding."""
+    if not chunk.embedding:
+        chunk.embedding = await get_embedding(chunk.content)
+    return chunk
+
+def chunk_row(chunk: ProcessedChunk) -> Dict[str, Any]:
+    """Convert a processed chunk into a site_pages row."""
+    return {
+        "url": chunk.url,
+        "chunk_number": chunk.chunk_number,
+        "title": chunk.title,
+        "summary": chunk.summary,
+        "content": chunk.content,
+        "metadata": chunk.metadata,
+        "embedding": chunk.embedding
+    }
+
+def site_pages_writer(on_written=None) -> BatchUpsertWriter:
+    """Create a batched, non-blocking upsert writer for site_pages."""
+    return BatchUpsertWriter(supabase, "site_pages", on_conflict="url,chunk_number", on_written=on_written)
+
+def journal_key(chunk: ProcessedChunk) -> str:
+    """Journal key of a chunk: its URL plus content hash, so edited content is never reused."""
+    return f"{chunk.url}#{chunk.metadata['content_hash']}"
+
+def chunk_stages(writer: BatchUpsertWriter, summary_workers: int = 4, embedding_workers: int = 64,
+                 store_workers: int = 1, summary_batch_size: int = 8,
+                 journal: Optional[IngestJournal] = None) -> List[Stage]:
+    """Build the summarize, embed and upsert stages shared by all entry points.
+
+    With `summary_batch_size` above 1, each summarize request covers several
+    chunks. With a `journal`, summaries and embeddings are recorded as they
+    are produced and restored for chunks an interrupted run already paid for.
+    """
+    async def store_chunk(chunk: ProcessedChunk) -> ProcessedChunk:
+        await writer.add(chunk_row(chunk))
+        return chunk
+
+    summarize = (
+        Stage("summarize", summarize_chunks, workers=summary_workers, batch_size=summary_batch_size)
+        if summary_batch_size > 1 else Stage("summarize", summarize_chunk, workers=summary_workers)
+    )
+    embed = Stage("embed", embed_chunk, workers=embedding_workers)
+    if journal is None:
+        return [summarize, embed, Stage("upsert", store_chunk, workers=store_workers)]
+
+    async def restore_chunk(chunk: ProcessedChunk) -> ProcessedChunk:
+        saved = journal.get(journal_key(chunk), "summary")
+        if saved:
+            chunk.title, chunk.summary = saved["title"], saved["summary"]
+        chunk.embedding = journal.get_vector(journal_key(chunk), "embedding") or []
+        return chunk
+
+    def recorded(func, record):
+        async def run(payload):
+            result = await func(payload)
+            for chunk in result if isinstance(result, list) else [result]:
+                if chunk is not None:
+                    record(chunk)
+            return result
+        return run
+
+    summarize.func = recorded(summarize.func, lambda chunk: journal.record(
+        journal_key(chunk), "summary", {"title": chunk.title, "summary": chunk.summary}
+    ))
+    embed.func = recorded(embed.func, lambda chunk: journal.record(
+        journal_key(chunk), "embedding", vector=chunk.embedding
+    ))
+    return [
+        Stage("restore", restore_chunk),
+        summarize,
+        embed,
+        Stage("upsert", store_chunk, workers=store_workers),
     ]
-    await asyncio.gather(*insert_tasks)
 
-async def crawl_parallel(urls: List[str], max_concurrent: int = 5):
-    """Crawl multiple URLs in parallel with a concurrency limit."""
+def skip_unchanged_chunks(tracker: ChangeTracker, url: str, chunks: List[ProcessedChunk]) -> List[ProcessedChunk]:
+    """Drop chunks whose content is already stored and delete chunks the page no longer has.
+
+    Unchanged chunks only get their stored lastmod and chunk count refreshed,
+    in one call per page, so the page can be skipped entirely on the next run
+    once its other chunks are stored. Returns the chunks that still need work.
+    """
+    changed = []
+    refresh = []
+    for chunk in chunks:
+        if not tracker.chunk_unchanged(url, chunk.chunk_number, chunk.metadata["content_hash"]):
+            changed.append(chunk)
+            continue
+        tracker.unchanged_chunks += 1
+        stored = tracker.stored_metadata(url, chunk.chunk_number)
+        if (stored.get("lastmod"), stored.get("chunk_count")) != (chunk.metadata["lastmod"], len(chunks)):
+            refresh.append(chunk.chunk_number)
+    if refresh:
+        supabase.rpc("refresh_site_pages_lastmod", {
+            "page_url": url, "page_lastmod": chunks[0].metadata["lastmod"],
+            "page_chunk_count": len(chunks), "chunk_numbers": refresh,
+        }).execute()
+        for chunk_number in refresh:
+            tracker.stored_metadata(url, chunk_number).update(
+                lastmod=chunks[0].metadata["lastmod"], chunk_count=len(chunks)
+            )
+
+    stale = tracker.stale_chunk_numbers(url, len(chunks))
+    if stale:
+        supabase.table("site_pages").delete().eq("url", url).gte("chunk_number", len(chunks)).execute()
+        tracker.forget_chunks(url, stale)
+        tracker.deleted_chunks += len(stale)
+        print(f"Deleted {len(stale)} stale chunks for {url}")
+    return changed
+
+async def process_and_store_document(url: str, markdown: str) -> Dict[str, StageStats]:
+    """Process a document and store its chunks through the bounded chunk stages."""
+    texts = chunk_text(markdown)
+    chunks = [new_chunk(chunk, i, url, chunk_count=len(texts)) for i, chunk in enumerate(texts)]
+    async with site_pages_writer() as writer:
+        return await run_pipeline(chunks, chunk_stages(writer))
+
+async def crawl_parallel(
+    urls: List[str],
+    max_concurrent: int = 16,
+    max_browser_pages: int = 5,
+    summary_workers: int = 10,
+    embedding_workers: int = 256,
+    store_workers: int = 2,
+    queue_size: int = 100,
+    tracker: Optional[ChangeTracker] = None,
+    summary_batch_size: int = 8,
+    dedupe: bool = True,
+    fast_path: bool = True,
+    journal: Optional[IngestJournal] = None,
+) -> Dict[str, StageStats]:
+    """Crawl, chunk, summarize, embed and store URLs as a streaming pipeline.
+
+    Each stage has its own worker count and stages are joined by queues holding
+    at most `queue_size` items, so a page with many chunks cannot flood the
+    OpenAI or Supabase stages. Embedding workers only wait on the shared
+    batcher, so many of them are needed to fill multi-input requests.
+
+    With a `tracker`, chunks whose content is already stored skip the
+    summarize, embed and upsert stages. With `dedupe`, blocks repeated across
+    pages (navigation, footers) are stripped before chunking and near-duplicate
+    chunks are dropped before they reach the LLM. What the filters learn is
+    saved in data/interim, so a run that re-crawls a few pages chunks them
+    exactly like a full run.
+
+    With `fast_path`, pages are fetched over pooled HTTP with conditional
+    requests and converted to markdown directly. Headless Chromium is only
+    started for pages that need JavaScript, at most `max_browser_pages` at a time.
+
+    With `dedupe`, pages whose result depends on a page processed after them,
+    e.g. a page keeping a chunk that a lower URL also holds, are processed
+    again once the pipeline has drained, so the stored chunks do not depend
+    on crawl order. Pages that cannot be processed again are saved with the
+    filters and added to the next run.
+
+    With a `journal`, a URL is recorded once all of its chunks are stored and
+    skipped when an interrupted run is resumed.
+
+    Returns the per-stage statistics of the pipeline.
+    """
     browser_config = BrowserConfig(
         headless=True,
         verbose=False,
@@ -186,35 +425,126 @@ async def crawl_parallel(urls: List[str], max_concurrent: int = 5):
     )
     crawl_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
 
-    # Create the crawler instance
-    crawler = AsyncWebCrawler(config=browser_config)
-    await crawler.start()
+    # The browser is only started once a page actually needs it
+    crawler: Optional[AsyncWebCrawler] = None
+    crawler_lock = asyncio.Lock()
+    browser_slots = asyncio.Semaphore(max_browser_pages)
+
+    async def get_crawler() -> AsyncWebCrawler:
+        nonlocal crawler
+        async with crawler_lock:
+            if crawler is None:
+                crawler = AsyncWebCrawler(config=browser_config)
+                await crawler.start()
+        return crawler
+
+    # Chunks stored by this run, so pages processed again skip what they
+    # already stored and delete the chunks they no longer have
+    if tracker is None:
+        tracker = ChangeTracker({}, {})
+    # Chunks of each URL still waiting to be stored
+    pending: Dict[str, int] = {}
+    # URLs processed again after the first pass, and those split during it
+    rechecking: Set[str] = set()
+    split: Set[str] = set()
 
+    def on_written(rows: List[Dict[str, Any]]):
+        for row in rows:
+            tracker.record_stored(row["url"], row["chunk_number"], row["metadata"])
+            if journal is None:
+                continue
+            pending[row["url"]] -= 1
+            if pending[row["url"]] == 0:
+                journal.record(row["url"], "stored")
+
+    async def crawl_url(url: str):
+        if journal is not None and url not in rechecking and journal.done(url, "stored"):
+            print(f"Already ingested in the interrupted run: {url}")
+            return None
+        if fetcher is not None:
+            markdown = await fetcher.fetch_markdown(url)
+            if markdown is not None:
+                print(f"Successfully fetched: {url}")
+                return url, markdown
+
+        async with browser_slots:
+            result = await (await get_crawler()).arun(url=url, config=crawl_config)
+        if result.success:
+            print(f"Successfully crawled: {url}")
+            return url, result.markdown_v2.raw_markdown
+        print(f"Failed: {url} - Error: {result.error_message}")
+        return None
+
+    boilerplate = BoilerplateFilter()
+    near_duplicates = NearDuplicateFilter()
+    if dedupe:
+        # Pages left displaced by an earlier run
+        urls = list(urls) + sorted((boilerplate.displaced | near_duplicates.displaced) - set(urls))
+
+    async def split_page(page):
+        url, markdown = page
+        split.add(url)
+        lastmod = tracker.lastmod(url)
+        texts = chunk_text(boilerplate.strip(markdown, url) if dedupe else markdown)
+        if dedupe:
+            texts = near_duplicates.filter_page(url, texts)
+        chunks = [new_chunk(chunk, i, url, lastmod, len(texts)) for i, chunk in enumerate(texts)]
+        chunks = await asyncio.to_thread(skip_unchanged_chunks, tracker, url, chunks)
+        if journal is not None:
+            pending[url] = len(chunks)
+            if not chunks:
+                journal.record(url, "stored")
+        return chunks
+
+    fetcher = StaticPageFetcher() if fast_path else None
     try:
-        # Create a semaphore to limit concurrency
-        semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def process_url(url: str):
-            async with semaphore:
-                result = await crawler.arun(
-                    url=url,
-                    config=crawl_config,
-                    session_id="session1"
-                )
-                if result.success:
-                    print(f"Successfully crawled: {url}")
-                    await process_and_store_document(url, result.markdown_v2.raw_markdown)
-                else:
-                    print(f"Failed: {url} - Error: {result.error_message}")
-        
-        # Process all URLs in parallel with limited concurrency
-        await asyncio.gather(*[process_url(url) for url in urls])
+        if fetcher is not None:
+            await fetcher.start()
+        async with site_pages_writer(on_written) as writer:
+            stages = [
+                Stage("crawl", crawl_url, workers=max_concurrent),
+                Stage("chunk", split_page, fan_out=True),
+                *chunk_stages(writer, summary_workers, embedding_workers, store_workers,
+                              summary_batch_size, journal),
+            ]
+            stats = await run_pipeline(urls, stages, queue_size=queue_size)
+            # Pages run concurrently, so one pass can displace pages again;
+            # pages that fail to crawl stay displaced for the next run
+            unreachable: Set[str] = set()
+            while dedupe:
+                rechecking = (boilerplate.displaced | near_duplicates.displaced) - unreachable
+                if not rechecking:
+                    break
+                print(f"Processing {len(rechecking)} pages again after deduplication changes")
+                split.clear()
+                await writer.flush()
+                print_pipeline_stats(await run_pipeline(sorted(rechecking), stages, queue_size=queue_size))
+                unreachable |= rechecking - split
+        if dedupe:
+            boilerplate.save()
+            near_duplicates.save()
+        print_pipeline_stats(stats)
+        if fetcher is not None:
+            print(fetcher.stats())
+        print(f"Embedded {embedding_batcher.texts} texts in {embedding_batcher.requests} requests")
+        if dedupe:
+            print(boilerplate.stats())
+            print(near_duplicates.stats())
+        embedding_cache.flush()
+        print(embedding_cache.stats())
+        print(chat_limiter.stats())
+        print(embedding_limiter.stats())
+        print(f"Upserted {writer.written} chunks in {writer.requests} requests, {len(writer.failed)} failed")
+        print(f"Skipped {tracker.unchanged_chunks} unchanged chunks, deleted {tracker.deleted_chunks} stale chunks")
+        return stats
     finally:
-        await crawler.close()
+        if fetcher is not None:
+            await fetcher.close()
+        if crawler is not None:
+            await crawler.close()
 
-def get_pydantic_ai_docs_urls() -> List[str]:
-    """Get URLs from Pydantic AI docs sitemap."""
-    sitemap_url = "https://ai.pydantic.dev/sitemap.xml"
+def get_pydantic_ai_docs_sitemap(sitemap_url: str = PYDANTIC_AI_SITEMAP_URL) -> Dict[str, Optional[str]]:
+    """Get URLs and their <lastmod> dates from Pydantic AI docs sitemap."""
     try:
         response = requests.get(sitemap_url)
         response.raise_for_status()
@@ -222,24 +552,53 @@ def get_pydantic_ai_docs_urls() -> List[str]:
         # Parse the XML
         root = ElementTree.fromstring(response.content)
         
-        # Extract all URLs from the sitemap
+        # Extract all URLs, and their lastmod where present, from the sitemap
         namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-        urls = [loc.text for loc in root.findall('.//ns:loc', namespace)]
+        entries = {}
+        for url in root.findall('.//ns:url', namespace):
+            loc = url.find('ns:loc', namespace)
+            lastmod = url.find('ns:lastmod', namespace)
+            if loc is not None and loc.text:
+                entries[loc.text.strip()] = lastmod.text.strip() if lastmod is not None and lastmod.text else None
         
-        return urls
+        return entries
     except Exception as e:
         print(f"Error fetching sitemap: {e}")
-        return []
+        return {}
+
+def get_pydantic_ai_docs_urls() -> List[str]:
+    """Get URLs from Pydantic AI docs sitemap."""
+    return list(get_pydantic_ai_docs_sitemap())
 
 async def main():
     # Get URLs from Pydantic AI docs
-    urls = get_pydantic_ai_docs_urls()
-    if not urls:
+    sitemap = get_pydantic_ai_docs_sitemap()
+    if not sitemap:
         print("No URLs found to crawl")
         return
+
+    # Only crawl pages that changed since the last run
+    tracker = ChangeTracker(load_site_pages_state(supabase, "pydantic_ai_docs"), sitemap)
+    urls = [url for url in sitemap if not tracker.page_unchanged(url)]
+    print(f"Found {len(sitemap)} URLs, {len(sitemap) - len(urls)} unchanged since last run")
+    if not urls:
+        return
     
-    print(f"Found {len(urls)} URLs to crawl")
-    await crawl_parallel(urls)
+    # Resume an interrupted run instead of paying for its work again
+    journal = IngestJournal("pydantic_ai_docs")
+    if journal.resumed:
+        print(f"Resuming interrupted run: {journal.count('stored')} URLs already ingested")
+
+    print(f"Crawling {len(urls)} URLs")
+    await crawl_parallel(urls, tracker=tracker, journal=journal)
+    # Leave the run open after failures so the next run resumes it. A URL is
+    # only recorded once every chunk is stored, which also covers failed
+    # crawls and chunks dropped by the summarize stage.
+    incomplete = [url for url in urls if not journal.done(url, "stored")]
+    if incomplete:
+        print(f"{len(incomplete)} URLs were not fully ingested; the next run resumes them")
+    else:
+        journal.finish()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+from typing import Any, List, Optional
+
+DEFAULT_JOURNAL_PATH = Path(__file__).resolve().parents[2] / "data" / "interim" / "ingest_journal.sqlite3"
+
+
+class IngestJournal:
+    """Crash-safe record of which items of an ingestion run finished which stage.
+
+    A run stays open until `finish()` is called. Starting a journal for a
+    source whose last run never finished resumes that run, so work recorded
+    by the interrupted process (summaries, embeddings, stored items) is
+    reused instead of paid for again. Every record is committed immediately.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None):
+        self.source = source
+        self.path = Path(path or os.getenv("INGEST_JOURNAL_PATH", DEFAULT_JOURNAL_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(
+            """
+            create table if not exists runs (
+                id integer primary key autoincrement,
+                source text not null,
+                started_at real not null,
+                finished_at real
+            );
+            create table if not exists items (
+                run_id integer not null references runs (id),
+                item_key text not null,
+                stage text not null,
+                payload text,
+                vector blob,
+                updated_at real not null,
+                primary key (run_id, item_key, stage)
+            );
+            """
+        )
+        row = self._conn.execute(
+            "select id from runs where source = ? and finished_at is null order by id desc limit 1",
+            (source,),
+        ).fetchone()
+        self.resumed = row is not None
+        if row is not None:
+            self.run_id = row[0]
+        else:
+            self.run_id = self._conn.execute(
+                "insert into runs (source, started_at) values (?, ?)", (source, time.time())
+            ).lastrowid
+        self._conn.commit()
+
+    def done(self, item_key: str, stage: str) -> bool:
+        return self._conn.execute(
+            "select 1 from items where run_id = ? and item_key = ? and stage = ?",
+            (self.run_id, item_key, stage),
+        ).fetchone() is not None
+
+    def get(self, item_key: str, stage: str) -> Optional[Any]:
+        """Return the JSON payload recorded for an item's stage, or None."""
+        row = self._conn.execute(
+            "select payload from items where run_id = ? and item_key = ? and stage = ?",
+            (self.run_id, item_key, stage),
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def get_vector(self, item_key: str, stage: str) -> Optional[List[float]]:
+        """Return the float32 vector recorded for an item's stage, or None."""
+        row = self._conn.execute(
+            "select vector from items where run_id = ? and item_key = ? and stage = ?",
+            (self.run_id, item_key, stage),
+        ).fetchone()
+        return array("f", row[0]).tolist() if row and row[0] is not None else None
+
+    def record(self, item_key: str, stage: str, payload: Any = None, vector: Optional[List[float]] = None):
+        """Mark an item's stage complete, optionally keeping its intermediate result."""
+        self._conn.execute(
+            "insert or replace into items (run_id, item_key, stage, payload, vector, updated_at) "
+            "values (?, ?, ?, ?, ?, ?)",
+            (
+                self.run_id,
+                item_key,
+                stage,
+                None if payload is None else json.dumps(payload),
+                None if vector is None else array("f", vector).tobytes(),
+                time.time(),
+            ),
+        )
+        self._conn.commit()
+
+    def count(self, stage: str) -> int:
+        (count,) = self._conn.execute(
+            "select count(*) from items where run_id = ? and stage = ?", (self.run_id, stage)
+        ).fetchone()
+        return count
+
+    def finish(self):
+        """Close the run and drop its items; the next run starts from scratch."""
+        self._conn.execute("update runs set finished_at = ? where id = ?", (time.time(), self.run_id))
+        self._conn.execute("delete from items where run_id = ?", (self.run_id,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
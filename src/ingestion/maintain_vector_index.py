@@ -0,0 +1,195 @@
+"""Rebuild the vector index of site_pages (or workflows) after bulk ingestion.
+
+Picks HNSW or IVFFlat and their parameters from the number of embedded rows,
+builds the new index concurrently, swaps it in for the old one, sets the
+query-time search parameter on the match functions of the table and logs
+the build in vector_index_builds.
+
+Usage:
+    python src/ingestion/maintain_vector_index.py [--table site_pages] [--method auto|hnsw|ivfflat] [--dry-run]
+
+Needs DATABASE_URL, the Postgres connection string of the Supabase project.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import psycopg
+from dotenv import load_dotenv
+from psycopg import sql
+
+# Above this many rows IVFFlat is chosen: HNSW build time and memory grow quickly
+HNSW_MAX_ROWS = int(os.getenv("HNSW_MAX_ROWS", "2000000"))
+
+
+@dataclass
+class IndexPlan:
+    method: str
+    build_params: Dict[str, int]
+    # Query-time setting applied to the match function, e.g. {"ivfflat.probes": 10}
+    search_params: Dict[str, int] = field(default_factory=dict)
+
+    def with_clause(self) -> sql.Composable:
+        return sql.SQL(", ").join(
+            sql.SQL("{} = {}").format(sql.Identifier(key), sql.Literal(value))
+            for key, value in self.build_params.items()
+        )
+
+
+def plan_index(rows: int, method: str = "auto") -> IndexPlan:
+    """Choose the index type and parameters for a table with `rows` embeddings.
+
+    Follows the pgvector guidance: IVFFlat with rows/1000 lists up to 1M rows
+    and sqrt(rows) beyond, probing sqrt(lists); HNSW with m=16 and
+    ef_construction=64, raised for large tables where recall drops.
+    """
+    if method == "auto":
+        method = "hnsw" if rows <= HNSW_MAX_ROWS else "ivfflat"
+    if method == "hnsw":
+        large = rows > 1_000_000
+        return IndexPlan(
+            "hnsw",
+            {"m": 24 if large else 16, "ef_construction": 128 if large else 64},
+            {"hnsw.ef_search": 100 if large else 40},
+        )
+    if method == "ivfflat":
+        lists = max(1, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))
+        return IndexPlan("ivfflat", {"lists": lists}, {"ivfflat.probes": max(1, round(math.sqrt(lists)))})
+    raise ValueError(f"Unknown index method: {method}")
+
+
+def count_embedded_rows(conn, table: str, column: str) -> int:
+    (rows,) = conn.execute(
+        sql.SQL("select count(*) from {} where {} is not null").format(sql.Identifier(table), sql.Identifier(column))
+    ).fetchone()
+    return rows
+
+
+def vector_indexes(conn, table: str, column: str) -> List[str]:
+    """Names of the existing ivfflat/hnsw indexes on the column."""
+    rows = conn.execute(
+        """
+        select indexname from pg_indexes
+        where schemaname = current_schema() and tablename = %s
+          and indexdef ~* '(ivfflat|hnsw)' and indexdef ~ %s
+        """,
+        (table, rf"\({column} "),
+    ).fetchall()
+    return [name for (name,) in rows]
+
+
+def rebuild_index(conn, table: str, column: str, plan: IndexPlan,
+                  opclass: str = "vector_cosine_ops") -> float:
+    """Build the planned index concurrently, then drop the old ones and take their name.
+
+    Returns the build time in seconds. `conn` must be in autocommit mode,
+    since concurrent index builds cannot run inside a transaction.
+    """
+    final_name = f"{table}_{column}_idx"
+    new_name = f"{final_name}_new"
+    # Left behind by an interrupted build, possibly invalid
+    conn.execute(sql.SQL("drop index concurrently if exists {}").format(sql.Identifier(new_name)))
+    old = vector_indexes(conn, table, column)
+
+    # Builds are much faster when the graph or lists fit in memory
+    conn.execute(sql.SQL("set maintenance_work_mem = {}").format(
+        sql.Literal(os.getenv("INDEX_MAINTENANCE_WORK_MEM", "1GB"))
+    ))
+    started = time.perf_counter()
+    conn.execute(sql.SQL("create index concurrently {} on {} using {} ({} {}) with ({})").format(
+        sql.Identifier(new_name), sql.Identifier(table), sql.SQL(plan.method),
+        sql.Identifier(column), sql.SQL(opclass), plan.with_clause(),
+    ))
+    build_seconds = time.perf_counter() - started
+
+    for name in old:
+        conn.execute(sql.SQL("drop index concurrently if exists {}").format(sql.Identifier(name)))
+    conn.execute(sql.SQL("alter index {} rename to {}").format(sql.Identifier(new_name), sql.Identifier(final_name)))
+    conn.execute(sql.SQL("analyze {}").format(sql.Identifier(table)))
+    return build_seconds
+
+
+def match_functions(conn, function: str) -> List[str]:
+    """Signatures of `function` and its variants named `function`_*, e.g. match_site_pages_batch."""
+    rows = conn.execute(
+        """
+        select p.oid::regprocedure::text from pg_proc p
+        join pg_namespace n on n.oid = p.pronamespace
+        where n.nspname = current_schema() and (p.proname = %s or p.proname like %s)
+        order by 1
+        """,
+        (function, function.replace("_", r"\_") + r"\_%"),
+    ).fetchall()
+    return [signature for (signature,) in rows]
+
+
+def apply_search_params(conn, function: str, plan: IndexPlan) -> List[str]:
+    """Pin the query-time search parameter on the match functions, resetting the other method's.
+
+    Every overload of `function` and of its `function`_* variants is tuned,
+    since they all scan the same index. Returns the tuned signatures.
+    """
+    signatures = match_functions(conn, function)
+    for signature in signatures:
+        for setting in ("hnsw.ef_search", "ivfflat.probes"):
+            if setting in plan.search_params:
+                conn.execute(sql.SQL("alter function {} set {} = {}").format(
+                    sql.SQL(signature), sql.SQL(setting), sql.Literal(plan.search_params[setting])
+                ))
+            else:
+                conn.execute(sql.SQL("alter function {} reset {}").format(sql.SQL(signature), sql.SQL(setting)))
+    return signatures
+
+
+def record_build(conn, table: str, plan: IndexPlan, rows: int, build_seconds: float):
+    conn.execute(
+        """
+        create table if not exists vector_index_builds (
+            id bigserial primary key,
+            table_name text not null,
+            method text not null,
+            build_params jsonb not null,
+            search_params jsonb not null,
+            row_count bigint not null,
+            build_seconds double precision not null,
+            built_at timestamp with time zone default timezone('utc'::text, now()) not null
+        )
+        """
+    )
+    conn.execute(
+        "insert into vector_index_builds (table_name, method, build_params, search_params, row_count, build_seconds) "
+        "values (%s, %s, %s, %s, %s, %s)",
+        (table, plan.method, json.dumps(plan.build_params), json.dumps(plan.search_params), rows, build_seconds),
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table", default="site_pages")
+    parser.add_argument("--column", default="embedding")
+    parser.add_argument("--function", help="match function to tune with its _* variants, match_<table> by default")
+    parser.add_argument("--method", choices=["auto", "hnsw", "ivfflat"], default="auto")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without touching the database")
+    args = parser.parse_args(argv)
+    function = args.function or f"match_{args.table}"
+
+    load_dotenv()
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        rows = count_embedded_rows(conn, args.table, args.column)
+        plan = plan_index(rows, args.method)
+        print(f"{args.table}: {rows} embedded rows -> {plan.method} {plan.build_params}, search {plan.search_params}")
+        if args.dry_run:
+            return
+        build_seconds = rebuild_index(conn, args.table, args.column, plan)
+        tuned = apply_search_params(conn, function, plan)
+        record_build(conn, args.table, plan, rows, build_seconds)
+        print(f"Built {plan.method} index on {args.table}.{args.column} in {build_seconds:.1f}s")
+        print(f"Search parameters set on {', '.join(tuned) or 'no match functions'}")
+
+
+if __name__ == "__main__":
+    main()
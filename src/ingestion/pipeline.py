@@ -0,0 +1,176 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# Marks the end of a stage's input queue
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """A named pipeline step run by a fixed number of workers.
+
+    `func` receives one item and returns the item to pass downstream, or None
+    to drop it. With `fan_out=True` it returns an iterable of items instead.
+    With `batch_size > 1` it receives a list of up to `batch_size` items,
+    collected for at most `batch_wait` seconds, and returns a list of results
+    in which None entries are dropped.
+    """
+    name: str
+    func: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    fan_out: bool = False
+    batch_size: int = 1
+    batch_wait: float = 0.1
+
+
+@dataclass
+class StageStats:
+    name: str
+    received: int = 0
+    emitted: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    latencies: List[float] = field(default_factory=list)
+
+    def percentile(self, q: float) -> float:
+        """Latency of one `func` call at quantile `q` (0-1), in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _feed(source: Union[Iterable[Any], AsyncIterable[Any]], queue: asyncio.Queue):
+    """Push every source item into the first stage's queue."""
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            await queue.put(item)
+    else:
+        for item in source:
+            await queue.put(item)
+
+
+async def _next_batch(stage: Stage, inbox: asyncio.Queue) -> Tuple[List[Any], bool]:
+    """Wait for one item, then collect more until the batch is full or batch_wait passes.
+
+    Returns the batch and whether the end marker was reached.
+    """
+    item = await inbox.get()
+    if item is _DONE:
+        return [], True
+    batch = [item]
+    deadline = time.monotonic() + stage.batch_wait
+    while len(batch) < stage.batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(inbox.get(), remaining)
+        except asyncio.TimeoutError:
+            break
+        if item is _DONE:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+async def _worker(stage: Stage, stats: StageStats, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+    """Consume items until the end marker, forwarding results downstream."""
+    done = False
+    while not done:
+        if stage.batch_size > 1:
+            batch, done = await _next_batch(stage, inbox)
+            if not batch:
+                return
+            payload = batch
+        else:
+            payload = await inbox.get()
+            if payload is _DONE:
+                return
+            batch = [payload]
+        stats.received += len(batch)
+        started = time.perf_counter()
+        try:
+            result = await stage.func(payload)
+        except Exception as e:
+            stats.failed += len(batch)
+            if len(stats.errors) < 20:  # Keep a sample, not every failure
+                stats.errors.append(str(e))
+            print(f"[{stage.name}] error: {e}")
+            continue
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.busy_seconds += elapsed
+            stats.latencies.append(elapsed)
+
+        if stage.batch_size > 1:
+            results = [out for out in result if out is not None]
+            stats.dropped += len(batch) - len(results)
+        else:
+            results = (result or []) if stage.fan_out else ([] if result is None else [result])
+            if not results:
+                stats.dropped += 1
+        for out in results:
+            stats.emitted += 1
+            if outbox is not None:
+                # Blocks when the next stage falls behind (backpressure)
+                await outbox.put(out)
+
+
+async def _run_stage(stage: Stage, stats: StageStats, inbox: asyncio.Queue,
+                     outbox: Optional[asyncio.Queue], downstream_workers: int):
+    """Run all workers of a stage, then signal the next stage to finish."""
+    await asyncio.gather(*[
+        _worker(stage, stats, inbox, outbox)
+        for _ in range(stage.workers)
+    ])
+    if outbox is not None:
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+
+async def run_pipeline(source: Union[Iterable[Any], AsyncIterable[Any]], stages: List[Stage],
+                       queue_size: int = 100) -> Dict[str, StageStats]:
+    """Stream items from `source` through `stages` joined by bounded queues.
+
+    Every stage runs its own workers concurrently, so throughput is set by the
+    slowest stage and at most `queue_size` items wait between any two stages.
+    """
+    if not stages:
+        raise ValueError("run_pipeline needs at least one stage")
+
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    stats = {stage.name: StageStats(name=stage.name) for stage in stages}
+
+    runners = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        downstream = stages[i + 1].workers if i + 1 < len(stages) else 0
+        runners.append(asyncio.create_task(
+            _run_stage(stage, stats[stage.name], queues[i], outbox, downstream)
+        ))
+
+    try:
+        await _feed(source, queues[0])
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+        await asyncio.gather(*runners)
+    finally:
+        for runner in runners:
+            runner.cancel()
+
+    return stats
+
+
+def print_pipeline_stats(stats: Dict[str, StageStats]):
+    """Print a one-line summary per stage."""
+    for s in stats.values():
+        print(
+            f"{s.name}: received={s.received} emitted={s.emitted} "
+            f"dropped={s.dropped} failed={s.failed} busy={s.busy_seconds:.1f}s "
+            f"p50={s.percentile(0.5) * 1000:.0f}ms p99={s.percentile(0.99) * 1000:.0f}ms"
+        )
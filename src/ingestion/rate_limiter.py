@@ -0,0 +1,193 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+# Transient HTTP statuses worth retrying; 429 additionally shrinks concurrency
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Read the server's retry hint (retry-after-ms or retry-after) from an HTTP error."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+def is_retryable(e: Exception) -> bool:
+    """True for rate limits, server errors, timeouts and dropped connections."""
+    status = _status_code(e)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(e, (asyncio.TimeoutError, ConnectionError)) or type(e).__name__ in (
+        "APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+    )
+
+
+class _Budget:
+    """Token bucket refilled continuously to `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    async def take(self, amount: float):
+        amount = min(amount, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.level >= amount:
+                self.level -= amount
+                return
+            await asyncio.sleep((amount - self.level) / self.rate)
+
+
+class AdaptiveLimiter:
+    """Runs API calls at the highest concurrency the provider sustains.
+
+    Concurrency grows additively after each success and halves on a 429
+    (AIMD). After a 429 all callers pause for the server's `retry-after`.
+    Optional requests-per-minute and tokens-per-minute budgets pace calls
+    before they are sent. Retryable failures back off with full jitter and
+    the last error is raised once `max_retries` is exhausted, so callers never
+    have to invent placeholder results.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 64,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.name = name
+        self.limit = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self._requests = _Budget(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Budget(tokens_per_minute) if tokens_per_minute else None
+        self._in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, **kwargs) -> "AdaptiveLimiter":
+        """Build a limiter whose budgets come from {prefix}_RPM, {prefix}_TPM and {prefix}_MAX_CONCURRENCY."""
+        def env(key):
+            value = os.getenv(f"{prefix}_{key}")
+            return float(value) if value else None
+
+        if env("MAX_CONCURRENCY"):
+            kwargs.setdefault("max_concurrency", env("MAX_CONCURRENCY"))
+        return cls(name, requests_per_minute=env("RPM"), tokens_per_minute=env("TPM"), **kwargs)
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, tokens: int = 0, **kwargs) -> Any:
+        """Await `fn(*args, **kwargs)` under the limiter, retrying transient failures."""
+        attempt = 0
+        while True:
+            await self._wait_for_pause()
+            if self._requests:
+                await self._requests.take(1)
+            if self._tokens and tokens:
+                await self._tokens.take(tokens)
+
+            await self._acquire()
+            try:
+                self.calls += 1
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._on_failure(e, attempt)
+            else:
+                self._on_success()
+                return result
+            finally:
+                await self._release()
+
+            # Back off without holding a slot, so other calls keep running
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> str:
+        return (
+            f"{self.name} limiter: {self.calls} calls, {self.throttled} throttled, "
+            f"{self.retries} retries, concurrency {self.limit:.1f}"
+        )
+
+    def _on_success(self):
+        # Additive increase: about +1 slot per `limit` successful calls
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def _on_failure(self, e: Exception, attempt: int) -> float:
+        """Update the limit after a failed call and return how long to wait before retrying."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if _status_code(e) != 429:
+            return backoff
+
+        self.throttled += 1
+        now = time.monotonic()
+        retry_after = retry_after_seconds(e)
+        # One burst of 429s should halve the limit once, not once per request
+        if now - self._last_decrease > max(1.0, retry_after or 0.0):
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self._last_decrease = now
+        if retry_after is not None:
+            self._paused_until = max(self._paused_until, now + retry_after)
+            return retry_after + random.uniform(0, self.base_delay)
+        return backoff
+
+    async def _wait_for_pause(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _acquire(self):
+        """Take a slot, honouring a pause that started while waiting for it."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._in_flight < max(1, int(self.limit)))
+                if time.monotonic() >= self._paused_until:
+                    self._in_flight += 1
+                    return
+            await self._wait_for_pause()
+
+    async def _release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
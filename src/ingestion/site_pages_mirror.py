@@ -0,0 +1,398 @@
+import importlib.util
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MIRROR_DIR = Path(__file__).resolve().parents[2] / "data" / "interim" / "site_pages_mirror"
+
+_COLUMNS = ("id", "url", "chunk_number", "title", "summary", "content", "metadata")
+
+
+def jsonb_contains(value: Any, pattern: Any, top_level: bool = True) -> bool:
+    """Python version of Postgres `value @> pattern` for JSON documents.
+
+    Objects contain objects whose keys they all have with contained values,
+    arrays contain arrays whose elements each match some element, and a
+    top-level array also contains a bare scalar element. Scalars match by
+    equality without mixing booleans and numbers.
+    """
+    if isinstance(pattern, dict):
+        return isinstance(value, dict) and all(
+            key in value and jsonb_contains(value[key], item, False) for key, item in pattern.items()
+        )
+    if isinstance(pattern, list):
+        return isinstance(value, list) and all(
+            any(jsonb_contains(element, item, False) for element in value) for item in pattern
+        )
+    if isinstance(value, list) and top_level:
+        return any(jsonb_contains(element, pattern, False) for element in value if not isinstance(element, (dict, list)))
+    if isinstance(value, (dict, list)) or isinstance(value, bool) != isinstance(pattern, bool):
+        return False
+    return value == pattern
+
+
+class SitePagesMirror:
+    """Read-only local copy of site_pages for retrieval without a database.
+
+    Embeddings are appended to a memory-mapped float32 matrix; every other
+    column lives in a SQLite sidecar keyed by matrix row. `search` mirrors
+    `match_site_pages`: cosine similarity, `metadata @> filter`, top
+    `match_count`. It is exact by default. With hnswlib installed, `build_ann`
+    adds an HNSW graph that `search(..., exact=False)` uses instead.
+
+    `sync` pulls rows with a higher id or a newer `metadata.crawled_at` than
+    the last sync, so re-ingested chunks are refreshed in place. With
+    `prune=True` it also drops rows deleted upstream.
+    """
+
+    def __init__(self, directory: Optional[str] = None, dimensions: Optional[int] = None):
+        self.directory = Path(directory or os.getenv("SITE_PAGES_MIRROR_DIR", DEFAULT_MIRROR_DIR))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dimensions = dimensions or int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+        self._vectors_path = self.directory / "embeddings.f32"
+        self._ann_path = self.directory / "embeddings.hnsw"
+        self._vectors_path.touch()
+        self._conn = sqlite3.connect(self.directory / "rows.sqlite3", check_same_thread=False)
+        self._conn.executescript(
+            """
+            create table if not exists rows (
+                position integer primary key,  -- row of the embedding matrix
+                id integer not null unique,
+                url text not null,
+                chunk_number integer not null,
+                title text,
+                summary text,
+                content text,
+                metadata text not null,
+                deleted integer not null default 0
+            );
+            create table if not exists sync_state (key text primary key, value text);
+            """
+        )
+        self._filter_masks: Dict[str, np.ndarray] = {}
+        self.skipped_without_embedding = 0
+        self._load()
+        self._ann = None
+        if self._ann_path.exists() and importlib.util.find_spec("hnswlib") is not None:
+            import hnswlib
+            self._ann = hnswlib.Index(space="cosine", dim=self.dimensions)
+            self._ann.load_index(str(self._ann_path), max_elements=max(len(self.vectors), 1))
+
+    def _committed_count(self) -> int:
+        """Number of matrix rows with a committed row, cutting off vectors appended by an upsert that failed."""
+        (count,) = self._conn.execute("select coalesce(max(position) + 1, 0) from rows").fetchone()
+        if self._vectors_path.stat().st_size > count * 4 * self.dimensions:
+            os.truncate(self._vectors_path, count * 4 * self.dimensions)
+        return count
+
+    def _load(self):
+        """Map the matrix and load ids, metadata and norms into memory, indexed by matrix row."""
+        count = self._committed_count()
+        self.vectors = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dimensions))
+            if count else np.zeros((0, self.dimensions), dtype=np.float32)
+        )
+        self.ids = np.zeros(count, dtype=np.int64)
+        self.alive = np.zeros(count, dtype=bool)
+        self.metadata: List[Dict[str, Any]] = [{} for _ in range(count)]
+        for position, id_, metadata, deleted in self._conn.execute("select position, id, metadata, deleted from rows"):
+            self.ids[position] = id_
+            self.alive[position] = not deleted
+            self.metadata[position] = json.loads(metadata)
+        self.norms = np.linalg.norm(self.vectors, axis=1) if count else np.zeros(0, dtype=np.float32)
+        self.norms[self.norms == 0] = 1.0
+        self._filter_masks.clear()
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def _state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._conn.execute("select value from sync_state where key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key: str, value: str):
+        self._conn.execute("insert or replace into sync_state (key, value) values (?, ?)", (key, value))
+
+    def _positions(self) -> Dict[int, int]:
+        """{id: matrix row} of every stored row; rows are numbered from 0 without gaps."""
+        self._committed_count()
+        return dict(self._conn.execute("select id, position from rows"))
+
+    def upsert_rows(self, rows: Sequence[Dict[str, Any]], reload: bool = True,
+                    positions: Optional[Dict[int, int]] = None):
+        """Add or replace rows shaped like site_pages, with `embedding` as a list or pgvector text.
+
+        Every row is checked before anything is written, so a bad row leaves
+        the mirror unchanged. Callers writing many batches pass the map from
+        `_positions()` as `positions`; it is kept up to date instead of being
+        read again for every batch.
+        """
+        vectors = []
+        for row in rows:
+            embedding = row["embedding"]
+            if isinstance(embedding, str):
+                embedding = json.loads(embedding)
+            vector = np.asarray(embedding if embedding is not None else [], dtype=np.float32)
+            if vector.shape != (self.dimensions,):
+                raise ValueError(f"Row {row['id']} has {vector.size} dimensions, expected {self.dimensions}")
+            vectors.append(vector)
+
+        if positions is None:
+            positions = self._positions()
+        count = first_new = len(positions)
+        added = []
+        updates: Dict[int, np.ndarray] = {}
+        try:
+            with open(self._vectors_path, "ab") as appended:
+                for row, vector in zip(rows, vectors):
+                    position = positions.get(row["id"])
+                    if position is None:
+                        position = positions[row["id"]] = count
+                        added.append(row["id"])
+                        count += 1
+                        appended.write(vector.tobytes())
+                    else:
+                        updates[position] = vector
+                    self._conn.execute(
+                        "insert or replace into rows (position, id, url, chunk_number, title, summary, content, metadata, deleted) "
+                        "values (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                        (position, *(row[column] for column in _COLUMNS[:-1]), json.dumps(row["metadata"] or {})),
+                    )
+            if updates:
+                matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(count, self.dimensions))
+                for position, vector in updates.items():
+                    matrix[position] = vector
+                matrix.flush()
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            self._committed_count()
+            for id_ in added:
+                del positions[id_]
+            raise
+        if self._ann is not None:
+            # Keep the graph in step: append new rows, re-insert changed ones
+            changed = sorted(updates) + list(range(first_new, count))
+            if changed:
+                matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dimensions))
+                self._ann.resize_index(max(count, self._ann.get_max_elements()))
+                self._ann.add_items(np.asarray(matrix[changed]), np.array(changed))
+                self._ann.save_index(str(self._ann_path))
+        if reload:
+            self._load()
+
+    def load_pages(self, pages: Iterable[Sequence[Dict[str, Any]]]) -> int:
+        """Upsert pages of site_pages rows and advance the sync position; returns the rows stored.
+
+        Used by `sync` and to fill the mirror from a corpus snapshot, after
+        which `sync` only pulls rows newer than the snapshot. Rows without an
+        embedding can never match a search, so they are counted in
+        `skipped_without_embedding` instead of stored.
+        """
+        max_id = int(self._state("last_id", "0"))
+        max_crawled = self._state("last_crawled_at", "")
+        received = 0
+        self.skipped_without_embedding = 0
+        positions = self._positions()
+        for rows in pages:
+            if not rows:
+                continue
+            embedded = [row for row in rows if row["embedding"] is not None]
+            self.skipped_without_embedding += len(rows) - len(embedded)
+            self.upsert_rows(embedded, reload=False, positions=positions)
+            received += len(embedded)
+            max_id = max(max_id, max(row["id"] for row in rows))
+            max_crawled = max([max_crawled, *((row["metadata"] or {}).get("crawled_at", "") for row in rows)])
+
+        self._set_state("last_id", str(max_id))
+        self._set_state("last_crawled_at", max_crawled)
+        self._conn.commit()
+        self._load()
+        return received
+
+    def sync(self, client, page_size: int = 1000, prune: bool = False) -> int:
+        """Pull new and re-crawled rows from Supabase; returns the number of rows received."""
+        last_id = int(self._state("last_id", "0"))
+        last_crawled = self._state("last_crawled_at", "")
+
+        def pages():
+            start = 0
+            while True:
+                query = client.table("site_pages").select(",".join((*_COLUMNS, "embedding")))
+                if last_crawled:
+                    query = query.or_(f'id.gt.{last_id},metadata->>crawled_at.gt."{last_crawled}"')
+                else:
+                    query = query.gt("id", last_id)
+                rows = query.order("id").range(start, start + page_size - 1).execute().data
+                yield rows
+                if len(rows) < page_size:
+                    return
+                start += page_size
+
+        received = self.load_pages(pages())
+        if prune:
+            self.prune(client, page_size)
+        return received
+
+    def prune(self, client, page_size: int = 1000) -> int:
+        """Mark rows that no longer exist upstream as deleted; returns how many."""
+        upstream = set()
+        start = 0
+        while True:
+            rows = client.table("site_pages").select("id").order("id").range(start, start + page_size - 1).execute().data
+            upstream.update(row["id"] for row in rows)
+            if len(rows) < page_size:
+                break
+            start += page_size
+        gone = [int(i) for i, alive in zip(self.ids, self.alive) if alive and int(i) not in upstream]
+        self._conn.executemany("update rows set deleted = 1 where id = ?", [(i,) for i in gone])
+        self._conn.commit()
+        if gone:
+            self._load()
+        return len(gone)
+
+    def build_ann(self, m: int = 16, ef_construction: int = 200):
+        """Build and save an HNSW graph over the mirror (needs the optional hnswlib package)."""
+        import hnswlib
+        index = hnswlib.Index(space="cosine", dim=self.dimensions)
+        index.init_index(max_elements=max(len(self.vectors), 1), M=m, ef_construction=ef_construction)
+        if len(self.vectors):
+            index.add_items(np.asarray(self.vectors), np.arange(len(self.vectors)))
+        index.save_index(str(self._ann_path))
+        self._ann = index
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        if not filter:
+            return self.alive
+        key = json.dumps(filter, sort_keys=True)
+        if key not in self._filter_masks:
+            matches = np.array([jsonb_contains(metadata, filter) for metadata in self.metadata], dtype=bool)
+            self._filter_masks[key] = matches & self.alive
+        return self._filter_masks[key]
+
+    def _candidates(self, query: np.ndarray, match_count: int, mask: np.ndarray, exact: bool) -> List[int]:
+        """Matrix rows of the nearest allowed vectors, best first."""
+        if not exact and self._ann is not None:
+            # Over-fetch so filtered or deleted rows still leave match_count results
+            k = min(len(self.vectors), max(match_count * 4, 50))
+            self._ann.set_ef(max(k, 100))
+            labels, _ = self._ann.knn_query(query, k=k)
+            found = [int(label) for label in labels[0] if mask[label]][:match_count]
+            if len(found) == min(match_count, int(mask.sum())):
+                return found
+        allowed = np.flatnonzero(mask)
+        if not allowed.size:
+            return []
+        scores = (self.vectors[allowed] @ query) / self.norms[allowed]
+        k = min(match_count, allowed.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return allowed[top[np.argsort(-scores[top])]].tolist()
+
+    def search(self, query_embedding: Sequence[float], match_count: int = 10,
+               filter: Optional[Dict[str, Any]] = None, exact: bool = True) -> List[Dict[str, Any]]:
+        """Rows shaped like match_site_pages results, most similar first."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        positions = self._candidates(query, match_count, self._filter_mask(filter), exact)
+        if not positions:
+            return []
+        similarities = (self.vectors[positions] @ query) / self.norms[positions]
+        rows = {
+            row[0]: row
+            for row in self._conn.execute(
+                f"select position, {', '.join(_COLUMNS)} from rows where position in ({','.join('?' * len(positions))})",
+                positions,
+            )
+        }
+        return [
+            {**dict(zip(_COLUMNS, rows[position][1:])), "metadata": self.metadata[position],
+             "similarity": float(similarity)}
+            for position, similarity in zip(positions, similarities)
+        ]
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], match_count: int = 5,
+                     filter: Optional[Dict[str, Any]] = None, neighbor_radius: int = 0,
+                     exact: bool = True) -> List[Dict[str, Any]]:
+        """Rows shaped like match_site_pages_batch results, for several queries at once.
+
+        Each query contributes its top `match_count` chunks, plus the chunks
+        within `neighbor_radius` positions of each hit on the same page. A chunk
+        appears once, with its best direct-hit `similarity` (None if it was
+        only reached as a neighbor), the 1-based `query_indexes` that reached
+        it and `is_neighbor`.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimensions)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        mask = self._filter_mask(filter)
+        radius = max(neighbor_radius, 0)
+        # position -> [best hit similarity, best similarity of its group, query indexes, neighbor only]
+        merged: Dict[int, list] = {}
+        for query_index, query in enumerate(queries, start=1):
+            positions = self._candidates(query, match_count, mask, exact)
+            if not positions:
+                continue
+            similarities = (self.vectors[positions] @ query) / self.norms[positions]
+            for position, similarity in zip(positions, similarities.tolist()):
+                reached = [(position, False)]
+                if radius:
+                    url, chunk_number = self._conn.execute(
+                        "select url, chunk_number from rows where position = ?", (position,)
+                    ).fetchone()
+                    reached += [
+                        (near, True)
+                        for (near,) in self._conn.execute(
+                            "select position from rows where url = ? and chunk_number between ? and ? "
+                            "and position <> ?",
+                            (url, chunk_number - radius, chunk_number + radius, position),
+                        )
+                        if mask[near]
+                    ]
+                for near, is_neighbor in reached:
+                    entry = merged.setdefault(near, [None, similarity, set(), True])
+                    if not is_neighbor:
+                        entry[0] = similarity if entry[0] is None else max(entry[0], similarity)
+                        entry[3] = False
+                    entry[1] = max(entry[1], similarity)
+                    entry[2].add(query_index)
+        if not merged:
+            return []
+
+        positions = list(merged)
+        rows = {
+            row[0]: row
+            for row in self._conn.execute(
+                f"select position, {', '.join(_COLUMNS)} from rows where position in ({','.join('?' * len(positions))})",
+                positions,
+            )
+        }
+        positions.sort(key=lambda position: (-merged[position][1], rows[position][2], rows[position][3]))
+        return [
+            {**dict(zip(_COLUMNS, rows[position][1:])), "metadata": self.metadata[position],
+             "similarity": merged[position][0], "query_indexes": sorted(merged[position][2]),
+             "is_neighbor": merged[position][3]}
+            for position in positions
+        ]
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    """Sync the local mirror from Supabase."""
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+    mirror = SitePagesMirror()
+    received = mirror.sync(client, prune=True)
+    print(f"Synced {received} rows; mirror holds {len(mirror)} chunks in {mirror.directory}")
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
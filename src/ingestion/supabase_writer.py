@@ -0,0 +1,138 @@
+import asyncio
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# SQLSTATE classes that point at the rows themselves rather than the connection:
+# 22 data exception, 23 integrity constraint violation, 42 syntax/access error
+_ROW_ERROR_CLASSES = ("22", "23", "42")
+
+
+def is_row_error(e: Exception) -> bool:
+    """True when a PostgREST error is caused by bad row data, so retrying as-is won't help."""
+    code = getattr(e, "code", None)
+    return isinstance(code, str) and code[:2] in _ROW_ERROR_CLASSES
+
+
+class BatchUpsertWriter:
+    """Buffers rows and writes them to a Supabase table as multi-row upserts.
+
+    Rows are flushed when `batch_size` rows are buffered or every
+    `flush_interval` seconds. The blocking supabase client runs in a worker
+    thread. Transient errors retry the batch with jittered backoff; a batch
+    rejected for its data is split in halves until the bad rows are isolated,
+    so the good rows are written and only failing rows end up in `failed`.
+
+    Use as `async with BatchUpsertWriter(...) as writer:` so the final rows are
+    flushed on exit. `on_written` is called with every batch of rows once it
+    is stored.
+    """
+
+    def __init__(
+        self,
+        client,
+        table: str,
+        on_conflict: str,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        max_concurrent_writes: int = 2,
+        on_written: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ):
+        self.client = client
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.on_written = on_written
+        self.written = 0
+        self.requests = 0
+        self.failed: List[Tuple[Dict[str, Any], str]] = []
+        self._buffer: List[Dict[str, Any]] = []
+        self._semaphore = asyncio.Semaphore(max_concurrent_writes)
+        self._inflight = set()
+        self._ticker: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def add(self, row: Dict[str, Any]):
+        """Buffer a row, writing a batch (and waiting for it) once the buffer is full."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            await self._flush_buffer()
+
+    async def flush(self):
+        """Write everything buffered and wait for all writes in flight."""
+        await self._flush_buffer()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def close(self):
+        """Stop the timed flush, write the remaining rows and report failures."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        await self.flush()
+        if self.failed:
+            keys = self.on_conflict.split(",")
+            print(f"{len(self.failed)} rows failed to upsert into {self.table}:")
+            for row, error in self.failed:
+                print(f"  {tuple(row.get(key) for key in keys)}: {error}")
+
+    async def _tick(self):
+        """Flush periodically so slow producers don't leave rows sitting in the buffer."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._dispatch()
+
+    def _dispatch(self) -> Optional[asyncio.Task]:
+        """Start writing the buffered rows in the background."""
+        if not self._buffer:
+            return None
+        rows, self._buffer = self._buffer, []
+        task = asyncio.ensure_future(self._write(rows))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return task
+
+    async def _flush_buffer(self):
+        task = self._dispatch()
+        if task is not None:
+            await task
+
+    def _upsert(self, rows: List[Dict[str, Any]]):
+        return self.client.table(self.table).upsert(rows, on_conflict=self.on_conflict).execute()
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        """Upsert rows, retrying transient errors and bisecting batches with bad rows."""
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    await asyncio.to_thread(self._upsert, rows)
+                break
+            except Exception as e:
+                row_error = is_row_error(e)
+                if row_error and len(rows) > 1:
+                    # Only the half containing the bad row(s) keeps failing
+                    middle = len(rows) // 2
+                    await self._write(rows[:middle])
+                    await self._write(rows[middle:])
+                    return
+                if row_error or attempt >= self.max_retries:
+                    self.failed.extend((row, str(e)) for row in rows)
+                    return
+                attempt += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        # Outside the try: a failing callback must not re-send rows already stored
+        self.written += len(rows)
+        if self.on_written is not None:
+            self.on_written(rows)
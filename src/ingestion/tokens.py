@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+# Rough characters-per-token ratio for English prose and markdown
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = "text-embedding-3-small"):
+    """Return the tiktoken encoding for a model, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken is optional and downloads its BPE files on first use
+        print(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    """Count tokens exactly when tiktoken is available, otherwise estimate."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
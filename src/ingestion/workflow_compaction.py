@@ -0,0 +1,121 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from tokens import CHARS_PER_TOKEN, count_tokens
+
+# Node fields that describe layout or identity rather than behaviour
+_DROP_NODE_KEYS = {
+    "id", "position", "typeVersion", "credentials", "webhookId", "pinData",
+    "notesInFlow", "alwaysOutputData", "executeOnce", "color", "width", "height",
+}
+_TYPE_PREFIXES = ("n8n-nodes-base.", "@n8n/n8n-nodes-langchain.")
+_STICKY_NOTE = "stickyNote"
+
+# Parameter string lengths tried in turn until the workflow fits the token cap
+_STRING_LIMITS = (400, 120, 40)
+
+
+def short_node_type(node_type: str) -> str:
+    """Node type without the package prefix, e.g. "httpRequest"."""
+    for prefix in _TYPE_PREFIXES:
+        if node_type.startswith(prefix):
+            return node_type[len(prefix):]
+    return node_type
+
+
+def _prune(value: Any, max_chars: int) -> Any:
+    """Drop empty values and truncate long strings, recursively."""
+    if isinstance(value, dict):
+        pruned = {key: _prune(item, max_chars) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        pruned = [_prune(item, max_chars) for item in value]
+        return [item for item in pruned if item not in (None, "", [], {})]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "..."
+    return value
+
+
+def _edges(connections: Dict[str, Any]) -> List[str]:
+    """Flatten n8n's connection map into "Source -> Target" lines."""
+    edges = []
+    for source, outputs in (connections or {}).items():
+        for kind, branches in (outputs or {}).items():
+            for branch, targets in enumerate(branches or []):
+                for target in targets or []:
+                    label = "" if kind == "main" and branch == 0 else f"[{kind}:{branch}]"
+                    edges.append(f"{source} -{label}> {target.get('node')}")
+    return edges
+
+
+def compact_workflow(workflow: Dict[str, Any], max_tokens: int = 4000, model: str = "gpt-4o") -> str:
+    """Reduce raw n8n workflow JSON to what the analysis prompts need.
+
+    Keeps node names, short types, non-empty parameters, sticky note text and
+    the connection graph as edge lines. Layout, ids, credentials and pinned
+    data are dropped. Long parameter strings are truncated more aggressively,
+    then parameters are dropped entirely, until the result fits `max_tokens`.
+    """
+    nodes = workflow.get("nodes") or []
+    notes = [
+        (node.get("parameters") or {}).get("content", "")
+        for node in nodes if short_node_type(node.get("type", "")) == _STICKY_NOTE
+    ]
+    nodes = [node for node in nodes if short_node_type(node.get("type", "")) != _STICKY_NOTE]
+    edges = _edges(workflow.get("connections"))
+
+    text = ""
+    for max_chars in (*_STRING_LIMITS, None):
+        compact = {
+            "nodes": [
+                {
+                    "name": node.get("name"),
+                    "type": short_node_type(node.get("type", "")),
+                    **({} if max_chars is None else _prune({
+                        key: value for key, value in node.items()
+                        if key not in _DROP_NODE_KEYS and key not in ("name", "type")
+                    }, max_chars)),
+                }
+                for node in nodes
+            ],
+            "connections": edges,
+        }
+        if notes:
+            compact["notes"] = _prune(notes, max_chars or _STRING_LIMITS[-1])
+        text = json.dumps(compact, separators=(",", ":"), ensure_ascii=False)
+        if count_tokens(text, model) <= max_tokens:
+            return text
+
+    # Still too big with bare names and edges: cut at the cap
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+class WorkflowCompactor:
+    """Compacts workflows for prompting and reports the size reduction of each."""
+
+    def __init__(self, max_tokens: int = 4000, model: str = "gpt-4o"):
+        self.max_tokens = max_tokens
+        self.model = model
+        self.workflows = 0
+        self.original_tokens = 0
+        self.compact_tokens = 0
+
+    def compact(self, workflow: Dict[str, Any], workflow_id: Optional[int] = None) -> str:
+        original = count_tokens(json.dumps(workflow), self.model)
+        text = compact_workflow(workflow, self.max_tokens, self.model)
+        compacted = count_tokens(text, self.model)
+        self.workflows += 1
+        self.original_tokens += original
+        self.compact_tokens += compacted
+        print(
+            f"Compacted workflow {workflow_id}: {original} -> {compacted} tokens "
+            f"({100 * (1 - compacted / max(original, 1)):.0f}% smaller)"
+        )
+        return text
+
+    def stats(self) -> str:
+        saved = 100 * (1 - self.compact_tokens / max(self.original_tokens, 1))
+        return (
+            f"compaction: {self.workflows} workflows, {self.original_tokens} -> "
+            f"{self.compact_tokens} tokens ({saved:.0f}% smaller)"
+        )
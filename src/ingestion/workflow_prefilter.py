@@ -0,0 +1,101 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Optional, Set, Tuple
+
+from workflow_compaction import short_node_type
+
+_TRIGGER = re.compile(r"trigger$|^(webhook|cron|schedule|start|interval)$", re.IGNORECASE)
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_TRAILING_NUMBER = re.compile(r"\s*\d+$")
+_DEFAULT_NAMES = {
+    "start", "sticky note", "no operation, do nothing",
+    "when clicking \"test workflow\"", "when clicking 'test workflow'",
+    "when clicking \"execute workflow\"", "when clicking 'execute workflow'",
+}
+
+
+def _is_default_name(node: Dict[str, Any]) -> bool:
+    """True if the node still has the name n8n gives it on creation, e.g. "HTTP Request1"."""
+    name = _TRAILING_NUMBER.sub("", (node.get("name") or "").strip()).lower()
+    node_type = short_node_type(node.get("type", ""))
+    return name in _DEFAULT_NAMES or name == _CAMEL.sub(" ", node_type).lower()
+
+
+def _connected_names(connections: Dict[str, Any]) -> Set[str]:
+    names = set()
+    for source, outputs in (connections or {}).items():
+        for branches in (outputs or {}).values():
+            for targets in branches or []:
+                for target in targets or []:
+                    names.update((source, target.get("node")))
+    return names
+
+
+class WorkflowPrefilter:
+    """Rule-based legitimacy check that settles clear cases without the LLM.
+
+    Rejects workflows with fewer than two working nodes, mostly disconnected
+    graphs, or nothing but default node names and no description. Accepts
+    workflows with a trigger, at least `min_accept_nodes` fully connected
+    nodes, mostly custom names and a description of `min_accept_description`
+    characters. Everything else is left to the LLM. Each decision is logged
+    with its reason.
+
+    `saves_on_accept` says whether an auto-accept also saves an LLM call. It
+    does not when the verdict and analysis come from the same call.
+    """
+
+    def __init__(self, min_accept_nodes: int = 4, min_accept_description: int = 200,
+                 saves_on_accept: bool = True):
+        self.min_accept_nodes = min_accept_nodes
+        self.min_accept_description = min_accept_description
+        self.saves_on_accept = saves_on_accept
+        self.decisions = Counter()
+        self.reasons = Counter()
+
+    def classify(self, template: Dict[str, Any], workflow_id: Optional[int] = None) -> Optional[str]:
+        """Return 'GOOD', 'BAD', or None when the LLM has to decide.
+
+        Args:
+            template: The 'workflow' object of a template API response
+            workflow_id: Workflow id, only used for logging
+        """
+        verdict, reason = self._decide(template)
+        self.decisions[verdict or "LLM"] += 1
+        self.reasons[reason] += 1
+        print(f"Prefilter {workflow_id}: {verdict or 'LLM'} ({reason})")
+        return verdict
+
+    def _decide(self, template: Dict[str, Any]) -> Tuple[Optional[str], str]:
+        workflow = template.get("workflow") or {}
+        nodes = [node for node in workflow.get("nodes") or []
+                 if short_node_type(node.get("type", "")) != "stickyNote"]
+        description = (template.get("description") or "").strip()
+        if len(nodes) < 2:
+            return "BAD", "fewer than two working nodes"
+
+        connected = _connected_names(workflow.get("connections"))
+        unconnected = sum(node.get("name") not in connected for node in nodes)
+        if unconnected * 2 > len(nodes):
+            return "BAD", "mostly disconnected graph"
+
+        default_names = sum(_is_default_name(node) for node in nodes)
+        if default_names == len(nodes) and len(description) < 20:
+            return "BAD", "default node names and no description"
+
+        has_trigger = any(_TRIGGER.search(short_node_type(node.get("type", ""))) for node in nodes)
+        if (has_trigger and unconnected == 0 and len(nodes) >= self.min_accept_nodes
+                and default_names * 2 < len(nodes) and len(description) >= self.min_accept_description):
+            return "GOOD", "connected, triggered, named and described"
+        return None, "ambiguous"
+
+    @property
+    def llm_calls_saved(self) -> int:
+        return self.decisions["BAD"] + (self.decisions["GOOD"] if self.saves_on_accept else 0)
+
+    def stats(self) -> str:
+        return (
+            f"prefilter: {self.decisions['BAD']} rejected, {self.decisions['GOOD']} accepted, "
+            f"{self.decisions['LLM']} sent to the LLM, {self.llm_calls_saved} LLM calls saved; "
+            f"reasons {dict(self.reasons)}"
+        )
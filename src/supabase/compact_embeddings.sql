@@ -0,0 +1,131 @@
+-- Compact vector indexes for site_pages with full-precision rescoring. Experimental, see below.
+-- Run after site_pages.sql; needs pgvector 0.7 or later (halfvec, bit, binary_quantize).
+--
+-- The table keeps its vector(1536) column. Each index below is built on an
+-- expression over that column, so the index stores a smaller copy of every
+-- vector:
+--   halfvec  16-bit floats, half the size of the vector index
+--   reduced  the first 512 dimensions as 16-bit floats, 1/6 of the size.
+--            text-embedding-3 vectors are Matryoshka-trained, so a prefix
+--            is itself a usable embedding.
+--   binary   one bit per dimension (the sign), 1/32 of the size
+-- match_site_pages_compact finds candidate_count candidates through one of
+-- these indexes. It then reorders them by exact cosine similarity on the full
+-- vectors and returns the top match_count.
+--
+-- Every index costs disk, memory and insert time, so none is built by
+-- default. Uncomment only the index of each mode you query. A mode without
+-- its index still returns correct results, but through a sequential scan.
+--
+-- To also shrink the table itself, ingest with EMBEDDING_DIMENSIONS (for
+-- example 512) and declare the column with the same size. Existing rows must
+-- be re-embedded, since the API normalizes shortened vectors:
+--   alter table site_pages alter column embedding type vector(512) using subvector(embedding, 1, 512);
+-- The functions below then need their 1536 and 512 sizes changed to match.
+--
+-- EXPERIMENTAL: the compact indexes have not been measured. Their index
+-- size, build time, latency and recall through HNSW are unknown, because
+-- the benchmark environment only had pgvector 0.6.2, which cannot build
+-- them. Do not switch production search to match_site_pages_compact before
+-- running bench_compact_vectors.py on pgvector 0.7 or later, preferably
+-- with --source-table site_pages.
+--
+-- What was measured, on 20k synthetic clustered 1536-d vectors
+-- (PostgreSQL 16, pgvector 0.6.2): the full-vector HNSW index is 156 MiB
+-- for a 160 MiB table, builds in 95 s, and answers top-10 at recall 0.987,
+-- p50 1.4 ms, p99 2.2 ms. For the compact modes only an upper bound on
+-- recall is known, computed outside Postgres as an exact scan of the
+-- compact vectors followed by full-precision rescoring. Recall@10 for
+-- candidate_count 10 / 40 / 100 / 200:
+--   halfvec  0.999 / 0.999 / 0.999 / 0.999
+--   reduced  0.355 / 0.694 / 0.928 / 0.999
+--   binary   0.230 / 0.485 / 0.797 / 0.997
+-- Synthetic vectors are not Matryoshka-trained, so reduced and binary may
+-- do better on real embeddings.
+--
+-- pgvector has no int8 vector type. halfvec is the closest scalar
+-- quantization it offers.
+
+-- mode => 'halfvec'
+-- create index if not exists site_pages_embedding_halfvec_idx on site_pages
+--   using hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops);
+
+-- mode => 'reduced'
+-- create index if not exists site_pages_embedding_reduced_idx on site_pages
+--   using hnsw ((subvector(embedding, 1, 512)::halfvec(512)) halfvec_cosine_ops);
+
+-- mode => 'binary'
+-- create index if not exists site_pages_embedding_binary_idx on site_pages
+--   using hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+-- Each order by below matches its index expression exactly, so the planner can use the index
+create or replace function match_site_pages_compact (
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb,
+  mode text default 'halfvec',
+  candidate_count int default 100
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  title varchar,
+  summary varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  candidate_ids bigint[];
+begin
+  -- An HNSW scan returns at most ef_search rows; 1000 is the largest value pgvector accepts.
+  -- Never go below the ef_search maintain_vector_index.py pins on this function.
+  perform set_config('hnsw.ef_search', least(greatest(
+    candidate_count, match_count, current_setting('hnsw.ef_search')::int
+  ), 1000)::text, true);
+
+  if mode = 'halfvec' then
+    select array_agg(c.id) into candidate_ids from (
+      select sp.id from site_pages sp
+      where sp.metadata @> filter
+      order by sp.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+      limit greatest(candidate_count, match_count)
+    ) c;
+  elsif mode = 'reduced' then
+    select array_agg(c.id) into candidate_ids from (
+      select sp.id from site_pages sp
+      where sp.metadata @> filter
+      order by subvector(sp.embedding, 1, 512)::halfvec(512) <=> subvector(query_embedding, 1, 512)::halfvec(512)
+      limit greatest(candidate_count, match_count)
+    ) c;
+  elsif mode = 'binary' then
+    select array_agg(c.id) into candidate_ids from (
+      select sp.id from site_pages sp
+      where sp.metadata @> filter
+      order by binary_quantize(sp.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      limit greatest(candidate_count, match_count)
+    ) c;
+  else
+    raise exception 'Unknown mode %, expected halfvec, reduced or binary', mode;
+  end if;
+
+  -- Rescore the candidates on the full-precision vectors
+  return query
+  select
+    sp.id,
+    sp.url,
+    sp.chunk_number,
+    sp.title,
+    sp.summary,
+    sp.content,
+    sp.metadata,
+    1 - (sp.embedding <=> query_embedding) as similarity
+  from site_pages sp
+  where sp.id = any(candidate_ids)
+  order by sp.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
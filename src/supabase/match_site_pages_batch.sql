@@ -0,0 +1,89 @@
+-- Search documentation chunks for several query embeddings in one call.
+-- Run after site_pages.sql.
+--
+-- Each query gets its own top match_count chunks (one index scan per query).
+-- With neighbor_radius > 0, chunks within that many positions of a hit on
+-- the same page are added as well. A chunk reached by several queries or as
+-- a neighbor of several hits is returned once:
+--   similarity     best similarity as a direct hit, null for neighbor-only chunks
+--   query_indexes  1-based positions in query_embeddings that reached the chunk
+--   is_neighbor    true if the chunk was only reached through neighbor expansion
+-- Rows come back best hit first, each hit followed by its neighbors in page order.
+--
+-- query_embeddings is a jsonb array of embeddings, each a JSON array of 1536
+-- numbers, so it binds from PostgREST like any JSON argument:
+--   supabase.rpc("match_site_pages_batch", {"query_embeddings": [embedding_1, embedding_2], "match_count": 5})
+-- From SQL, pass '[[0.1, ...], [0.2, ...]]'::jsonb.
+-- Earlier versions took vector(1536)[], which PostgREST cannot bind
+drop function if exists match_site_pages_batch (vector[], int, jsonb, int);
+
+create or replace function match_site_pages_batch (
+  query_embeddings jsonb,
+  match_count int default 5,
+  filter jsonb DEFAULT '{}'::jsonb,
+  neighbor_radius int default 0
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  title varchar,
+  summary varchar,
+  content text,
+  metadata jsonb,
+  similarity float,
+  query_indexes int[],
+  is_neighbor boolean
+)
+language sql stable
+as $$
+  with queries as (
+    -- The text of a JSON number array is also a valid vector literal
+    select q.embedding::text::vector(1536) as embedding, q.query_index::int as query_index
+    from jsonb_array_elements(query_embeddings) with ordinality as q (embedding, query_index)
+  ),
+  hits as (
+    select queries.query_index, hit.id, hit.url, hit.chunk_number, hit.similarity
+    from queries
+    cross join lateral (
+      select sp.id, sp.url, sp.chunk_number, 1 - (sp.embedding <=> queries.embedding) as similarity
+      from site_pages sp
+      where sp.metadata @> filter
+      order by sp.embedding <=> queries.embedding
+      limit match_count
+    ) hit
+  ),
+  expanded as (
+    -- Uses the unique (url, chunk_number) index; radius 0 keeps only the hit itself
+    select hits.query_index, near.id, hits.similarity, near.id <> hits.id as is_neighbor
+    from hits
+    join site_pages near
+      on near.url = hits.url
+     and near.chunk_number between hits.chunk_number - greatest(neighbor_radius, 0)
+                               and hits.chunk_number + greatest(neighbor_radius, 0)
+     and near.metadata @> filter
+  ),
+  merged as (
+    select
+      expanded.id,
+      max(expanded.similarity) filter (where not expanded.is_neighbor) as similarity,
+      max(expanded.similarity) as group_similarity,
+      array_agg(distinct expanded.query_index order by expanded.query_index) as query_indexes,
+      bool_and(expanded.is_neighbor) as is_neighbor
+    from expanded
+    group by expanded.id
+  )
+  select
+    sp.id,
+    sp.url,
+    sp.chunk_number,
+    sp.title,
+    sp.summary,
+    sp.content,
+    sp.metadata,
+    merged.similarity,
+    merged.query_indexes,
+    merged.is_neighbor
+  from merged
+  join site_pages sp on sp.id = merged.id
+  order by merged.group_similarity desc, sp.url, sp.chunk_number;
+$$;
@@ -0,0 +1,21 @@
+-- Mark unchanged chunks of a re-crawled page with the page's new sitemap lastmod
+-- and chunk count. Run after site_pages.sql; called once per page by
+-- ingest_pydantic_docs.py.
+--
+-- Only the listed chunk numbers are touched. Chunks whose content changed keep
+-- their old lastmod until their new version is stored, and a missing chunk
+-- number below chunk_count marks a chunk that failed, so either way the page
+-- is crawled again on the next run.
+create or replace function refresh_site_pages_lastmod (
+  page_url varchar,
+  page_lastmod text,
+  page_chunk_count int,
+  chunk_numbers int[]
+) returns void
+language sql
+as $$
+  update site_pages
+  set metadata = metadata || jsonb_build_object('lastmod', page_lastmod, 'chunk_count', page_chunk_count)
+  where url = page_url
+    and chunk_number = any(chunk_numbers);
+$$;
@@ -0,0 +1,79 @@
+-- Enable the pgvector extension
+create extension if not exists vector;
+
+-- Create the n8n workflow templates table
+create table workflows (
+    id bigserial primary key,
+    workflow_id integer not null unique,  -- n8n template id, the upsert key
+    workflow_name text not null,
+    workflow_description text,
+    workflow_json jsonb not null,  -- Stored once here, not again in metadata
+    summary_accomplishment text not null,
+    summary_nodes text not null,
+    summary_suggestions text not null,
+    content text not null,  -- The three summaries combined, as embedded
+    metadata jsonb not null default '{}'::jsonb,  -- Small filterable fields only
+    embedding vector(1536),  -- OpenAI embeddings are 1536 dimensions
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- HNSW needs no training data, so it stays accurate as templates are added
+create index on workflows using hnsw (embedding vector_cosine_ops);
+
+-- Create an index on metadata for faster filtering
+create index idx_workflows_metadata on workflows using gin (metadata);
+
+-- Create a function to search for workflows. The <n8n-demo> component is
+-- built from workflow_json instead of being stored a second time.
+create function match_workflows (
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb
+) returns table (
+  id bigint,
+  workflow_id integer,
+  workflow_name text,
+  workflow_description text,
+  n8n_demo text,
+  summary_accomplishment text,
+  summary_nodes text,
+  summary_suggestions text,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  return query
+  select
+    id,
+    workflow_id,
+    workflow_name,
+    workflow_description,
+    '<n8n-demo workflow=''' || replace(workflow_json::text, '''', '\''') || '''></n8n-demo>' as n8n_demo,
+    summary_accomplishment,
+    summary_nodes,
+    summary_suggestions,
+    content,
+    metadata,
+    1 - (workflows.embedding <=> query_embedding) as similarity
+  from workflows
+  where metadata @> filter
+  order by workflows.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
+
+-- Everything above will work for any PostgreSQL database. The below commands are for Supabase security
+
+-- Enable RLS on the table
+alter table workflows enable row level security;
+
+-- Create a policy that allows anyone to read
+create policy "Allow public read access"
+  on workflows
+  for select
+  to public
+  using (true);
@@ -0,0 +1,77 @@
+-- Bring a workflows table created by earlier versions of ingest_n8n_workflows.py
+-- in line with workflows.sql. Run once; every statement is safe to re-run.
+
+-- Plain inserts could store a template more than once: keep the newest row
+delete from workflows older
+using workflows newer
+where older.workflow_id = newer.workflow_id
+  and older.id < newer.id;
+
+-- Upserts on workflow_id need a unique constraint
+create unique index if not exists workflows_workflow_id_key on workflows (workflow_id);
+
+-- The workflow JSON was sent as a string; store it as jsonb
+alter table workflows
+  alter column workflow_json type jsonb using (
+    case when jsonb_typeof(workflow_json::jsonb) = 'string'
+      then (workflow_json::jsonb #>> '{}')::jsonb
+      else workflow_json::jsonb
+    end
+  );
+
+-- Drop the copies of workflow_json and n8n_demo kept inside metadata
+update workflows
+set metadata = metadata - 'workflow_json' - 'n8n_demo'
+where metadata ?| array['workflow_json', 'n8n_demo'];
+
+-- n8n_demo only repeated workflow_json; match_workflows now builds it
+alter table workflows drop column if exists n8n_demo;
+
+create or replace function match_workflows (
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb DEFAULT '{}'::jsonb
+) returns table (
+  id bigint,
+  workflow_id integer,
+  workflow_name text,
+  workflow_description text,
+  n8n_demo text,
+  summary_accomplishment text,
+  summary_nodes text,
+  summary_suggestions text,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  return query
+  select
+    id,
+    workflow_id,
+    workflow_name,
+    workflow_description,
+    '<n8n-demo workflow=''' || replace(workflow_json::text, '''', '\''') || '''></n8n-demo>' as n8n_demo,
+    summary_accomplishment,
+    summary_nodes,
+    summary_suggestions,
+    content,
+    metadata,
+    1 - (workflows.embedding <=> query_embedding) as similarity
+  from workflows
+  where metadata @> filter
+  order by workflows.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
+
+-- Replace any existing vector index with HNSW
+drop index if exists workflows_embedding_idx;
+create index if not exists workflows_embedding_idx on workflows using hnsw (embedding vector_cosine_ops);
+create index if not exists idx_workflows_metadata on workflows using gin (metadata);
+
+-- Afterwards, reclaim the space of the rewritten rows outside a transaction:
+-- vacuum full workflows;
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+INGESTION = Path(__file__).resolve().parents[1] / "src" / "ingestion"
+
+# The ingestion scripts import their siblings by module name
+sys.path.insert(0, str(INGESTION))
+sys.path.insert(0, str(INGESTION / "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def fake_services(tmp_path_factory):
+    """Base URL of the benchmark's fake services, with both ingestion scripts pointed at them.
+
+    The scripts read their configuration on import, so tests import them only
+    after requesting this fixture.
+    """
+    from bench_ingestion import configure_environment, start_fake_services
+
+    process, base_url = start_fake_services([
+        "--openai-latency", "0", "--supabase-latency", "0", "--site-latency", "0", "--n8n-latency", "0",
+        "--pages", "3", "--paragraphs", "5", "--workflows", "30",
+    ])
+    configure_environment(base_url, str(tmp_path_factory.mktemp("ingestion")))
+    yield base_url
+    process.terminate()
+    process.wait()
+
+
+SUPABASE = Path(__file__).resolve().parents[1] / "src" / "supabase"
+
+
+def supabase_sql(name):
+    """A schema file from src/supabase, without the Supabase-only security statements."""
+    text = (SUPABASE / name).read_text()
+    return text.split("-- Everything above")[0]
+
+
+@pytest.fixture(scope="session")
+def postgres(tmp_path_factory):
+    """A local Postgres server with pgvector, skipped where pgserver is not installed."""
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(str(tmp_path_factory.mktemp("postgres")), cleanup_mode="stop")
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture
+def database(postgres, request):
+    """Autocommit connection to a new database holding the site_pages schema."""
+    psycopg = pytest.importorskip("psycopg")
+    name = "test_" + "".join(c if c.isalnum() else "_" for c in request.node.name).lower()[:50]
+    with psycopg.connect(postgres.get_uri(), autocommit=True) as admin:
+        admin.execute(f'drop database if exists "{name}"')
+        admin.execute(f'create database "{name}"')
+    with psycopg.connect(postgres.get_uri(name), autocommit=True) as conn:
+        conn.execute(supabase_sql("site_pages.sql"))
+        yield conn
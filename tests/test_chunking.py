@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+import chunking
+from chunking import iter_chunks, stream_chunks
+from tokens import count_tokens
+
+
+def document(paragraphs=40):
+    return "\n\n".join(
+        f"Paragraph {i} explains one part of the agent API. It has a second sentence as well." for i in range(paragraphs)
+    )
+
+
+def test_short_text_is_one_chunk():
+    assert list(iter_chunks("Just a sentence.", max_tokens=100)) == ["Just a sentence."]
+    assert list(iter_chunks("", max_tokens=100)) == []
+
+
+def test_chunks_stay_under_the_token_limit_and_break_at_paragraphs():
+    chunks = list(iter_chunks(document(), max_tokens=100))
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.startswith("Paragraph") for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_code_fences_are_preferred_breaks():
+    text = "Intro sentence here. " * 10 + "\n\n```python\nprint('hi')\n```\n\n" + "Outro sentence here. " * 10
+    chunks = list(iter_chunks(text, max_tokens=80))
+    assert any(chunk.startswith("```") for chunk in chunks)
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    chunks = list(iter_chunks(document(), max_tokens=100, overlap_tokens=20))
+    plain = list(iter_chunks(document(), max_tokens=100))
+    assert len(chunks) >= len(plain)
+    assert all(chunks[i][-10:] in chunks[i + 1] for i in range(len(chunks) - 1))
+
+
+def test_text_without_boundaries_is_still_split():
+    chunks = list(iter_chunks("x" * 5000, max_tokens=100))
+    assert len(chunks) > 1
+    assert "".join(chunks) == "x" * 5000
+
+
+def test_large_overlap_still_advances_past_each_chunk():
+    text = "a" * 400 + "\n\n" + "b" * 4000
+    chunks = list(iter_chunks(text, max_tokens=250, overlap_tokens=150))
+    assert len(chunks) < 12
+    assert chunks[0] == "a" * 400
+    assert all(len(chunk) > 300 for chunk in chunks)
+
+
+def random_document(rng):
+    separators = [" ", " ", " ", "\n", "\n\n", "\n\n\n", " ```\n", "````\n", ". "]
+    return "".join(
+        rng.choice(["alpha", "beta", "gamma.", "x" * rng.randint(1, 30)]) + rng.choice(separators)
+        for _ in range(rng.randint(200, 3000))
+    )
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_streaming_matches_whole_text(seed, monkeypatch):
+    # Exact equality holds for the characters-per-token estimate
+    monkeypatch.setattr(chunking, "get_encoding", lambda model: None)
+    rng = random.Random(seed)
+    text = random_document(rng)
+    max_tokens = rng.choice([50, 100, 250])
+    overlap = rng.choice([0, 10, 40, 200])
+    cuts = sorted(rng.sample(range(1, len(text)), 40))
+    pieces = [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+    streamed = list(stream_chunks(pieces, max_tokens, overlap, window_chunks=rng.choice([1, 2, 4])))
+    assert streamed == list(iter_chunks(text, max_tokens, overlap))
@@ -0,0 +1,122 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("psycopg")
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from conftest import supabase_sql  # noqa: E402
+from corpus_snapshot import (  # noqa: E402
+    embedding_column, embedding_rows, export_snapshot, import_mirror, import_table, parse_vector, read_manifest,
+    vector_literal,
+)
+from site_pages_mirror import SitePagesMirror  # noqa: E402
+
+DIMENSIONS = 1536
+
+
+def test_vector_text_round_trip_is_exact():
+    rng = np.random.default_rng(0)
+    vector = np.concatenate([
+        rng.normal(size=1000).astype(np.float32),
+        np.array([0.0, -0.0, 1e-38, 3.4e38, -1.17549435e-38, 0.1, 1 / 3], dtype=np.float32),
+    ])
+    assert parse_vector(vector_literal(vector)).tobytes() == vector.tobytes()
+    assert parse_vector(None) is None and vector_literal(None) is None
+
+
+def test_embedding_column_keeps_missing_embeddings():
+    vectors = [np.arange(3, dtype=np.float32), None, np.ones(3, dtype=np.float32)]
+    rows = embedding_rows(embedding_column(vectors, 3))
+    assert rows[1] is None
+    assert rows[0].tolist() == [0, 1, 2] and rows[2].tolist() == [1, 1, 1]
+    assert [row.tolist() for row in embedding_rows(embedding_column([vectors[0]], 3))] == [[0, 1, 2]]
+
+
+@pytest.fixture
+def corpus(database, postgres):
+    """A database with site_pages and workflows rows, and a second connection outside autocommit."""
+    import psycopg
+
+    database.execute(supabase_sql("workflows.sql"))
+    rng = np.random.default_rng(1)
+    for i in range(5):
+        embedding = None if i == 3 else vector_literal(rng.normal(size=DIMENSIONS).astype(np.float32))
+        database.execute(
+            "insert into site_pages (url, chunk_number, title, summary, content, metadata, embedding) "
+            "values (%s, %s, %s, %s, %s, %s, %s)",
+            (f"https://x/{i // 2}", i % 2, f"Title {i}", "Summary", f"Content {i} – ünïcode",
+             json.dumps({"source": "docs", "depth": i, "tags": ["a", "b"]}), embedding),
+        )
+    database.execute(
+        "insert into workflows (workflow_id, workflow_name, workflow_json, summary_accomplishment, summary_nodes, "
+        "summary_suggestions, content, embedding) values (7, 'Workflow', %s, 'a', 'b', 'c', 'abc', %s)",
+        (json.dumps({"nodes": [{"name": "It's here"}], "connections": {}}),
+         vector_literal(rng.normal(size=DIMENSIONS).astype(np.float32))),
+    )
+    with psycopg.connect(postgres.get_uri(database.info.dbname)) as conn:
+        yield database, conn
+
+
+def table_rows(conn, table):
+    return conn.execute(f"select *, embedding::text from {table} order by id").fetchall()
+
+
+def test_postgres_round_trip(corpus, tmp_path):
+    database, conn = corpus
+    before = {table: table_rows(database, table) for table in ("site_pages", "workflows")}
+    manifest = export_snapshot(conn, tmp_path, ["site_pages", "workflows"], page_size=2)
+    conn.commit()
+    assert manifest["tables"]["site_pages"] == {"file": "site_pages.parquet", "rows": 5, "dimensions": DIMENSIONS}
+    assert read_manifest(tmp_path) == manifest
+    assert pq.ParquetFile(tmp_path / "site_pages.parquet").num_row_groups == 3
+
+    with pytest.raises(ValueError):
+        import_table(conn, "site_pages", tmp_path / "site_pages.parquet")
+    for table in ("site_pages", "workflows"):
+        assert import_table(conn, table, tmp_path / f"{table}.parquet", page_size=2, truncate=True) == len(before[table])
+        assert table_rows(database, table) == before[table]
+
+    # New rows take ids after the imported ones
+    (next_id,) = database.execute("select nextval(pg_get_serial_sequence('site_pages', 'id'))").fetchone()
+    assert next_id > max(row[0] for row in before["site_pages"])
+
+
+def test_snapshots_with_the_old_n8n_demo_column_still_import(corpus, tmp_path):
+    database, conn = corpus
+    before = table_rows(database, "workflows")
+    export_snapshot(conn, tmp_path, ["workflows"])
+    conn.commit()
+    path = tmp_path / "workflows.parquet"
+    table = pq.read_table(path)
+    pq.write_table(table.append_column("n8n_demo", pa.array(["<n8n-demo></n8n-demo>"] * len(table))), path)
+
+    import_table(conn, "workflows", path, truncate=True)
+    assert table_rows(database, "workflows") == before
+
+
+def test_mirror_import_matches_the_database(corpus, tmp_path):
+    database, conn = corpus
+    export_snapshot(conn, tmp_path / "snapshot", ["site_pages"], page_size=2)
+    mirror = SitePagesMirror(str(tmp_path / "mirror"), dimensions=DIMENSIONS)
+    assert import_mirror(tmp_path / "snapshot", mirror, page_size=2) == 4
+    assert mirror.skipped_without_embedding == 1
+
+    # Exact search on the database side; the ivfflat index was built on an empty table
+    database.execute("set enable_indexscan = off")
+    query = database.execute("select embedding::text from site_pages where id = 5").fetchone()[0]
+    expected = [
+        (row[0], row[1]) for row in database.execute(
+            "select id, round((1 - (embedding <=> %s::vector))::numeric, 5)::float "
+            "from site_pages where embedding is not null order by embedding <=> %s::vector limit 3",
+            (query, query),
+        )
+    ]
+    results = mirror.search(parse_vector(query), match_count=3)
+    assert [(row["id"], round(row["similarity"], 5)) for row in results] == expected
+    assert results[0]["metadata"] == {"source": "docs", "depth": 4, "tags": ["a", "b"]}
+    mirror.close()
@@ -0,0 +1,139 @@
+import json
+
+from dedup import BoilerplateFilter, NearDuplicateFilter, simhash
+
+NAV = "Home | Getting started | API reference | Examples | Changelog | Contributing"
+
+
+def page(body):
+    return f"{NAV}\n\n{body}"
+
+
+def test_boilerplate_is_removed_once_seen_on_enough_pages(tmp_path):
+    boilerplate = BoilerplateFilter(min_pages=3, path=str(tmp_path / "boilerplate.json"))
+    outputs = [boilerplate.strip(page(f"Body of page {i}, long enough to be kept as its own block."), f"https://x/{i}")
+               for i in range(4)]
+    assert NAV in outputs[0] and NAV in outputs[1]
+    assert NAV not in outputs[2] and NAV not in outputs[3]
+    assert boilerplate.removed_blocks == 2
+
+
+def test_boilerplate_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "boilerplate.json")
+    first = BoilerplateFilter(min_pages=3, path=path)
+    for i in range(3):
+        first.strip(page(f"Body {i}"), f"https://x/{i}")
+    first.save()
+
+    # Re-crawling one page alone strips the same blocks as in the full run
+    second = BoilerplateFilter(min_pages=3, path=path)
+    assert NAV not in second.strip(page("Body 0"), "https://x/0")
+
+
+def test_reprocessing_a_page_does_not_count_it_twice(tmp_path):
+    boilerplate = BoilerplateFilter(min_pages=2, path=str(tmp_path / "boilerplate.json"))
+    for _ in range(3):
+        assert NAV in boilerplate.strip(page("Body"), "https://x/0")
+
+
+def test_short_blocks_and_code_are_never_removed(tmp_path):
+    boilerplate = BoilerplateFilter(min_pages=1, path=str(tmp_path / "boilerplate.json"))
+    code = "```python\nprint('a fairly long line of example code here')\n```"
+    assert boilerplate.strip(f"Short\n\n{code}", "https://x/0") == f"Short\n\n{code}"
+
+
+def test_simhash_of_similar_texts_is_close():
+    text = "Agents use tools to look up documentation and answer questions about the framework " * 3
+    near = text.replace("answer", "reply to")
+    other = "A completely different paragraph about cooking pasta with tomatoes and basil leaves."
+    assert bin(simhash(text) ^ simhash(near)).count("1") < bin(simhash(text) ^ simhash(other)).count("1")
+    assert simhash(text) == simhash(text.upper())
+
+
+def run_in_order(process, displaced, order):
+    """Process pages in crawl order, then the displaced ones again like crawl_parallel does."""
+    outputs = {url: process(url) for url in order}
+    while displaced:
+        for url in sorted(displaced):
+            outputs[url] = process(url)
+    return outputs
+
+
+def test_boilerplate_does_not_depend_on_crawl_order(tmp_path):
+    bodies = {f"https://x/{i}": page(f"Body of page {i}, long enough to be kept as its own block.")
+              for i in range(4)}
+
+    def run(order):
+        boilerplate = BoilerplateFilter(min_pages=3, path=str(tmp_path / f"{order[0][-1]}.json"))
+        return run_in_order(lambda url: boilerplate.strip(bodies[url], url), boilerplate.displaced, order)
+
+    forward = run(sorted(bodies))
+    backward = run(sorted(bodies, reverse=True))
+    assert forward == backward
+    assert all(NAV not in output for output in forward.values())
+
+
+def test_boilerplate_displaced_pages_are_saved(tmp_path):
+    path = str(tmp_path / "boilerplate.json")
+    first = BoilerplateFilter(min_pages=2, path=path)
+    first.strip(page("Body 0"), "https://x/0")
+    first.strip(page("Body 1"), "https://x/1")
+    assert first.displaced == {"https://x/0"}
+    first.save()
+    assert BoilerplateFilter(min_pages=2, path=path).displaced == {"https://x/0"}
+
+
+def test_near_duplicates_keep_the_copy_on_the_first_url(tmp_path):
+    text = "The same installation instructions appear on several pages of the documentation site."
+    unique = {
+        "https://x/a": "Each page also has something of its own to say about agents.",
+        "https://x/b": "Streaming responses arrive as partial messages you can validate early.",
+        "https://x/c": "Dependencies are injected into tools through the run context object.",
+    }
+
+    def run(order):
+        near = NearDuplicateFilter(path=str(tmp_path / f"{order[0][-1]}.json"))
+        return run_in_order(lambda url: near.filter_page(url, [text, unique[url]]), near.displaced, order)
+
+    forward = run(["https://x/a", "https://x/b", "https://x/c"])
+    backward = run(["https://x/c", "https://x/b", "https://x/a"])
+    assert forward["https://x/a"] == [text, unique["https://x/a"]]
+    assert forward["https://x/b"] == [unique["https://x/b"]]
+    assert forward["https://x/c"] == [unique["https://x/c"]]
+    assert backward == forward
+
+
+def test_removed_original_brings_back_the_dropped_copy(tmp_path):
+    text = "The same installation instructions appear on several pages of the documentation site."
+    near = NearDuplicateFilter(path=str(tmp_path / "near.json"))
+    near.filter_page("https://x/a", [text])
+    assert near.filter_page("https://x/b", [text]) == []
+    near.save()
+
+    # Page a no longer has the text, so page b must keep its copy
+    again = NearDuplicateFilter(path=str(tmp_path / "near.json"))
+    assert again.filter_page("https://x/a", ["Something else entirely about model settings."])
+    assert again.displaced == {"https://x/b"}
+    assert again.filter_page("https://x/b", [text]) == [text]
+    assert not again.displaced
+
+
+def test_legacy_state_files_still_load(tmp_path):
+    text = "Repeated paragraph about configuring the retry policy for model requests."
+    (tmp_path / "near.json").write_text(json.dumps({"https://x/a": [simhash(text)]}))
+    (tmp_path / "boilerplate.json").write_text(json.dumps({"https://x/a": ["00"]}))
+    assert NearDuplicateFilter(path=str(tmp_path / "near.json")).filter_page("https://x/b", [text]) == []
+    assert not BoilerplateFilter(path=str(tmp_path / "boilerplate.json")).displaced
+
+
+def test_near_duplicates_within_a_page_and_across_runs(tmp_path):
+    path = str(tmp_path / "near.json")
+    text = "Repeated paragraph about configuring the retry policy for model requests."
+    near = NearDuplicateFilter(path=path)
+    assert near.filter_page("https://x/a", [text, text]) == [text]
+    near.save()
+
+    # A page re-crawled on its own never matches its own earlier chunks
+    again = NearDuplicateFilter(path=path)
+    assert again.filter_page("https://x/a", [text]) == [text]
+    assert again.filter_page("https://x/b", [text]) == []
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher, pack_batches
+from embedding_cache import EmbeddingCache
+
+
+def test_pack_batches_respects_item_and_token_limits():
+    assert pack_batches([1, 1, 1, 1, 1], max_items=2) == [[0, 1], [2, 3], [4]]
+    assert pack_batches([6, 5, 4, 1], max_tokens=10) == [[0], [1, 2, 3]]
+    # An oversized input gets a batch of its own
+    assert pack_batches([3, 20, 3], max_tokens=10) == [[0], [1], [2]]
+
+
+def fake_embedder(calls):
+    async def embed_many(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    return embed_many
+
+
+def test_concurrent_callers_share_a_request():
+    calls = []
+
+    async def run():
+        batcher = EmbeddingBatcher(fake_embedder(calls), max_items=8, max_wait=0.01, dimensions=2)
+        vectors = await batcher.embed_texts(["a", "bb", "ccc"])
+        await batcher.flush()
+        return batcher, vectors
+
+    batcher, vectors = asyncio.run(run())
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert calls == [["a", "bb", "ccc"]]
+    assert batcher.requests == 1
+    assert batcher.texts == 3
+
+
+def test_full_batch_is_sent_without_waiting():
+    calls = []
+
+    async def run():
+        batcher = EmbeddingBatcher(fake_embedder(calls), max_items=2, max_wait=10, dimensions=2)
+        return await asyncio.wait_for(batcher.embed_texts(["a", "b", "c", "d"]), 1)
+
+    assert len(asyncio.run(run())) == 4
+    assert calls == [["a", "b"], ["c", "d"]]
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    async def broken(texts):
+        raise RuntimeError("rate limited")
+
+    async def run():
+        batcher = EmbeddingBatcher(broken, max_wait=0.01, dimensions=2)
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["rate limited", "rate limited"]
+
+
+def test_wrong_number_of_vectors_is_an_error():
+    async def short(texts):
+        return [[0.0, 0.0]]
+
+    async def run():
+        batcher = EmbeddingBatcher(short, max_wait=0.01, dimensions=2)
+        await batcher.embed_texts(["a", "b"])
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+
+def test_cached_texts_skip_the_request(tmp_path):
+    calls = []
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+
+    async def run():
+        batcher = EmbeddingBatcher(fake_embedder(calls), max_wait=0.01, dimensions=2, cache=cache)
+        first = await batcher.embed("hello")
+        second = await batcher.embed("hello")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == [5.0, 1.0]
+    assert calls == [["hello"]]
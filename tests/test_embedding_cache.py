@@ -0,0 +1,57 @@
+import sqlite3
+
+from embedding_cache import EmbeddingCache
+
+
+def stored_rows(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("select key, last_used from embeddings"))
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many("model", 2, ["a", "b"], [[0.5, 1.0], [0.25, -2.0]])
+    assert cache.get_many("model", 2, ["b", "c", "a"]) == [[0.25, -2.0], None, [0.5, 1.0]]
+    assert cache.get("model", 3, "a") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, touch_batch=2)
+    cache.put_many("model", 1, ["a", "b"], [[1.0], [2.0]])
+    before = stored_rows(path)
+
+    cache.get("model", 1, "a")
+    assert stored_rows(path) == before
+    cache.get("model", 1, "b")
+    after = stored_rows(path)
+    assert all(after[key] > before[key] for key in before)
+
+    cache.get("model", 1, "a")
+    cache.close()
+    assert stored_rows(path)[EmbeddingCache.key("model", 1, "a")] > after[EmbeddingCache.key("model", 1, "a")]
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_entries=10)
+    texts = [str(i) for i in range(10)]
+    cache.put_many("model", 1, texts, [[float(i)] for i in range(10)])
+    cache.get("model", 1, "0")
+    # Re-storing cached texts does not count them twice
+    cache.put_many("model", 1, texts[:5], [[float(i)] for i in range(5)])
+    assert len(stored_rows(path)) == 10
+
+    cache.put_many("model", 1, ["new"], [[1.0]])
+    assert len(stored_rows(path)) == 9
+    assert cache.get("model", 1, "new") == [1.0]
+    assert cache.get("model", 1, "0") == [0.0]
+    cache.close()
+
+    # The row count is picked up again on open
+    reopened = EmbeddingCache(path, max_entries=10)
+    reopened.put_many("model", 1, ["x"], [[1.0]])
+    assert len(stored_rows(path)) == 10
+    reopened.put_many("model", 1, ["y"], [[2.0]])
+    assert len(stored_rows(path)) == 9
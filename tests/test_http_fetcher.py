@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from http_fetcher import HttpCache, StaticPageFetcher
+
+pytest.importorskip("crawl4ai")
+
+PAGE = "<html><body><main><h1>Agents</h1>" + "<p>Agents call tools and validate results.</p>" * 20 + "</main></body></html>"
+
+
+def fetch_twice(fetcher, url):
+    async def run():
+        async with fetcher:
+            return await fetcher.fetch_markdown(url), await fetcher.fetch_markdown(url)
+    return asyncio.run(run())
+
+
+def serving(handler):
+    """A fetcher whose client answers from `handler` instead of the network."""
+    class Fetcher(StaticPageFetcher):
+        async def start(self):
+            self._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return Fetcher
+
+
+def test_unchanged_page_is_served_from_the_cache_after_a_304(tmp_path, fake_services):
+    fetcher = StaticPageFetcher(HttpCache(str(tmp_path)))
+    first, second = fetch_twice(fetcher, f"{fake_services}/site/page-0")
+    assert first and first == second
+    assert (fetcher.fetched, fetcher.not_modified, fetcher.fallbacks) == (1, 1, 0)
+
+
+def test_last_modified_is_sent_back(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-Modified-Since"))
+        if request.headers.get("If-Modified-Since"):
+            return httpx.Response(304)
+        return httpx.Response(200, text=PAGE, headers={
+            "content-type": "text/html", "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+        })
+
+    fetcher = serving(handler)(HttpCache(str(tmp_path)))
+    first, second = fetch_twice(fetcher, "https://docs.example/agents")
+    assert "Agents call tools" in first and first == second
+    assert seen == [None, "Mon, 01 Jan 2024 00:00:00 GMT"]
+
+    # The cache is on disk, so a new process still sends a conditional request
+    again = serving(handler)(HttpCache(str(tmp_path)))
+    assert fetch_twice(again, "https://docs.example/agents")[0] == first
+    assert again.not_modified == 2
+
+
+def test_pages_needing_javascript_fall_back_to_the_browser(tmp_path):
+    responses = {
+        "https://docs.example/spa": httpx.Response(200, text='<html><div id="root"></div></html>',
+                                                   headers={"content-type": "text/html"}),
+        "https://docs.example/short": httpx.Response(200, text="<p>Loading</p>", headers={"content-type": "text/html"}),
+        "https://docs.example/data": httpx.Response(200, json={"a": 1}),
+        "https://docs.example/gone": httpx.Response(404),
+    }
+    fetcher = serving(lambda request: responses[str(request.url)])(HttpCache(str(tmp_path)))
+
+    async def run():
+        async with fetcher:
+            return [await fetcher.fetch_markdown(url) for url in responses]
+
+    assert asyncio.run(run()) == [None] * 4
+    assert fetcher.fallbacks == 4
@@ -0,0 +1,44 @@
+from incremental import ChangeTracker, RejectedWorkflows, content_hash
+
+
+def tracker(chunks, lastmod="2024-05-01"):
+    return ChangeTracker({"https://x/a": chunks}, {"https://x/a": lastmod})
+
+
+def stored(lastmod, chunk_count, text="text"):
+    return {"lastmod": lastmod, "chunk_count": chunk_count, "content_hash": content_hash(text)}
+
+
+def test_page_unchanged_needs_every_chunk_at_the_current_lastmod():
+    assert tracker({0: stored("2024-05-01", 2), 1: stored("2024-05-01", 2)}).page_unchanged("https://x/a")
+    assert not tracker({0: stored("2024-04-01", 2), 1: stored("2024-05-01", 2)}).page_unchanged("https://x/a")
+    assert not tracker({0: stored("2024-05-01", 2), 1: stored("2024-05-01", 2)}, None).page_unchanged("https://x/a")
+    assert not tracker({}).page_unchanged("https://x/a")
+
+
+def test_page_with_a_missing_chunk_is_processed_again():
+    assert not tracker({0: stored("2024-05-01", 3), 2: stored("2024-05-01", 3)}).page_unchanged("https://x/a")
+    # Chunks stored before chunk_count was recorded
+    assert not tracker({0: {"lastmod": "2024-05-01"}}).page_unchanged("https://x/a")
+
+
+def test_chunk_changes_and_stale_chunks():
+    changes = tracker({0: stored("2024-04-01", 3, "old"), 1: stored("2024-04-01", 3), 2: stored("2024-04-01", 3)})
+    assert changes.chunk_unchanged("https://x/a", 1, content_hash("text"))
+    assert not changes.chunk_unchanged("https://x/a", 0, content_hash("text"))
+    assert not changes.chunk_unchanged("https://x/a", 5, content_hash("text"))
+    assert changes.stale_chunk_numbers("https://x/a", 1) == [1, 2]
+
+
+def test_rejected_workflows_persist_until_their_content_changes(tmp_path):
+    path = str(tmp_path / "rejected.json")
+    rejected = RejectedWorkflows(path)
+    rejected.record(7, "hash-1", "BAD")
+
+    again = RejectedWorkflows(path)
+    assert again.skip(7, "hash-1")
+    assert not again.skip(7, "hash-2")
+    assert again.skipped == 1
+
+    again.record(7, "hash-2", "GOOD")
+    assert len(RejectedWorkflows(path)) == 0
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+pytest.importorskip("supabase")
+
+
+@pytest.fixture(scope="module")
+def ingest(fake_services):
+    import ingest_n8n_workflows
+    return ingest_n8n_workflows
+
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.sqlite3")
+    monkeypatch.setenv("INGEST_JOURNAL_PATH", path)
+    return path
+
+
+def test_failed_fetch_keeps_the_run_open(ingest, journal_path, monkeypatch):
+    from journal import IngestJournal
+
+    fetch_workflow = ingest.fetch_workflow
+
+    async def flaky(client, workflow_id):
+        if workflow_id == 3:
+            raise ConnectionError("connection reset")
+        return await fetch_workflow(client, workflow_id)
+
+    monkeypatch.setattr(ingest, "fetch_workflow", flaky)
+    stats = asyncio.run(ingest.main())
+    assert stats["fetch"].failed == 1
+
+    journal = IngestJournal("n8n_workflows", journal_path)
+    assert journal.resumed
+    assert not journal.done("3", "stored") and not journal.done("3", "missing")
+
+
+
+def search(ingest, pages, rows=2):
+    """Run search_workflow_ids against canned search pages, returning the ids and pages requested."""
+    import httpx
+
+    requested = []
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        requested.append(page)
+        return httpx.Response(200, json=pages[page - 1] if page <= len(pages) else {"workflows": []})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await ingest.search_workflow_ids(client, rows=rows)
+
+    return asyncio.run(run()), requested
+
+
+def workflows(*ids):
+    return [{"id": workflow_id} for workflow_id in ids]
+
+
+def test_search_pages_until_a_short_page_without_a_total(ingest):
+    ids, requested = search(ingest, [{"workflows": workflows(1, 2)}, {"workflows": workflows(4, 5)},
+                                     {"workflows": workflows(8)}])
+    assert ids == [1, 2, 4, 5, 8]
+    assert requested == [1, 2, 3]
+
+
+def test_search_stops_at_an_empty_page(ingest):
+    ids, requested = search(ingest, [{"workflows": workflows(1, 2)}, {"workflows": workflows(3, 4)}])
+    assert ids == [1, 2, 3, 4]
+    assert requested == [1, 2, 3]
+
+
+def test_search_ignores_a_wrong_total(ingest):
+    ids, _ = search(ingest, [{"totalWorkflows": 2, "workflows": workflows(1, 2)},
+                             {"totalWorkflows": 2, "workflows": workflows(3)}])
+    assert ids == [1, 2, 3]
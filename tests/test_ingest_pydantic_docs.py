@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("crawl4ai")
+pytest.importorskip("supabase")
+
+
+@pytest.fixture(scope="module")
+def ingest(fake_services):
+    import ingest_pydantic_docs
+    return ingest_pydantic_docs
+
+
+def chunks(ingest, count, url="https://docs.example/page"):
+    return [ingest.new_chunk(f"Content of chunk {i}.", i, url) for i in range(count)]
+
+
+def test_one_request_summarizes_a_batch(ingest, fake_services):
+    from bench_ingestion import service_counts
+
+    service_counts(fake_services, reset=True)
+    summarized = asyncio.run(ingest.summarize_chunks(chunks(ingest, 4)))
+    assert [chunk.title for chunk in summarized] == ["Title 0", "Title 1", "Title 2", "Title 3"]
+    assert [chunk.summary for chunk in summarized] == [f"Summary of chunk {i}." for i in range(4)]
+    assert service_counts(fake_services)["openai"] == 1
+
+
+def test_chunks_missing_from_the_batch_fall_back_one_by_one(ingest, monkeypatch):
+    requested = []
+
+    async def partial(pairs, max_chars=1000):
+        requested.append([content for content, _ in pairs])
+        return [{"title": "Batched", "summary": "From the batch."}, None, None]
+
+    monkeypatch.setattr(ingest, "get_titles_and_summaries", partial)
+    batch = chunks(ingest, 4)
+    batch[3].title, batch[3].summary = "Restored", "From the journal."
+    summarized = asyncio.run(ingest.summarize_chunks(batch))
+    # Chunks that already have a title are not sent again
+    assert requested == [["Content of chunk 0.", "Content of chunk 1.", "Content of chunk 2."]]
+    assert [chunk.title for chunk in summarized] == ["Batched", "Title", "Title", "Restored"]
+
+
+def test_failed_batch_and_failed_fallback(ingest, monkeypatch):
+    async def broken_batch(pairs, max_chars=1000):
+        raise RuntimeError("batch failed")
+
+    async def single(chunk, url):
+        if chunk.endswith("1."):
+            raise RuntimeError("chunk failed")
+        return {"title": "Single", "summary": "One request."}
+
+    monkeypatch.setattr(ingest, "get_titles_and_summaries", broken_batch)
+    monkeypatch.setattr(ingest, "get_title_and_summary", single)
+    summarized = asyncio.run(ingest.summarize_chunks(chunks(ingest, 3)))
+    # The stage drops the chunk that still has no summary
+    assert [chunk and chunk.title for chunk in summarized] == ["Single", None, "Single"]
+
+
+def stored_pages(base_url):
+    import httpx
+
+    rows = httpx.get(f"{base_url}/rest/v1/site_pages", params={"limit": 10000}).json()
+    pages = {}
+    for row in rows:
+        if row["chunk_number"] < row["metadata"]["chunk_count"]:
+            pages.setdefault(row["url"], {})[row["chunk_number"]] = row["content"]
+    return pages
+
+
+def test_stored_chunks_do_not_depend_on_crawl_order(ingest, fake_services, tmp_path, monkeypatch):
+    urls = [f"{fake_services}/site/page-{n}" for n in range(3)]
+    results = []
+    for order in (urls, urls[::-1]):
+        monkeypatch.setenv("DEDUP_STATE_DIR", str(tmp_path / str(len(results))))
+        asyncio.run(ingest.crawl_parallel(order, max_concurrent=1))
+        results.append(stored_pages(fake_services))
+    forward, backward = results
+    assert forward == backward
+    # The navigation is on every page, so the first pages crawled lose it too
+    assert not any("Section 1" in content for page in forward.values() for content in page.values())
+
+
+def test_resumed_run_skips_pages_already_stored(ingest, fake_services, tmp_path):
+    from bench_ingestion import service_counts
+    from journal import IngestJournal
+
+    urls = [f"{fake_services}/site/page-{n}" for n in range(2)]
+    journal = IngestJournal("docs", str(tmp_path / "journal.sqlite3"))
+    journal.record(urls[0], "stored")
+
+    service_counts(fake_services, reset=True)
+    asyncio.run(ingest.crawl_parallel(urls, dedupe=False, journal=journal))
+    assert service_counts(fake_services)["site"] == 1
+    assert journal.done(urls[1], "stored")
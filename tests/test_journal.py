@@ -0,0 +1,48 @@
+import pytest
+
+from journal import IngestJournal
+
+
+def test_unfinished_run_is_resumed(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    first = IngestJournal("docs", path)
+    assert not first.resumed
+    first.record("https://x/a#hash", "summary", {"title": "Title", "summary": "Summary."})
+    first.record("https://x/a#hash", "embedding", vector=[0.5, -0.25, 1.0])
+    first.record("https://x/a", "stored")
+    first.close()
+
+    # The process died before finish(), so the next one picks up its work
+    second = IngestJournal("docs", path)
+    assert second.resumed and second.run_id == first.run_id
+    assert second.done("https://x/a", "stored")
+    assert not second.done("https://x/b", "stored")
+    assert second.get("https://x/a#hash", "summary") == {"title": "Title", "summary": "Summary."}
+    assert second.get_vector("https://x/a#hash", "embedding") == pytest.approx([0.5, -0.25, 1.0])
+    assert second.count("stored") == 1
+
+
+def test_finished_run_starts_from_scratch(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    first = IngestJournal("docs", path)
+    first.record("https://x/a", "stored")
+    first.finish()
+    first.close()
+
+    second = IngestJournal("docs", path)
+    assert not second.resumed and second.run_id != first.run_id
+    assert not second.done("https://x/a", "stored")
+    assert second.get("https://x/a", "stored") is None
+
+
+def test_sources_resume_independently(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    docs = IngestJournal("docs", path)
+    docs.record("https://x/a", "stored")
+    docs.finish()
+    workflows = IngestJournal("workflows", path)
+    workflows.record("42", "stored")
+
+    assert not IngestJournal("docs", path).resumed
+    resumed = IngestJournal("workflows", path)
+    assert resumed.resumed and resumed.done("42", "stored")
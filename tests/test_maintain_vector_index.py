@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import supabase_sql
+from maintain_vector_index import apply_search_params, plan_index, rebuild_index, vector_indexes
+
+
+def test_small_tables_get_default_hnsw():
+    plan = plan_index(50_000)
+    assert plan.method == "hnsw"
+    assert plan.build_params == {"m": 16, "ef_construction": 64}
+    assert plan.search_params == {"hnsw.ef_search": 40}
+
+
+def test_large_hnsw_is_built_denser():
+    plan = plan_index(1_500_000, "hnsw")
+    assert plan.build_params == {"m": 24, "ef_construction": 128}
+    assert plan.search_params == {"hnsw.ef_search": 100}
+
+
+def test_auto_switches_to_ivfflat_above_the_hnsw_limit(monkeypatch):
+    import maintain_vector_index
+
+    monkeypatch.setattr(maintain_vector_index, "HNSW_MAX_ROWS", 1000)
+    assert plan_index(1000).method == "hnsw"
+    assert plan_index(1001).method == "ivfflat"
+
+
+@pytest.mark.parametrize("rows, lists, probes", [
+    (0, 1, 1),
+    (500, 1, 1),
+    (100_000, 100, 10),
+    (1_000_000, 1000, 32),
+    (4_000_000, 2000, 45),
+])
+def test_ivfflat_lists_and_probes(rows, lists, probes):
+    plan = plan_index(rows, "ivfflat")
+    assert plan.build_params == {"lists": lists}
+    assert plan.search_params == {"ivfflat.probes": probes}
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        plan_index(10, "diskann")
+
+
+def function_settings(conn, function):
+    return {
+        signature: sorted(config or [])
+        for signature, config in conn.execute(
+            "select oid::regprocedure::text, proconfig from pg_proc where proname = %s", (function,)
+        )
+    }
+
+
+def test_search_params_follow_the_index_method(database):
+    apply_search_params(database, "match_site_pages", plan_index(100_000, "ivfflat"))
+    assert list(function_settings(database, "match_site_pages").values()) == [["ivfflat.probes=10"]]
+
+    # Switching methods drops the setting of the old one
+    apply_search_params(database, "match_site_pages", plan_index(100_000, "hnsw"))
+    assert list(function_settings(database, "match_site_pages").values()) == [["hnsw.ef_search=40"]]
+
+
+def test_search_params_reach_every_match_function_of_the_table(database):
+    database.execute(supabase_sql("match_site_pages_batch.sql"))
+    database.execute(supabase_sql("compact_embeddings.sql"))
+    # An overload left by an earlier version, and a function that only shares the prefix
+    database.execute("create function match_site_pages_batch(query vector[]) returns int language sql as 'select 1'")
+    database.execute("create function match_site_pagesx(query vector) returns int language sql as 'select 1'")
+
+    tuned = apply_search_params(database, "match_site_pages", plan_index(100_000, "ivfflat"))
+    assert len(tuned) == 4
+    for function in ("match_site_pages", "match_site_pages_batch", "match_site_pages_compact"):
+        assert all(config == ["ivfflat.probes=10"] for config in function_settings(database, function).values())
+    assert list(function_settings(database, "match_site_pagesx").values()) == [[]]
+
+
+def test_rebuild_replaces_the_existing_index(database):
+    assert len(vector_indexes(database, "site_pages", "embedding")) == 1
+    rebuild_index(database, "site_pages", "embedding", plan_index(0, "hnsw"))
+    assert vector_indexes(database, "site_pages", "embedding") == ["site_pages_embedding_idx"]
+    (definition,) = database.execute(
+        "select indexdef from pg_indexes where indexname = 'site_pages_embedding_idx'"
+    ).fetchone()
+    assert "hnsw" in definition and "m='16'" in definition
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from pipeline import Stage, run_pipeline
+
+
+async def double(x):
+    return x * 2
+
+
+async def drop_odd(x):
+    return x if x % 2 == 0 else None
+
+
+async def fail_on_three(x):
+    if x == 3:
+        raise RuntimeError("three")
+    return x
+
+
+def test_items_flow_through_every_stage():
+    collected = []
+
+    async def collect(x):
+        collected.append(x)
+        return x
+
+    stats = asyncio.run(run_pipeline(range(10), [
+        Stage("double", double, workers=3),
+        Stage("collect", collect),
+    ], queue_size=2))
+    assert sorted(collected) == [x * 2 for x in range(10)]
+    assert stats["double"].received == stats["double"].emitted == 10
+    assert stats["collect"].emitted == 10
+
+
+def test_none_is_dropped_and_exceptions_are_failed():
+    stats = asyncio.run(run_pipeline(range(6), [
+        Stage("filter", drop_odd),
+        Stage("check", fail_on_three),
+    ]))
+    assert stats["filter"].dropped == 3
+    assert stats["check"].received == 3
+    assert stats["check"].failed == 0
+
+    stats = asyncio.run(run_pipeline(range(5), [Stage("check", fail_on_three)]))
+    assert stats["check"].failed == 1
+    assert stats["check"].emitted == 4
+    assert stats["check"].errors == ["three"]
+
+
+def test_fan_out_and_batches():
+    batches = []
+
+    async def split(x):
+        return [x, x]
+
+    async def batch(items):
+        batches.append(len(items))
+        return [None if item == 0 else item for item in items]
+
+    stats = asyncio.run(run_pipeline(range(4), [
+        Stage("split", split, fan_out=True),
+        Stage("batch", batch, batch_size=3, batch_wait=0.5),
+    ]))
+    assert stats["split"].emitted == 8
+    assert sum(batches) == 8
+    assert max(batches) <= 3
+    assert stats["batch"].dropped == 2
+    assert stats["batch"].emitted == 6
+
+
+def test_async_source():
+    async def source():
+        for x in range(3):
+            yield x
+
+    stats = asyncio.run(run_pipeline(source(), [Stage("double", double)]))
+    assert stats["double"].emitted == 3
+
+
+def test_needs_a_stage():
+    with pytest.raises(ValueError):
+        asyncio.run(run_pipeline([], []))
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import AdaptiveLimiter, is_retryable, retry_after_seconds
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class APIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers or {})
+
+
+def flaky(errors, result="ok"):
+    """Coroutine function that raises the given errors in turn, then returns `result`."""
+    errors = list(errors)
+
+    async def call():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return call
+
+
+def test_error_classification():
+    assert is_retryable(APIError(429))
+    assert is_retryable(APIError(503))
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(APIError(400))
+    assert not is_retryable(ValueError())
+    assert retry_after_seconds(APIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(APIError(429, {"retry-after": "2"})) == 2.0
+    assert retry_after_seconds(APIError(429, {"retry-after": "soon"})) is None
+
+
+def test_concurrency_grows_additively_and_halves_on_429():
+    limiter = AdaptiveLimiter("test", initial_concurrency=4, max_concurrency=5, base_delay=0)
+
+    async def run(calls):
+        for call in calls:
+            await limiter.call(call)
+
+    asyncio.run(run([flaky([]) for _ in range(4)]))
+    expected = 4.0
+    for _ in range(4):
+        expected += 1 / expected
+    assert limiter.limit == pytest.approx(expected)
+
+    limiter.limit = 8
+    asyncio.run(run([flaky([APIError(429), APIError(429)])]))
+    # One burst of 429s halves the limit once, then the success adds to it
+    assert limiter.limit == pytest.approx(4 + 1 / 4)
+    assert limiter.throttled == 2
+
+    limiter.limit = 1
+    limiter._last_decrease = 0
+    asyncio.run(run([flaky([APIError(429)])]))
+    assert limiter.limit == pytest.approx(2)
+
+
+def test_retries_transient_errors_and_raises_the_rest():
+    limiter = AdaptiveLimiter("test", max_retries=2, base_delay=0)
+    assert asyncio.run(limiter.call(flaky([APIError(500), ConnectionError()]))) == "ok"
+    assert limiter.retries == 2
+
+    with pytest.raises(APIError):
+        asyncio.run(limiter.call(flaky([APIError(500)] * 3)))
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.call(flaky([ValueError("bad request")])))
+    assert limiter.retries == 4
+
+
+def test_backoff_does_not_hold_a_slot():
+    limiter = AdaptiveLimiter("test", initial_concurrency=1, max_concurrency=1, base_delay=0.2)
+
+    async def run():
+        slow = asyncio.create_task(limiter.call(flaky([APIError(500)] * 2)))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await limiter.call(flaky([]))
+        quick = time.monotonic() - started
+        await slow
+        return quick
+
+    assert asyncio.run(run()) < 0.1
+
+
+def test_retry_after_pauses_callers_waiting_for_a_slot():
+    limiter = AdaptiveLimiter("test", initial_concurrency=1, min_concurrency=1, max_concurrency=1, base_delay=0)
+
+    async def throttled():
+        await asyncio.sleep(0.05)
+        raise APIError(429, {"retry-after-ms": "300"})
+
+    async def run():
+        started = time.monotonic()
+        first = asyncio.create_task(limiter.call(throttled))
+        await asyncio.sleep(0.01)
+        # Waits for the slot, which frees up when the 429 starts the pause
+        await limiter.call(flaky([]))
+        waited = time.monotonic() - started
+        first.cancel()
+        return waited
+
+    assert asyncio.run(run()) >= 0.3
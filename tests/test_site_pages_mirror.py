@@ -0,0 +1,90 @@
+import pytest
+
+from site_pages_mirror import SitePagesMirror, jsonb_contains
+
+
+def test_jsonb_contains_matches_postgres():
+    document = {"source": "pydantic_ai_docs", "tags": ["agents", "tools"], "depth": 2, "draft": False}
+    assert jsonb_contains(document, {})
+    assert jsonb_contains(document, {"source": "pydantic_ai_docs"})
+    assert jsonb_contains(document, {"tags": ["tools"]})
+    assert not jsonb_contains(document, {"tags": "tools"})
+    assert not jsonb_contains(document, {"source": "other"})
+    assert not jsonb_contains(document, {"draft": 0})
+    assert not jsonb_contains(document, {"depth": True})
+    assert jsonb_contains(["a", "b"], "a")
+    assert jsonb_contains([1, [2, 3]], [[3]])
+    assert not jsonb_contains({"a": [1]}, {"a": 1})
+
+
+def row(id_, embedding, source="docs"):
+    return {"id": id_, "url": f"https://x/{id_ // 10}", "chunk_number": id_ % 10, "title": "t", "summary": "s",
+            "content": f"chunk {id_}", "metadata": {"source": source}, "embedding": embedding}
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = SitePagesMirror(str(tmp_path), dimensions=3)
+    mirror.upsert_rows([row(1, [1, 0, 0]), row(2, [0, 1, 0]), row(3, [0, 0, 1], source="blog")])
+    yield mirror
+    mirror.close()
+
+
+def test_search_orders_by_cosine_similarity_and_filters(mirror):
+    results = mirror.search([1, 0.5, 0], match_count=2)
+    assert [result["id"] for result in results] == [1, 2]
+    assert results[0]["similarity"] == pytest.approx(2 / 5 ** 0.5)
+    assert [result["id"] for result in mirror.search([0, 0, 1], 5, {"source": "blog"})] == [3]
+
+
+def test_upsert_replaces_rows_in_place(mirror):
+    mirror.upsert_rows([row(1, [0, 0, 1])])
+    assert len(mirror) == 3
+    assert [result["id"] for result in mirror.search([0, 0, 1], 2)] == [1, 3]
+
+
+def test_failed_upsert_leaves_the_mirror_unchanged(tmp_path, mirror):
+    with pytest.raises(ValueError):
+        mirror.upsert_rows([row(4, [1, 1, 0]), row(5, [1, 1])])
+    with pytest.raises(ValueError):
+        mirror.upsert_rows([row(6, None)])
+    assert len(mirror) == 3
+    assert [result["id"] for result in mirror.search([1, 1, 0], 2)] == [1, 2]
+
+    mirror.close()
+    reopened = SitePagesMirror(str(tmp_path), dimensions=3)
+    assert len(reopened.vectors) == 3
+    reopened.close()
+
+
+def test_load_pages_skips_rows_without_embedding(mirror):
+    assert mirror.load_pages([[row(4, [1, 1, 0]), row(5, None)]]) == 1
+    assert mirror.skipped_without_embedding == 1
+    assert len(mirror) == 4
+
+
+def test_load_pages_reads_the_positions_once(mirror, monkeypatch):
+    reads = []
+    positions = mirror._positions
+    monkeypatch.setattr(mirror, "_positions", lambda: reads.append(1) or positions())
+    pages = [[row(10 + 2 * i, [1, 0, i]), row(11 + 2 * i, [0, 1, i])] for i in range(5)]
+    # A row already stored, and one repeated from an earlier page, are replaced in place
+    pages.append([row(1, [0, 0, 1]), row(10, [1, 1, 1])])
+    assert mirror.load_pages(pages) == 12
+    assert reads == [1]
+    assert len(mirror) == 13 and len(mirror.vectors) == 13
+    assert mirror.search([1, 1, 1], 1)[0]["content"] == "chunk 10"
+    assert mirror.search([0, 1, 4], 1)[0]["id"] == 19
+
+
+def test_failed_page_keeps_later_pages_aligned(tmp_path, mirror):
+    broken = {**row(21, [0, 1, 1]), "url": None}
+    with pytest.raises(Exception):
+        mirror.load_pages([[row(20, [1, 0, 1])], [broken]])
+    assert mirror.load_pages([[row(22, [1, 1, 0])]]) == 1
+    assert mirror.search([1, 1, 0], 1)[0]["id"] == 22
+
+    mirror.close()
+    reopened = SitePagesMirror(str(tmp_path), dimensions=3)
+    assert sorted(int(i) for i in reopened.ids) == [1, 2, 3, 20, 22]
+    reopened.close()
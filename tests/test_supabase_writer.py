@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from supabase_writer import BatchUpsertWriter, is_row_error
+
+
+class RowError(Exception):
+    def __init__(self, code):
+        super().__init__(f"error {code}")
+        self.code = code
+
+
+class FakeTable:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    def upsert(self, rows, on_conflict):
+        return FakeTable(self.client, rows)
+
+    def execute(self):
+        self.client.calls.append([row["id"] for row in self.rows])
+        if self.client.transient_failures:
+            self.client.transient_failures -= 1
+            raise ConnectionError("reset")
+        if any(row["id"] in self.client.bad_ids for row in self.rows):
+            raise RowError("23505")
+        self.client.stored.extend(self.rows)
+
+
+class FakeClient:
+    def __init__(self, bad_ids=(), transient_failures=0):
+        self.bad_ids = set(bad_ids)
+        self.transient_failures = transient_failures
+        self.calls = []
+        self.stored = []
+
+    def table(self, name):
+        return FakeTable(self, None)
+
+
+def write(client, rows, **kwargs):
+    async def run():
+        async with BatchUpsertWriter(client, "site_pages", "url,chunk_number", retry_delay=0, **kwargs) as writer:
+            for row in rows:
+                await writer.add(row)
+        return writer
+    return asyncio.run(run())
+
+
+def test_is_row_error():
+    assert is_row_error(RowError("23505"))
+    assert is_row_error(RowError("22P02"))
+    assert not is_row_error(RowError("08006"))
+    assert not is_row_error(ConnectionError())
+
+
+def test_rows_are_written_in_batches():
+    client = FakeClient()
+    writer = write(client, [{"id": i} for i in range(5)], batch_size=2)
+    assert [row["id"] for row in client.stored] == [0, 1, 2, 3, 4]
+    assert writer.written == 5
+    assert writer.failed == []
+
+
+def test_bad_rows_are_isolated_by_bisection():
+    client = FakeClient(bad_ids={2})
+    writer = write(client, [{"id": i} for i in range(4)], batch_size=4)
+    assert sorted(row["id"] for row in client.stored) == [0, 1, 3]
+    assert [row["id"] for row, _ in writer.failed] == [2]
+    assert writer.written == 3
+
+
+def test_transient_errors_are_retried():
+    client = FakeClient(transient_failures=2)
+    writer = write(client, [{"id": 1}], max_retries=3)
+    assert writer.written == 1
+    assert client.calls == [[1], [1], [1]]
+
+
+def test_on_written_error_does_not_resend_rows():
+    client = FakeClient()
+    seen = []
+
+    def on_written(rows):
+        seen.append(len(rows))
+        raise RuntimeError("callback failed")
+
+    writer = BatchUpsertWriter(client, "site_pages", "url,chunk_number", retry_delay=0, on_written=on_written)
+
+    async def run():
+        await writer.add({"id": 1})
+        await writer.flush()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert client.calls == [[1]]
+    assert writer.written == 1
+    assert seen == [1]
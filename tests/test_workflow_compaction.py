@@ -0,0 +1,39 @@
+import json
+
+from tokens import count_tokens
+from workflow_compaction import compact_workflow, short_node_type
+
+
+def workflow(parameter="value"):
+    return {
+        "nodes": [
+            {"id": "1", "name": "Trigger", "type": "n8n-nodes-base.webhook", "position": [0, 0],
+             "parameters": {"path": "lead", "options": {}}},
+            {"id": "2", "name": "Agent", "type": "@n8n/n8n-nodes-langchain.agent", "position": [200, 0],
+             "credentials": {"openAiApi": "secret"}, "parameters": {"text": parameter}},
+            {"id": "3", "name": "Note", "type": "n8n-nodes-base.stickyNote", "parameters": {"content": "Read me"}},
+        ],
+        "connections": {"Trigger": {"main": [[{"node": "Agent", "type": "main", "index": 0}]]}},
+    }
+
+
+def test_short_node_type():
+    assert short_node_type("n8n-nodes-base.httpRequest") == "httpRequest"
+    assert short_node_type("@n8n/n8n-nodes-langchain.agent") == "agent"
+    assert short_node_type("custom.node") == "custom.node"
+
+
+def test_layout_and_credentials_are_dropped():
+    compact = json.loads(compact_workflow(workflow()))
+    assert compact["nodes"] == [
+        {"name": "Trigger", "type": "webhook", "parameters": {"path": "lead"}},
+        {"name": "Agent", "type": "agent", "parameters": {"text": "value"}},
+    ]
+    assert compact["connections"] == ["Trigger -> Agent"]
+    assert compact["notes"] == ["Read me"]
+
+
+def test_long_workflows_fit_the_token_cap():
+    text = compact_workflow(workflow("prompt " * 5000), max_tokens=200)
+    assert count_tokens(text, "gpt-4o") <= 200
+    assert "Trigger -> Agent" in text
@@ -0,0 +1,38 @@
+from workflow_prefilter import WorkflowPrefilter
+
+
+def template(nodes, connections=None, description=""):
+    return {"description": description, "workflow": {"nodes": nodes, "connections": connections or {}}}
+
+
+def chain(names, types):
+    nodes = [{"name": name, "type": node_type} for name, node_type in zip(names, types)]
+    connections = {a: {"main": [[{"node": b, "type": "main", "index": 0}]]} for a, b in zip(names, names[1:])}
+    return nodes, connections
+
+
+def test_single_working_node_is_rejected():
+    prefilter = WorkflowPrefilter()
+    nodes = [{"name": "Note", "type": "n8n-nodes-base.stickyNote"}, {"name": "Fetch", "type": "n8n-nodes-base.httpRequest"}]
+    assert prefilter.classify(template(nodes)) == "BAD"
+
+
+def test_disconnected_graph_is_rejected():
+    nodes = [{"name": f"Step {i}", "type": "n8n-nodes-base.set"} for i in range(4)]
+    assert WorkflowPrefilter().classify(template(nodes, description="x" * 300)) == "BAD"
+
+
+def test_default_names_without_description_are_rejected():
+    nodes, connections = chain(["Webhook", "HTTP Request1"], ["n8n-nodes-base.webhook", "n8n-nodes-base.httpRequest"])
+    assert WorkflowPrefilter().classify(template(nodes, connections)) == "BAD"
+
+
+def test_clear_workflow_is_accepted_and_ambiguous_one_goes_to_the_llm():
+    names = ["On new lead", "Enrich company", "Score lead", "Notify sales"]
+    types = ["n8n-nodes-base.hubspotTrigger", "n8n-nodes-base.httpRequest", "n8n-nodes-base.code", "n8n-nodes-base.slack"]
+    nodes, connections = chain(names, types)
+    prefilter = WorkflowPrefilter(saves_on_accept=False)
+    assert prefilter.classify(template(nodes, connections, "Scores new leads. " * 20)) == "GOOD"
+    assert prefilter.classify(template(nodes, connections, "Short")) is None
+    assert prefilter.llm_calls_saved == 0
+    assert prefilter.decisions == {"GOOD": 1, "LLM": 1}